@@ -1,16 +1,25 @@
 from fastapi import FastAPI
-from entity.database import create_tables
-from common.router import auto_register_routers
+from entity.database import async_engine, async_replica_engines, async_shard_engines, create_tables
+from common.router import auto_register_routers, warm_up_response_models
 from exceptions.handle import handle_exception
 from middlewares.handle import handle_middleware
+from middlewares.trace_middleware import tracer
 
 
 async def lifespan(app: FastAPI):
     print(f'⏰️ FastAPI Demo开始启动')
     create_tables()
     print("✅ 数据库表已创建")
+    print(f"✅ 已预热 {warm_up_response_models(app)} 个响应模型")
     print('\033[92m' + '🚀 http://127.0.0.1:8000/docs 已启动' + '\033[0m')
     yield
+    # 同步模式下未创建异步引擎
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in (*async_replica_engines, *async_shard_engines[1:]):
+        await replica.dispose()
+    # 将缓冲中的链路写入导出文件
+    tracer.shutdown()
 
 # 创建FastAPI应用
 app = FastAPI(
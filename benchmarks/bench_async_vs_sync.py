@@ -0,0 +1,110 @@
+"""
+同步会话与异步会话路径吞吐量对比
+
+连接池大小与并发数一致，避免同步路径因线程池与连接池互相等待而超时。
+
+运行方式（需额外安装 httpx）:
+    python -m benchmarks.bench_async_vs_sync --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from control import address_async_controller, address_controller, user_async_controller, user_controller  # noqa: E402
+from entity.database import get_async_session, get_session  # noqa: E402
+from entity.models import Address, Base, User  # noqa: E402
+
+
+def prepare_database(db_file: str, users: int) -> None:
+    engine = create_engine(f'sqlite:///{db_file}')
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{'name': f'user{i}', 'fullname': f'User {i}'} for i in range(users)])
+        conn.execute(
+            insert(Address), [{'email_address': f'user{i}@example.com', 'user_id': i + 1} for i in range(users)]
+        )
+    engine.dispose()
+
+
+def build_sync_app(db_file: str, pool_size: int) -> tuple[FastAPI, Callable[[], Awaitable[None]]]:
+    engine = create_engine(f'sqlite:///{db_file}', pool_size=pool_size)
+
+    def override_session():
+        with Session(engine) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.include_router(address_controller.router)
+    app.dependency_overrides[get_session] = override_session
+
+    async def dispose() -> None:
+        engine.dispose()
+
+    return app, dispose
+
+
+def build_async_app(db_file: str, pool_size: int) -> tuple[FastAPI, Callable[[], Awaitable[None]]]:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{db_file}', pool_size=pool_size)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_session():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(user_async_controller.router)
+    app.include_router(address_async_controller.router)
+    app.dependency_overrides[get_async_session] = override_session
+    return app, engine.dispose
+
+
+async def run(builder: Callable, db_file: str, paths: list[str], concurrency: int) -> float:
+    app, dispose = builder(db_file, concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+
+        async def one(path: str) -> None:
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in paths))
+        elapsed = time.perf_counter() - start
+    await dispose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--users', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'bench.db')
+        prepare_database(db_file, args.users)
+        paths = [f'/users/{i % args.users + 1}' for i in range(args.requests)]
+
+        for label, builder in (('sync', build_sync_app), ('async', build_async_app)):
+            elapsed = asyncio.run(run(builder, db_file, paths, args.concurrency))
+            print(f'{label:<6} {args.requests} requests in {elapsed:.2f}s -> {args.requests / elapsed:,.0f} req/s')
+
+
+if __name__ == '__main__':
+    main()
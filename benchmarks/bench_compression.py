@@ -0,0 +1,91 @@
+"""
+响应压缩微基准：对比不同压缩算法与级别处理典型 /users/ 响应时每个请求的CPU耗时与传输字节数
+
+响应体预先按 DataResponseModel[list[User]] 序列化，只测量压缩中间件本身的开销；
+旧配置（Starlette GZipMiddleware 级别9）作为对照。br、zstd 需要分别安装 brotli、zstandard。
+
+运行方式:
+    python -m benchmarks.bench_compression --rounds 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.middleware.gzip import GZipMiddleware  # noqa: E402
+
+from common.vo import DataResponseModel  # noqa: E402
+from dto.schemas import User  # noqa: E402
+from middlewares.compression_middleware import CompressionMiddleware, available_compressors  # noqa: E402
+
+
+def build_body(count: int) -> bytes:
+    users = [
+        User(id=i, name=f'user{i}', fullname=f'User Number {i}',
+             addresses=[{'id': i, 'email_address': f'user{i}@example.com', 'user_id': i}])
+        for i in range(count)
+    ]
+    return DataResponseModel[list[User]](data=users).model_dump_json(by_alias=True).encode()
+
+
+def build_app(body: bytes):
+    async def app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    return app
+
+
+async def measure(app, encoding: str, rounds: int) -> tuple[float, int]:
+    scope = {'type': 'http', 'method': 'GET', 'path': '/users/', 'headers': [(b'accept-encoding', encoding.encode())]}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            sent.append(len(message.get('body', b'')))
+
+    timings = []
+    for _ in range(rounds):
+        sent.clear()
+        start = time.process_time()
+        await app(scope, receive, send)
+        timings.append(time.process_time() - start)
+    return statistics.mean(timings), sum(sent)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=200, help='每种配置的请求次数')
+    args = parser.parse_args()
+
+    encodings = available_compressors(5, 4, 3)
+    for count in (10, 100, 1000):
+        body = build_body(count)
+        variants = [('identity', 'identity', build_app(body)),
+                    ('starlette GZip 9', 'gzip', GZipMiddleware(build_app(body), minimum_size=1000, compresslevel=9))]
+        for level in (1, 5, 6, 9):
+            variants.append((f'gzip {level}', 'gzip', CompressionMiddleware(build_app(body), gzip_level=level)))
+        if 'br' in encodings:
+            for quality in (4, 11):
+                variants.append((f'br {quality}', 'br', CompressionMiddleware(build_app(body), brotli_quality=quality)))
+        if 'zstd' in encodings:
+            for level in (3, 9):
+                variants.append((f'zstd {level}', 'zstd', CompressionMiddleware(build_app(body), zstd_level=level)))
+
+        print(f'\n{count} users, {len(body)} bytes')
+        print(f'{"variant":<24} {"cpu/request":>12} {"bytes":>10} {"ratio":>7}')
+        for name, encoding, app in variants:
+            cpu, size = asyncio.run(measure(app, encoding, args.rounds))
+            print(f'{name:<24} {cpu * 1000:>10.3f}ms {size:>10} {len(body) / size:>6.2f}x')
+
+
+if __name__ == '__main__':
+    main()
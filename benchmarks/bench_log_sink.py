@@ -0,0 +1,78 @@
+"""
+日志写入微基准：模拟错误风暴，多个线程同时输出同一条错误日志，对比各种日志模式下调用方每条日志的耗时、全部日志落盘的总耗时，
+以及batched模式下因队列满而丢弃的条数
+
+    default          loguru enqueue=True 的文件sink（记录序列化后经队列交给写线程，每条写入一次，队列无上限）
+    batched          BatchedSink：调用方只入有界队列，后台线程批量写入
+    batched+json     BatchedSink 输出JSON行，格式化在后台线程完成
+    batched+limit    BatchedSink + 重复日志限流（每10秒同一内容最多10条）
+
+运行方式:
+    python -m benchmarks.bench_log_sink --threads 8 --messages 20000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loguru import logger  # noqa: E402
+
+from utils.log_util import BatchedSink, LogSampler  # noqa: E402
+
+FORMAT = '{time:YYYY-MM-DD HH:mm:ss.SSS} | {trace_id} | {level: <8} | {name}:{function}:{line} - {message}'
+
+
+def storm(threads: int, messages: int) -> float:
+    def worker() -> None:
+        for _ in range(messages):
+            logger.error('请求验证失败: field required')
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8, help='并发输出日志的线程数')
+    parser.add_argument('--messages', type=int, default=20_000, help='每个线程输出的日志条数')
+    args = parser.parse_args()
+    total = args.threads * args.messages
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('default', 'batched', 'batched+json', 'batched+limit'):
+            path = os.path.join(directory, f'{name}.log')
+            sampler = LogSampler({}, 10 if name == 'batched+limit' else 0, 10)
+
+            def patch(record):
+                record['trace_id'] = ''
+                record['sampled'] = sampler(record)
+
+            logger.remove()
+            logger.configure(patcher=patch)
+            if name == 'default':
+                logger.add(path, format=FORMAT, enqueue=True, filter=lambda record: record['sampled'])
+            else:
+                sink = BatchedSink(path=path, serialize=name == 'batched+json')
+                logger.add(sink, format=(lambda record: '') if sink.serialize else FORMAT, colorize=False,
+                           filter=lambda record: record['sampled'])
+            start = time.perf_counter()
+            caller = storm(args.threads, args.messages)
+            # remove 会等待队列中的日志全部写完
+            logger.remove()
+            drained = time.perf_counter() - start
+            dropped = 0 if name == 'default' else sink.dropped_total
+            print(f'{name:<15} caller {caller / total * 1e6:>7.2f}us/log  drained in {drained:>6.2f}s  '
+                  f'dropped {dropped:>7}')
+
+
+if __name__ == '__main__':
+    main()
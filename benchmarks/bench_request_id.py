@@ -0,0 +1,47 @@
+"""
+请求ID生成微基准：对比 uuid4、counter、ulid 三种生成方式，以及沿用入站 X-Request-ID / traceparent 时每个请求的开销
+
+运行方式:
+    python -m benchmarks.bench_request_id --number 200000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from middlewares.trace_middleware.ctx import ID_GENERATORS, TraceCtx, inbound_request_id  # noqa: E402
+
+HEADERS = [(b'host', b'127.0.0.1:8000'), (b'user-agent', b'bench'), (b'accept', b'*/*')]
+CASES = {
+    'no inbound id': HEADERS,
+    'X-Request-ID': [*HEADERS, (b'x-request-id', b'01HZX3K4Q7F8R2W9T5M6N0B1C2')],
+    'traceparent': [*HEADERS, (b'traceparent', b'00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01')],
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--number', type=int, default=200_000, help='每项的调用次数')
+    args = parser.parse_args()
+
+    print('generator only')
+    for name, generator in ID_GENERATORS.items():
+        seconds = min(timeit.repeat(generator, number=args.number, repeat=3))
+        print(f'  {name:<8} {seconds / args.number * 1e9:>8.0f}ns  e.g. {generator()}')
+
+    # 中间件每个请求的完整流程：解析入站ID、生成或沿用ID、写入上下文、编码响应头
+    print('per request (parse headers + set_id + encode header)')
+    for name in ID_GENERATORS:
+        TraceCtx.use_generator(name)
+        for case, headers in CASES.items():
+            def per_request():
+                TraceCtx.set_id(inbound_request_id(headers)).encode()
+
+            seconds = min(timeit.repeat(per_request, number=args.number, repeat=3))
+            print(f'  {name:<8} {case:<14} {seconds / args.number * 1e9:>8.0f}ns')
+
+
+if __name__ == '__main__':
+    main()
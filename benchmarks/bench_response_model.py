@@ -0,0 +1,77 @@
+"""
+响应模型序列化微基准：FastAPI默认流程（按response_model二次校验再序列化）与 APIRouterPro 缓存TypeAdapter直出JSON字节的对比
+
+接口函数与服务层一致，将ORM对象校验为 DataResponseModel 后返回，不访问数据库，只测量校验与序列化开销。
+两条路径都包含接口内的一次ORM校验（其中EmailStr校验占大头），差值即为省去的二次校验与序列化开销。
+
+运行方式（需额外安装 httpx）:
+    python -m benchmarks.bench_response_model --rounds 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx  # noqa: E402
+from fastapi import APIRouter, FastAPI  # noqa: E402
+
+from common.router import APIRouterPro  # noqa: E402
+from common.vo import DataResponseModel  # noqa: E402
+from dto.schemas import User  # noqa: E402
+from entity.models import Address as AddressModel, User as UserModel  # noqa: E402
+
+
+def build_rows(count: int) -> list[UserModel]:
+    return [
+        UserModel(id=i, name=f'user{i}', fullname=f'User {i}',
+                  addresses=[AddressModel(id=i, email_address=f'user{i}@example.com', user_id=i)])
+        for i in range(count)
+    ]
+
+
+def build_app(router_class: type[APIRouter], rows: list[UserModel]) -> FastAPI:
+    router = router_class()
+
+    @router.get('/users', response_model=DataResponseModel[list[User]])
+    def list_users_endpoint():
+        return DataResponseModel[list[User]](data=rows)
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+async def measure(app: FastAPI, rounds: int) -> tuple[float, bytes]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        body = (await client.get('/users')).content
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            (await client.get('/users')).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=200, help='1行用例的请求次数，行数越多次数按比例减少')
+    args = parser.parse_args()
+
+    print(f'{"rows":>6} {"APIRouter":>12} {"APIRouterPro":>14} {"saved":>10} {"speedup":>8}')
+    for count in (1, 100, 10_000):
+        rows = build_rows(count)
+        rounds = max(args.rounds // max(count // 100, 1), 9)
+        baseline, baseline_body = asyncio.run(measure(build_app(APIRouter, rows), rounds))
+        fast, fast_body = asyncio.run(measure(build_app(APIRouterPro, rows), rounds))
+        assert len(baseline_body) == len(fast_body)
+        print(f'{count:>6} {baseline * 1000:>10.3f}ms {fast * 1000:>12.3f}ms '
+              f'{(baseline - fast) * 1000:>8.3f}ms {baseline / fast:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
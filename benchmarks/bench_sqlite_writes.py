@@ -0,0 +1,123 @@
+"""
+SQLite并发写入基准：多个线程并发创建用户与地址，同时有线程持续分页查询用户，对比两种配置的写入吞吐、失败次数与读延迟
+
+    default  改造前：回滚日志模式，写入与查询共用连接池，各连接直接争抢数据库写锁
+    profile  SQLite生产配置：WAL模式，写入经单个写连接排队串行执行，查询使用只读连接池
+
+--busy-timeout 为 default 配置下sqlite3驱动等待锁的秒数，超时即报 database is locked。
+
+运行方式:
+    python -m benchmarks.bench_sqlite_writes --writers 16 --readers 4 --writes 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import Engine, create_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from dto.schemas import AddressCreate, UserCreate  # noqa: E402
+from entity.entity_cache import entity_cache  # noqa: E402
+from entity.models import Base  # noqa: E402
+from entity.routing_session import ReplicaSet, RoutingSession  # noqa: E402
+from entity.sqlite_profile import WRITER_POOL_OPTIONS, register_sqlite_profile  # noqa: E402
+from service.address_service import AddressService  # noqa: E402
+from service.user_service import UserService  # noqa: E402
+
+
+def build_default(db_file: str, workers: int, busy_timeout: float) -> tuple[Callable[[], Session], list[Engine]]:
+    engine = create_engine(f'sqlite:///{db_file}', pool_size=workers, connect_args={'timeout': busy_timeout})
+    return lambda: Session(engine), [engine]
+
+
+def build_profile(db_file: str, workers: int, busy_timeout: float) -> tuple[Callable[[], Session], list[Engine]]:
+    writer = create_engine(f'sqlite:///{db_file}', **WRITER_POOL_OPTIONS)
+    register_sqlite_profile(writer)
+    reader = create_engine(f'sqlite:///{db_file}', pool_size=workers)
+    register_sqlite_profile(reader, read_only=True)
+    replicas = ReplicaSet([reader], consistent=True)
+    return lambda: RoutingSession(writer, replicas=replicas), [writer, reader]
+
+
+def run(builder: Callable, db_file: str, args: argparse.Namespace) -> None:
+    session_factory, engines = builder(db_file, args.writers + args.readers, args.busy_timeout)
+    with engines[0].begin() as conn:
+        Base.metadata.create_all(conn)
+    failures: list[str] = []
+    read_latencies: list[float] = []
+    writing = threading.Event()
+    writing.set()
+
+    def write(worker: int) -> None:
+        with session_factory() as session:
+            for i in range(args.writes):
+                user = UserService.create_user(UserCreate(name=f'user{worker}x{i}'), session)
+                if not user.success:
+                    failures.append(user.msg)
+                    continue
+                address = AddressService.create_address(
+                    user.data.id, AddressCreate(email_address=f'user{worker}x{i}@example.com'), session)
+                if not address.success:
+                    failures.append(address.msg)
+
+    def read() -> None:
+        with session_factory() as session:
+            while writing.is_set():
+                start = time.perf_counter()
+                result = UserService.page_users(20, None, None, True, session)
+                read_latencies.append(time.perf_counter() - start)
+                if not result.success:
+                    failures.append(result.msg)
+
+    with ThreadPoolExecutor(max_workers=args.writers + args.readers) as executor:
+        readers = [executor.submit(read) for _ in range(args.readers)]
+        start = time.perf_counter()
+        try:
+            for future in [executor.submit(write, worker) for worker in range(args.writers)]:
+                future.result()
+        finally:
+            elapsed = time.perf_counter() - start
+            writing.clear()
+        for future in readers:
+            future.result()
+    for engine in engines:
+        engine.dispose()
+
+    writes = args.writers * args.writes * 2
+    print(f'  {writes - len(failures)}/{writes} writes in {elapsed:.2f}s -> {(writes - len(failures)) / elapsed:,.0f} writes/s, '
+          f'{len(failures)} failed')
+    if failures:
+        print(f'  first failure: {failures[0]}')
+    if read_latencies:
+        read_latencies.sort()
+        p99 = read_latencies[int(len(read_latencies) * 0.99)]
+        print(f'  {len(read_latencies)} reads, p50 {statistics.median(read_latencies) * 1000:.2f}ms, '
+              f'p99 {p99 * 1000:.2f}ms, max {read_latencies[-1] * 1000:.2f}ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=16, help='并发写入线程数')
+    parser.add_argument('--readers', type=int, default=4, help='并发查询线程数')
+    parser.add_argument('--writes', type=int, default=200, help='每个写入线程创建的用户数（每个用户另创建一个地址）')
+    parser.add_argument('--busy-timeout', type=float, default=5, help='default配置下等待数据库锁的秒数')
+    args = parser.parse_args()
+    # 关闭实体缓存，使每次查询都访问数据库
+    entity_cache.ttl = 0
+
+    for label, builder in (('default', build_default), ('profile', build_profile)):
+        with tempfile.TemporaryDirectory() as tmp:
+            print(label)
+            run(builder, os.path.join(tmp, 'bench.db'), args)
+
+
+if __name__ == '__main__':
+    main()
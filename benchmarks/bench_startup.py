@@ -0,0 +1,96 @@
+"""
+启动耗时基准：对比各控制器发现方式查找控制器的耗时，以及新进程中 import app（含路由注册）的冷启动总耗时
+
+    legacy    改造前的实现：os.walk 遍历整个项目目录（含 .git、.venv、logs）
+    scan      剪枝遍历，只进入可作为Python包导入的目录
+    packages  只列出 ROUTER_PACKAGES 中的包
+    manifest  读取预先生成的路由清单
+
+--fake-venv N 会在项目根目录下临时创建一个包含N个包的虚拟环境目录（含 pyvenv.cfg），模拟镜像中内置的venv，结束后删除。
+
+运行方式:
+    python -m benchmarks.bench_startup --fake-venv 2000
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fastapi import FastAPI  # noqa: E402
+
+from common.router import RouterRegister  # noqa: E402
+
+COLD_START = 'import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)'
+
+
+def legacy_find_controller_files() -> list[str]:
+    controller_files = []
+    for root, _dirs, files in os.walk(ROOT):
+        if os.path.basename(root) == 'control':
+            controller_files.extend(
+                os.path.join(root, file) for file in files if file.endswith('.py') and not file.startswith('__'))
+    return controller_files
+
+
+def create_fake_venv(packages: int) -> str:
+    venv = tempfile.mkdtemp(prefix='.venv-bench-', dir=ROOT)
+    with open(os.path.join(venv, 'pyvenv.cfg'), 'w') as f:
+        f.write('home = /usr/bin\n')
+    site_packages = os.path.join(venv, 'lib', 'python3.11', 'site-packages')
+    for i in range(packages):
+        package = os.path.join(site_packages, f'package{i}', 'sub')
+        os.makedirs(package)
+        for j in range(10):
+            open(os.path.join(package, f'module{j}.py'), 'w').close()
+    return venv
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fake-venv', type=int, default=0, help='临时虚拟环境中的包数量，0表示不创建')
+    parser.add_argument('--cold-runs', type=int, default=3, help='每种发现方式冷启动的次数')
+    args = parser.parse_args()
+
+    venv = create_fake_venv(args.fake_venv) if args.fake_venv else None
+    manifest_path = os.path.join(tempfile.mkdtemp(), 'route_manifest.json')
+    try:
+        RouterRegister(FastAPI(), discovery='scan', manifest_path=manifest_path).write_manifest()
+        registers = {
+            mode: RouterRegister(FastAPI(), discovery=mode, manifest_path=manifest_path)
+            for mode in ('scan', 'packages', 'manifest')
+        }
+        cases = {
+            'legacy': legacy_find_controller_files,
+            'scan': registers['scan']._find_controller_modules,
+            'packages': registers['packages']._find_controller_modules,
+            'manifest': registers['manifest']._load_manifest_routers,
+        }
+        print('controller discovery (modules already imported)')
+        for name, find in cases.items():
+            seconds = min(timeit.repeat(find, number=1, repeat=5))
+            print(f'  {name:<10} {seconds * 1000:>9.2f}ms')
+
+        print('cold start: python -c "import app"')
+        for mode in ('scan', 'packages', 'manifest'):
+            env = {**os.environ, 'ROUTER_DISCOVERY': mode, 'ROUTER_MANIFEST_PATH': manifest_path}
+            runs = [
+                float(subprocess.run(
+                    [sys.executable, '-c', COLD_START], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+                ).stdout.strip().splitlines()[-1])
+                for _ in range(args.cold_runs)
+            ]
+            print(f'  {mode:<10} {min(runs) * 1000:>9.2f}ms')
+    finally:
+        if venv is not None:
+            shutil.rmtree(venv)
+        shutil.rmtree(os.path.dirname(manifest_path))
+
+
+if __name__ == '__main__':
+    main()
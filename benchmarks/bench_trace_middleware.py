@@ -0,0 +1,78 @@
+"""
+链路追踪中间件开销微基准：对比裸ASGI应用与包裹 TraceASGIMiddleware（计时 + 按路由聚合指标）后每个请求的耗时与内存分配
+
+被测应用只发送一个很小的JSON响应，不经过FastAPI路由，差值即为中间件本身的开销。
+
+运行方式:
+    python -m benchmarks.bench_trace_middleware --rounds 100000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from starlette.routing import Route  # noqa: E402
+
+from middlewares.trace_middleware import TraceASGIMiddleware, request_metrics  # noqa: E402
+
+ROUTE = Route('/users/{user_id}', endpoint=lambda request: None)
+BODY = b'{"code":200,"msg":"ok","success":true}'
+
+
+async def app(scope, receive, send):
+    scope['route'] = ROUTE
+    await receive()
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': BODY})
+
+
+async def receive():
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+
+async def send(message):
+    pass
+
+
+async def run(asgi_app, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        scope = {'type': 'http', 'method': 'GET', 'path': '/users/1', 'headers': []}
+        await asgi_app(scope, receive, send)
+    return (time.perf_counter() - start) / rounds
+
+
+async def allocations(asgi_app, rounds: int) -> tuple[float, float]:
+    # 先预热，使路由指标对象等一次性分配不计入
+    await run(asgi_app, 10)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await run(asgi_app, rounds)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    return sum(stat.size_diff for stat in stats) / rounds, sum(stat.count_diff for stat in stats) / rounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=100_000, help='每种配置的请求次数')
+    args = parser.parse_args()
+
+    traced = TraceASGIMiddleware(app)
+    for name, asgi_app in (('bare app', app), ('TraceASGIMiddleware', traced)):
+        asyncio.run(run(asgi_app, 1000))
+        per_request = min(asyncio.run(run(asgi_app, args.rounds)) for _ in range(3))
+        retained, blocks = asyncio.run(allocations(asgi_app, 1000))
+        print(f'{name:<22} {per_request * 1e6:>8.2f}us/request  retained {retained:>7.1f} B/request ({blocks:.2f} blocks)')
+    metrics = request_metrics.get('GET', '/users/{user_id}')
+    print(f'recorded {metrics.count} requests, p50={metrics.quantile(0.5) * 1e6:.1f}us '
+          f'p99={metrics.quantile(0.99) * 1e6:.1f}us')
+
+
+if __name__ == '__main__':
+    main()
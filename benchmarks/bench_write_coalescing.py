@@ -0,0 +1,96 @@
+"""
+合并写入基准：并发的单条创建用户请求在关闭/开启合并写入时的持续插入吞吐
+
+数据库使用SQLite生产配置（WAL、单写连接）。同步模式用线程模拟线程池中的请求，异步模式用协程；
+每个并发请求循环调用 create_user，每次调用使用新的会话，与每个HTTP请求一个会话一致。
+
+运行方式:
+    python -m benchmarks.bench_write_coalescing --concurrency 64 --inserts 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from dto.schemas import UserCreate  # noqa: E402
+from entity.models import Base  # noqa: E402
+from entity.sqlite_profile import WRITER_POOL_OPTIONS, register_sqlite_profile  # noqa: E402
+from service import user_service  # noqa: E402
+from service.user_service import AsyncUserService, UserService  # noqa: E402
+
+
+def run_sync(db_file: str, concurrency: int, inserts: int) -> float:
+    engine = create_engine(f'sqlite:///{db_file}', **WRITER_POOL_OPTIONS)
+    register_sqlite_profile(engine)
+    Base.metadata.create_all(engine)
+
+    def worker(index: int) -> None:
+        for i in range(index, inserts, concurrency):
+            with Session(engine) as session:
+                if not UserService.create_user(UserCreate(name=f'user{i}'), session).success:
+                    raise RuntimeError('创建用户失败')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return elapsed
+
+
+async def run_async(db_file: str, concurrency: int, inserts: int) -> float:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{db_file}', **WRITER_POOL_OPTIONS)
+    register_sqlite_profile(engine.sync_engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def worker(index: int) -> None:
+        for i in range(index, inserts, concurrency):
+            async with AsyncSession(engine, expire_on_commit=False) as session:
+                if not (await AsyncUserService.create_user(UserCreate(name=f'user{i}'), session)).success:
+                    raise RuntimeError('创建用户失败')
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=64, help='并发请求数')
+    parser.add_argument('--inserts', type=int, default=5000, help='每轮创建的用户数')
+    parser.add_argument('--window-ms', type=float, default=2, help='合并写入等待时间（毫秒）')
+    parser.add_argument('--max-rows', type=int, default=100, help='合并写入每批最多记录数')
+    args = parser.parse_args()
+
+    coalescers = (user_service.user_create_coalescer, user_service.async_user_create_coalescer)
+    for coalescer in coalescers:
+        coalescer.window = args.window_ms / 1000
+        coalescer.max_rows = args.max_rows
+    for mode in ('sync', 'async'):
+        for enabled in (False, True):
+            for coalescer in coalescers:
+                coalescer.enabled = enabled
+            with tempfile.TemporaryDirectory() as tmp:
+                db_file = os.path.join(tmp, 'bench.db')
+                if mode == 'sync':
+                    elapsed = run_sync(db_file, args.concurrency, args.inserts)
+                else:
+                    elapsed = asyncio.run(run_async(db_file, args.concurrency, args.inserts))
+            label = f'{mode} coalesce={"on" if enabled else "off"}'
+            print(f'{label:<20} {args.inserts} inserts in {elapsed:.2f}s -> {args.inserts / elapsed:,.0f} inserts/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute, APIRouter
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import URLPath
+from starlette.routing import BaseRoute, Match, NoMatchFound, compile_path, replace_params
+from starlette.types import Receive, Scope, Send
+
+
+def describe_router(router: APIRouter) -> Optional[dict[str, Any]]:
+    """
+    生成懒加载所需的路由描述：各路由的路径、方法与名称，以及这些路由在OpenAPI中的paths与components
+
+    :param router: 路由实例
+    :return: 路由描述，包含非APIRoute路由（如websocket）时返回None，这类路由只能在启动时注册
+    """
+    if not all(isinstance(route, APIRoute) for route in router.routes):
+        return None
+    app = FastAPI()
+    app.include_router(router)
+    schema = app.openapi()
+    return {
+        'routes': [
+            {'path': route.path, 'methods': sorted(route.methods), 'name': route.name} for route in router.routes
+        ],
+        'openapi': {'paths': schema.get('paths', {}), 'components': schema.get('components', {})},
+    }
+
+
+class LazyRoute(BaseRoute):
+    """
+    懒加载路由的占位路由，按路由清单中的路径与方法匹配请求，首次命中时加载真实路由后重新分发请求
+    """
+
+    def __init__(self, lazy_router: 'LazyRouter', path: str, methods: list[str], name: str) -> None:
+        self.lazy_router = lazy_router
+        self.path = path
+        self.methods = set(methods)
+        self.name = name
+        self.path_regex, self.path_format, self.param_convertors = compile_path(path)
+
+    def matches(self, scope: Scope) -> tuple[Match, Scope]:
+        if scope['type'] == 'http' and self.path_regex.match(scope['path']):
+            return (Match.FULL if scope['method'] in self.methods else Match.PARTIAL), {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any) -> URLPath:
+        if name != self.name or set(path_params) != set(self.param_convertors):
+            raise NoMatchFound(name, path_params)
+        path, _remaining = replace_params(self.path_format, self.param_convertors, path_params)
+        return URLPath(path=path, protocol='http')
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.lazy_router.load()
+        # 占位路由已被真实路由替换，交给路由器重新匹配
+        await scope['router'](scope, receive, send)
+
+
+class LazyRouter:
+    """
+    路由清单中标记为懒加载的路由：启动时只按清单挂载占位路由，并把清单中的OpenAPI片段合并到文档中；
+    首次有请求命中时才导入控制器模块（及其依赖的服务），用真实路由替换占位路由
+    """
+
+    def __init__(
+        self,
+        module_name: str,
+        attr_name: str,
+        order_num: int,
+        auto_register: bool,
+        routes: list[dict[str, Any]],
+        openapi: dict[str, Any],
+    ) -> None:
+        self.module_name = module_name
+        self.attr_name = attr_name
+        self.order_num = order_num
+        self.auto_register = auto_register
+        self.routes = routes
+        self.openapi = openapi
+        self.app: Optional[FastAPI] = None
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    def mount(self, app: FastAPI) -> None:
+        """
+        挂载占位路由，并在应用上安装合并OpenAPI片段的钩子
+
+        :param app: FastAPI对象
+        """
+        self.app = app
+        for route in self.routes:
+            app.router.routes.append(LazyRoute(self, route['path'], route['methods'], route['name']))
+        lazy_routers = getattr(app.state, 'lazy_routers', None)
+        if lazy_routers is None:
+            lazy_routers = app.state.lazy_routers = []
+            _install_openapi_hook(app)
+        lazy_routers.append(self)
+        app.openapi_schema = None
+
+    async def load(self) -> None:
+        """
+        导入控制器模块并将真实路由插入到占位路由所在的位置，保持路由匹配顺序不变；并发的首次请求只加载一次
+        """
+        async with self._lock:
+            if self.loaded:
+                return
+            # 导入可能较慢，放到线程池中执行，避免阻塞事件循环
+            module = await run_in_threadpool(importlib.import_module, self.module_name)
+            router = getattr(module, self.attr_name)
+            routes = self.app.router.routes
+            index = next(i for i, route in enumerate(routes) if getattr(route, 'lazy_router', None) is self)
+            count = len(routes)
+            self.app.include_router(router)
+            loaded_routes = routes[count:]
+            del routes[count:]
+            routes[:] = [route for route in routes if getattr(route, 'lazy_router', None) is not self]
+            routes[index:index] = loaded_routes
+            self.loaded = True
+            # 重新生成OpenAPI文档，使用真实路由代替清单中的片段
+            self.app.openapi_schema = None
+
+
+def _install_openapi_hook(app: FastAPI) -> None:
+    generate_openapi = app.openapi
+
+    def openapi() -> dict[str, Any]:
+        if app.openapi_schema:
+            return app.openapi_schema
+        schema = generate_openapi()
+        for lazy_router in app.state.lazy_routers:
+            if lazy_router.loaded:
+                continue
+            schema.setdefault('paths', {}).update(lazy_router.openapi.get('paths', {}))
+            for section, components in lazy_router.openapi.get('components', {}).items():
+                schema.setdefault('components', {}).setdefault(section, {}).update(components)
+        app.openapi_schema = schema
+        return schema
+
+    app.openapi = openapi
@@ -0,0 +1,26 @@
+"""
+生成路由清单，生产环境构建镜像时生成并配合 ROUTER_DISCOVERY=manifest 使用，启动时不再扫描文件系统
+
+运行方式:
+    python -m common.route_manifest --output route_manifest.json
+"""
+import argparse
+
+from fastapi import FastAPI
+
+from common.router import RouterRegister
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=None, help='清单路径，默认读取 ROUTER_MANIFEST_PATH')
+    parser.add_argument('--discovery', choices=('scan', 'packages'), default=None, help='生成清单时的控制器发现方式')
+    args = parser.parse_args()
+
+    router_register = RouterRegister(FastAPI(), discovery=args.discovery, manifest_path=args.output)
+    count = router_register.write_manifest()
+    print(f'✅ 已写入 {count} 个路由到 {router_register.manifest_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,151 @@
+import functools
 import importlib
+import importlib.util
+import inspect
+import json
 import os
+import pkgutil
 import sys
 from collections.abc import Sequence
 from enum import Enum
-from typing import Annotated, Any, Callable, Literal, Optional, Union
+from functools import lru_cache
+from typing import Annotated, Any, Callable, Literal, Optional, Union, get_args, get_origin
 
 from annotated_doc import Doc
 from fastapi import FastAPI, params
-from fastapi.datastructures import Default
+from fastapi.datastructures import Default, DefaultPlaceholder
+from fastapi.exceptions import ResponseValidationError
 from fastapi.routing import APIRoute, APIRouter
 from fastapi.utils import generate_unique_id
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from starlette.responses import JSONResponse, Response
 from starlette.routing import BaseRoute
 from starlette.types import ASGIApp, Lifespan
 from typing_extensions import deprecated
 
+from common.lazy_router import LazyRouter, describe_router
+from common.vo import generic_model_cache
+from config.env import RouterConfig
+
+
+@lru_cache(maxsize=None)
+def get_response_adapter(response_model: Any) -> TypeAdapter:
+    """
+    获取响应模型的TypeAdapter，每个响应模型只构建一次校验器与序列化器
+
+    :param response_model: 响应模型
+    :return: TypeAdapter
+    """
+    return TypeAdapter(response_model)
+
+
+def build_instance_check(response_model: Any) -> Optional[Callable[[Any], bool]]:
+    """
+    生成判断返回值是否已是响应模型实例的函数，支持Pydantic模型及其列表（list[Model]、List[Model]）
+
+    :param response_model: 响应模型
+    :return: 判断函数，其他类型的响应模型返回None
+    """
+    if isinstance(response_model, type) and issubclass(response_model, BaseModel):
+        return lambda result: isinstance(result, response_model)
+    args = get_args(response_model)
+    if get_origin(response_model) is list and len(args) == 1 and isinstance(args[0], type) \
+            and issubclass(args[0], BaseModel):
+        item_model = args[0]
+        return lambda result: isinstance(result, list) and all(isinstance(item, item_model) for item in result)
+    return None
+
+
+# 快速响应包装函数额外声明的参数，由FastAPI注入接口与依赖共用的Response，用于带回其中设置的响应头与状态码
+SUB_RESPONSE_PARAM = '_fast_response_sub_response'
+
+
+def build_fast_response_endpoint(
+    endpoint: Callable[..., Any], response_model: Any, status_code: int, dump_options: dict[str, Any]
+) -> Callable[..., Any]:
+    """
+    包装接口函数，将返回值直接序列化为JSON字节并返回Response，跳过FastAPI按response_model的二次校验与序列化
+
+    返回值已是响应模型实例（或响应模型为列表时各元素均为模型实例）时直接序列化；否则（如dict、ORM对象）按响应模型校验一次后序列化；
+    返回Response时原样返回。与FastAPI一致，接口或依赖在注入的Response参数上设置的响应头、Cookie与状态码会带到响应中
+
+    :param endpoint: 接口函数
+    :param response_model: 响应模型
+    :param status_code: 响应状态码
+    :param dump_options: 序列化参数（include、exclude、by_alias等）
+    :return: 包装后的接口函数
+    """
+    adapter = get_response_adapter(response_model)
+    is_instance = build_instance_check(response_model)
+
+    def render(result: Any, sub_response: Response) -> Response:
+        if isinstance(result, Response):
+            return result
+        if is_instance is None or not is_instance(result):
+            try:
+                result = adapter.validate_python(result, from_attributes=True)
+            except ValidationError as e:
+                raise ResponseValidationError(errors=e.errors(include_url=False), body=result) from e
+        response = Response(content=adapter.dump_json(result, **dump_options),
+                            status_code=sub_response.status_code or status_code, media_type='application/json')
+        response.headers.raw.extend(sub_response.headers.raw)
+        return response
+
+    # FastAPI每个接口只注入一个Response参数：接口已声明时直接使用，否则在包装函数的签名中追加
+    signature = inspect.signature(endpoint)
+    parameters = list(signature.parameters.values())
+    param_name = next((parameter.name for parameter in parameters if isinstance(parameter.annotation, type)
+                       and issubclass(parameter.annotation, Response)), None)
+    declared = param_name is not None
+    if not declared:
+        param_name = SUB_RESPONSE_PARAM
+        position = next((index for index, parameter in enumerate(parameters)
+                         if parameter.kind is inspect.Parameter.VAR_KEYWORD), len(parameters))
+        parameters.insert(position, inspect.Parameter(
+            param_name, inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+    def sub_response_of(kwargs: dict[str, Any]) -> Response:
+        return kwargs[param_name] if declared else kwargs.pop(param_name)
+
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args: Any, **kwargs: Any) -> Response:
+            sub_response = sub_response_of(kwargs)
+            return render(await endpoint(*args, **kwargs), sub_response)
+
+        wrapped = async_wrapper
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args: Any, **kwargs: Any) -> Response:
+            sub_response = sub_response_of(kwargs)
+            return render(endpoint(*args, **kwargs), sub_response)
+
+        wrapped = wrapper
+    wrapped.__signature__ = signature.replace(parameters=parameters)
+    return wrapped
+
+
+def warm_up_response_models(app: FastAPI) -> int:
+    """
+    启动时预热所有路由的泛型响应模型及其序列化器，避免每个路由的首个请求承担模型创建与校验器构建开销
+
+    :param app: FastAPI对象
+    :return: 预热的响应模型数量
+    """
+    specs = []
+    for route in app.routes:
+        response_model = getattr(route, 'response_model', None)
+        if not isinstance(route, APIRoute) or response_model is None:
+            continue
+        metadata = getattr(response_model, '__pydantic_generic_metadata__', None)
+        if metadata and metadata['origin'] is not None:
+            args = metadata['args']
+            specs.append((metadata['origin'], args[0] if len(args) == 1 else args))
+        get_response_adapter(response_model)
+    return generic_model_cache.warm_up(specs)
+
 
 class APIRouterPro(APIRouter):
     """
@@ -53,6 +184,12 @@ class APIRouterPro(APIRouter):
             'An optional order number for the router.')] = 100,
         auto_register: Annotated[bool, Doc(
             'An optional auto register flag for the router.')] = True,
+        lazy: Annotated[bool, Doc(
+            'Import the controller module only when one of its routes is first requested. '
+            'Only takes effect when routers are registered from a route manifest.')] = False,
+        fast_response: Annotated[bool, Doc(
+            'Serialize returned values with a cached TypeAdapter of the response_model, '
+            'skipping the second validation and serialization done by FastAPI. Opt-in per router.')] = False,
         tags: Annotated[
             Optional[list[Union[str, Enum]]],
             Doc(
@@ -266,6 +403,8 @@ class APIRouterPro(APIRouter):
     ) -> None:
         self.order_num = order_num
         self.auto_register = auto_register
+        self.lazy = lazy
+        self.fast_response = fast_response
         super().__init__(
             prefix=prefix,
             tags=tags,
@@ -286,73 +425,213 @@ class APIRouterPro(APIRouter):
             generate_unique_id_function=generate_unique_id_function,
         )
 
+    def add_api_route(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        """
+        注册路由，显式声明了response_model且使用默认响应类的路由在注册时构建序列化器并包装接口函数
+        """
+        response_model = kwargs.get('response_model')
+        response_class = kwargs.get('response_class', Default(JSONResponse))
+        if (
+            self.fast_response
+            and response_model is not None
+            and not isinstance(response_model, DefaultPlaceholder)
+            and isinstance(response_class, DefaultPlaceholder)
+            and isinstance(self.default_response_class, DefaultPlaceholder)
+        ):
+            dump_options = {
+                'include': kwargs.get('response_model_include'),
+                'exclude': kwargs.get('response_model_exclude'),
+                'by_alias': kwargs.get('response_model_by_alias', True),
+                'exclude_unset': kwargs.get('response_model_exclude_unset', False),
+                'exclude_defaults': kwargs.get('response_model_exclude_defaults', False),
+                'exclude_none': kwargs.get('response_model_exclude_none', False),
+            }
+            endpoint = build_fast_response_endpoint(
+                endpoint, response_model, kwargs.get('status_code') or 200, dump_options)
+        super().add_api_route(path, endpoint, **kwargs)
+
 
 class RouterRegister:
     """
     路由注册器，用于自动注册所有controller目录下的路由
+
+    控制器的发现方式由 discovery 决定：
+        scan      剪枝遍历项目目录，只进入可作为Python包导入的目录，查找其中的control目录
+        packages  只导入指定包下的模块，不遍历目录
+        manifest  读取 write_manifest 生成的路由清单，只导入清单中的模块并直接取出路由，不扫描文件系统；
+                  lazy=True 的APIRouterPro按清单挂载占位路由，首次命中时才导入模块
     """
 
-    def __init__(self, app: FastAPI) -> None:
+    # 路由清单格式版本
+    MANIFEST_VERSION = 1
+
+    def __init__(
+        self,
+        app: FastAPI,
+        discovery: Optional[str] = None,
+        packages: Optional[Sequence[str]] = None,
+        manifest_path: Optional[str] = None,
+    ) -> None:
         """
         初始化路由注册器
 
         :param app: FastAPI对象
+        :param discovery: 控制器发现方式：scan、packages 或 manifest，默认读取 ROUTER_DISCOVERY
+        :param packages: packages 模式下的控制器包，默认读取 ROUTER_PACKAGES
+        :param manifest_path: 路由清单路径，默认读取 ROUTER_MANIFEST_PATH
         """
         self.app = app
         # 获取项目根目录
         self.project_root = os.path.abspath(
             os.path.join(os.path.dirname(__file__), '..'))
-        sys.path.insert(0, self.project_root)
+        if self.project_root not in sys.path:
+            sys.path.insert(0, self.project_root)
+        self.discovery = discovery or RouterConfig.router_discovery
+        self.packages = list(packages) if packages is not None else _split(RouterConfig.router_packages)
+        self.exclude_dirs = set(_split(RouterConfig.router_exclude_dirs))
+        self.manifest_path = os.path.join(self.project_root, manifest_path or RouterConfig.router_manifest_path)
 
     def _find_controller_files(self) -> list[str]:
         """
-        查找所有control目录下的py文件
+        查找所有control目录下的py文件，遍历时跳过隐藏目录、__pycache__、虚拟环境、排除列表中的目录
+        以及名称不能作为包名的目录（如 site-packages、python3.11），这些目录下的模块本来也无法按路径导入
 
         :return: py文件路径列表
         """
         controller_files = []
-        # 遍历所有目录，查找control目录
-        for root, _dirs, files in os.walk(self.project_root):
+        for root, dirs, files in os.walk(self.project_root):
+            # 原地修改dirs以剪枝，并排序保证各平台的注册顺序一致
+            dirs[:] = sorted(
+                name for name in dirs
+                if name.isidentifier() and not name.startswith('__') and name not in self.exclude_dirs
+                and not os.path.exists(os.path.join(root, name, 'pyvenv.cfg'))
+            )
             # 检查当前目录是否为control目录
             if os.path.basename(root) == 'control':
                 # 遍历control目录下的所有py文件
-                for file in files:
+                for file in sorted(files):
                     if file.endswith('.py') and not file.startswith('__'):
                         file_path = os.path.join(root, file)
                         controller_files.append(file_path)
         return controller_files
 
-    def _import_module_and_get_routers(self, controller_files: list[str]) -> list[tuple[str, APIRouter]]:
+    def _find_controller_modules(self) -> list[str]:
+        """
+        按发现方式查找控制器模块
+
+        :return: 模块名列表
+        """
+        if self.discovery == 'packages':
+            module_names = []
+            for package in self.packages:
+                spec = importlib.util.find_spec(package)
+                if spec is None or spec.submodule_search_locations is None:
+                    print(f'Error finding controller package {package}')
+                    continue
+                module_names.extend(
+                    f'{package}.{info.name}'
+                    for info in sorted(pkgutil.iter_modules(spec.submodule_search_locations), key=lambda info: info.name)
+                    if not info.ispkg and not info.name.startswith('__')
+                )
+            return module_names
+        # 计算模块路径
+        return [
+            os.path.relpath(file_path, self.project_root).replace(os.sep, '.')[:-3]
+            for file_path in self._find_controller_files()
+        ]
+
+    def _import_module_and_get_routers(self, module_names: list[str]) -> list[tuple[str, str, APIRouter]]:
         """
         导入模块并获取路由实例
 
-        :param controller_files: controller目录下的py文件路径列表
-        :return: 路由实例列表
+        :param module_names: 控制器模块名列表
+        :return: (模块名, 变量名, 路由实例) 列表
         """
         routers = []
-        for file_path in controller_files:
-            # 计算模块路径
-            relative_path = os.path.relpath(file_path, self.project_root)
-            module_name = relative_path.replace(os.sep, '.')[:-3]
-
+        for module_name in module_names:
             try:
                 # 动态导入模块
                 module = importlib.import_module(module_name)
                 # 遍历模块属性，寻找APIRouter和APIRouterPro实例
                 for attr_name in dir(module):
                     attr = getattr(module, attr_name)
-                    # 对于APIRouterPro实例，只有当auto_register=True时才添加
-                    if isinstance(attr, APIRouterPro):
-                        if attr.auto_register:
-                            routers.append((attr_name, attr))
-                    # 对于APIRouter实例，直接添加
-                    elif isinstance(attr, APIRouter):
-                        routers.append((attr_name, attr))
+                    if isinstance(attr, APIRouter):
+                        routers.append((module_name, attr_name, attr))
             except Exception as e:
                 print(f'Error importing module {module_name}: {e}')
         return routers
 
-    def _sort_routers(self, routers: list[tuple[str, APIRouter]]) -> list[tuple[str, APIRouter]]:
+    def _load_manifest_routers(self) -> Optional[list[tuple[str, str, Union[APIRouter, LazyRouter]]]]:
+        """
+        按路由清单导入模块并取出路由实例，懒加载的路由不导入模块
+
+        :return: (模块名, 变量名, 路由实例或懒加载路由) 列表，清单不存在或版本不符时返回None
+        """
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest.get('version') != self.MANIFEST_VERSION:
+            return None
+        routers = []
+        for entry in manifest['routers']:
+            module_name, attr_name = entry['module'], entry['attr']
+            if entry.get('lazy'):
+                routers.append((module_name, attr_name, LazyRouter(
+                    module_name, attr_name, entry['order_num'], entry['auto_register'], entry['routes'],
+                    entry['openapi'])))
+                continue
+            try:
+                attr = getattr(importlib.import_module(module_name), attr_name)
+            except Exception as e:
+                print(f'Error loading router {module_name}.{attr_name} from manifest: {e}')
+                continue
+            if isinstance(attr, APIRouter):
+                routers.append((module_name, attr_name, attr))
+        return routers
+
+    def discover_routers(self) -> list[tuple[str, str, Union[APIRouter, LazyRouter]]]:
+        """
+        按发现方式查找全部路由实例（包括auto_register=False的APIRouterPro）
+
+        :return: (模块名, 变量名, 路由实例或懒加载路由) 列表
+        """
+        if self.discovery == 'manifest':
+            routers = self._load_manifest_routers()
+            if routers is not None:
+                return routers
+            print(f'Route manifest {self.manifest_path} not found or outdated, falling back to scan')
+        return self._import_module_and_get_routers(self._find_controller_modules())
+
+    def write_manifest(self) -> int:
+        """
+        扫描控制器并生成路由清单，清单中包含全部路由实例，是否注册仍在启动时按auto_register判断；
+        lazy=True 的APIRouterPro额外记录order_num、生成清单时的auto_register、各路由的路径与方法以及OpenAPI片段
+
+        :return: 清单中的路由数
+        """
+        discovery, self.discovery = self.discovery, 'scan' if self.discovery == 'manifest' else self.discovery
+        try:
+            routers = self.discover_routers()
+        finally:
+            self.discovery = discovery
+        entries = []
+        for module_name, attr_name, router in routers:
+            entry = {'module': module_name, 'attr': attr_name}
+            description = describe_router(router) if isinstance(router, APIRouterPro) and router.lazy else None
+            if description is not None:
+                entry.update(lazy=True, order_num=router.order_num, auto_register=router.auto_register, **description)
+            entries.append(entry)
+        manifest = {'version': self.MANIFEST_VERSION, 'routers': entries}
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        return len(routers)
+
+    def _sort_routers(
+        self, routers: list[tuple[str, Union[APIRouter, LazyRouter]]]
+    ) -> list[tuple[str, Union[APIRouter, LazyRouter]]]:
         """
         按规则排序路由
 
@@ -361,17 +640,19 @@ class RouterRegister:
         """
 
         # 按规则排序路由
-        def sort_key(item: tuple[str, APIRouter]) -> Union[tuple[Literal[0], int, str], tuple[Literal[1], str]]:
+        def sort_key(
+            item: tuple[str, Union[APIRouter, LazyRouter]]
+        ) -> Union[tuple[Literal[0], int, str], tuple[Literal[1], str]]:
             attr_name, router = item
-            # APIRouterPro实例按order_num排序，序号越小越靠前
-            if isinstance(router, APIRouterPro):
+            # APIRouterPro实例与懒加载路由按order_num排序，序号越小越靠前
+            if isinstance(router, (APIRouterPro, LazyRouter)):
                 return (0, router.order_num, attr_name)
             # APIRouter实例按变量名首字母排序
             return (1, attr_name)
 
         return sorted(routers, key=sort_key)
 
-    def _register_routers_to_app(self, routers: list[tuple[str, APIRouter]]) -> None:
+    def _register_routers_to_app(self, routers: list[tuple[str, Union[APIRouter, LazyRouter]]]) -> None:
         """
         将路由注册到FastAPI应用
 
@@ -379,7 +660,10 @@ class RouterRegister:
         :return: None
         """
         for _attr_name, router in routers:
-            self.app.include_router(router=router)
+            if isinstance(router, LazyRouter):
+                router.mount(self.app)
+            else:
+                self.app.include_router(router=router)
 
     def register_routers(self) -> None:
         """
@@ -387,16 +671,21 @@ class RouterRegister:
 
         :return: None
         """
-        # 查找所有controller目录下的py文件
-        controller_files = self._find_controller_files()
-        # 导入模块并获取路由实例
-        routers = self._import_module_and_get_routers(controller_files)
+        # 查找控制器模块并获取路由实例，对于APIRouterPro实例，只有当auto_register=True时才添加
+        routers = [
+            (attr_name, router) for _module_name, attr_name, router in self.discover_routers()
+            if not isinstance(router, (APIRouterPro, LazyRouter)) or router.auto_register
+        ]
         # 按规则排序路由
         sorted_routers = self._sort_routers(routers)
         # 注册路由到FastAPI应用
         self._register_routers_to_app(sorted_routers)
 
 
+def _split(value: str) -> list[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
 def auto_register_routers(app: FastAPI) -> None:
     """
     自动注册所有controller目录下的路由
@@ -1,7 +1,11 @@
+import contextvars
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
 from datetime import datetime
 from typing import Any, Generic, Optional, TypeVar, Union
 
-from pydantic import BaseModel, ConfigDict, Field, create_model
+from pydantic import BaseModel, ConfigDict, Field, ModelWrapValidatorHandler, create_model, model_validator
 from pydantic.alias_generators import to_camel
 from typing_extensions import Self
 
@@ -9,6 +13,97 @@ from common.constant import HttpStatusConstant
 
 T = TypeVar('T')
 
+# 响应模型校验（ORM对象转换为响应数据）期间为True，用于检测序列化时触发的懒加载
+CTX_SERIALIZING: contextvars.ContextVar[bool] = contextvars.ContextVar('response-serializing', default=False)
+
+
+class ModelCache:
+    """
+    泛型响应模型的类缓存，加锁保证同一参数化只创建一次，超出容量时按LRU淘汰
+
+    pydantic自带的参数化缓存只弱引用模型类，服务中临时参数化的模型可能被回收后在下次请求时重新创建；
+    这里强引用并限制数量。被淘汰的模型类仍可被已注册的路由继续使用，再次参数化时重新创建
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        # 模型创建过程中可能嵌套参数化其他泛型模型，使用可重入锁
+        self._lock = threading.RLock()
+        self._models: OrderedDict[Hashable, type[BaseModel]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], type[BaseModel]]) -> type[BaseModel]:
+        """
+        获取缓存的模型类，不存在时调用factory创建
+
+        :param key: 缓存键，通常为 (泛型模型, 参数)
+        :param factory: 模型创建函数
+        :return: 模型类
+        """
+        try:
+            hash(key)
+        except TypeError:
+            return factory()
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+            model = factory()
+            self._models[key] = model
+            while len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def warm_up(self, specs: Iterable[tuple[Any, Any]]) -> int:
+        """
+        预先创建泛型响应模型，避免首个请求承担模型创建开销
+
+        :param specs: (泛型模型, 参数) 列表，如 (DataResponseModel, User)
+        :return: 预热的模型数量
+        """
+        count = 0
+        for generic_model, item in specs:
+            model = generic_model[item]
+            if not model.__pydantic_complete__:
+                model.model_rebuild()
+            count += 1
+        return count
+
+    def info(self) -> dict[str, Any]:
+        """
+        获取缓存状态
+
+        :return: 缓存状态字典
+        """
+        with self._lock:
+            return {
+                'size': len(self._models),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'models': [model.__name__ for model in self._models.values()],
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+# common/vo.py 中所有泛型响应模型共享的模型类缓存
+generic_model_cache = ModelCache(max_size=1024)
+
+
+def _parametrize(cls: type[BaseModel], item: Any) -> type[BaseModel]:
+    # 直接调用pydantic的参数化实现，多继承的泛型模型（如PageResponseModel）只经过一次缓存
+    return BaseModel.__dict__['__class_getitem__'].__func__(cls, item)
+
 
 class CrudResponseModel(BaseModel):
     """
@@ -30,6 +125,24 @@ class ResponseBaseModel(BaseModel):
     success: bool = Field(default=True, description='响应是否成功')
     time: datetime = Field(default_factory=datetime.now, description='响应时间')
 
+    def __class_getitem__(cls, item: Any) -> Any:
+        """
+        泛型参数化经由共享的模型类缓存
+        """
+        return generic_model_cache.get_or_create((cls, item), lambda: _parametrize(cls, item))
+
+    @model_validator(mode='wrap')
+    @classmethod
+    def serialization_scope(cls, data: Any, handler: ModelWrapValidatorHandler[Self]) -> Self:
+        """
+        标记响应数据的转换范围
+        """
+        token = CTX_SERIALIZING.set(True)
+        try:
+            return handler(data)
+        finally:
+            CTX_SERIALIZING.reset(token)
+
 
 class DynamicResponseModel(ResponseBaseModel, Generic[T]):
     """
@@ -42,16 +155,16 @@ class DynamicResponseModel(ResponseBaseModel, Generic[T]):
         """
         当使用 DynamicResponseModel[Item] 语法时，动态创建一个包含所有字段的新模型
         """
-        # 检查是否已经为该类型创建了模型
-        if not hasattr(cls, '_cached_models'):
-            cls._cached_models = {}
-
-        if item in cls._cached_models:
-            return cls._cached_models[item]
-
         # 检查item是否为Pydantic模型
         if not hasattr(item, 'model_fields'):
             raise TypeError(f'{item} 不是一个Pydantic模型，请使用Pydantic模型作为泛型参数')
+        return generic_model_cache.get_or_create((cls, item), lambda: cls._create_model(item))
+
+    @classmethod
+    def _create_model(cls, item: Any) -> type[BaseModel]:
+        """
+        创建包含响应基础字段与泛型模型所有字段的新模型
+        """
 
         # 获取ResponseBaseModel的字段
         base_fields = {}
@@ -67,28 +180,30 @@ class DynamicResponseModel(ResponseBaseModel, Generic[T]):
         all_fields = {**base_fields, **item_fields}
 
         # 动态创建新模型
-        new_model = create_model(
+        return create_model(
             f'DynamicResponseModel[{item.__name__}]', __base__=cls, __config__=cls.model_config, **all_fields
         )
 
-        # 缓存模型
-        cls._cached_models[item] = new_model
-
-        return new_model
-
 
 class PageModel(BaseModel, Generic[T]):
     """
     分页模型
     """
 
-    model_config = ConfigDict(alias_generator=to_camel)
+    model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
+
+    def __class_getitem__(cls, item: Any) -> Any:
+        """
+        泛型参数化经由共享的模型类缓存
+        """
+        return generic_model_cache.get_or_create((cls, item), lambda: _parametrize(cls, item))
 
-    rows: list[T] = Field(description='记录列表')
-    page_num: int = Field(description='当前页码')
-    page_size: int = Field(description='每页记录数')
-    total: int = Field(description='总记录数')
-    has_next: bool = Field(description='是否有下一页')
+    rows: list[T] = Field(default_factory=list, description='记录列表')
+    page_num: int = Field(default=1, description='当前页码')
+    page_size: int = Field(default=0, description='每页记录数')
+    total: Optional[int] = Field(default=None, description='总记录数，未要求统计时为空')
+    has_next: bool = Field(default=False, description='是否有下一页')
+    next_cursor: Optional[str] = Field(default=None, description='下一页游标，无下一页时为空')
 
 
 class PageResponseModel(PageModel, ResponseBaseModel, Generic[T]):
@@ -102,4 +217,4 @@ class DataResponseModel(ResponseBaseModel, Generic[T]):
     数据响应模型
     """
 
-    data: T = Field(description='响应数据')
+    data: Optional[T] = Field(default=None, description='响应数据，失败时为空')
@@ -0,0 +1,226 @@
+import os
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class DataBaseSettings(BaseModel):
+    """
+    数据库配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    db_url: str = Field(default=os.getenv('DB_URL', 'sqlite:///./test.db'), description='同步数据库连接地址')
+    db_async_url: str = Field(
+        default=os.getenv('DB_ASYNC_URL', ''), description='异步数据库连接地址，为空时根据db_url推导'
+    )
+    db_async: bool = Field(default=os.getenv('DB_ASYNC', 'false'), description='是否启用异步数据库访问模式')
+    db_echo: bool = Field(default=os.getenv('DB_ECHO', 'false'), description='是否打印全部SQL语句（仅用于开发调试）')
+    db_slow_query_ms: float = Field(
+        default=os.getenv('DB_SLOW_QUERY_MS', '200'), description='慢查询阈值（毫秒），超过该耗时的语句记录日志'
+    )
+    db_query_sample_rate: float = Field(
+        default=os.getenv('DB_QUERY_SAMPLE_RATE', '0'), description='未达慢查询阈值语句的采样记录比例（0~1）'
+    )
+    db_lazy_load_guard: Literal['off', 'warn', 'raise'] = Field(
+        default=os.getenv('DB_LAZY_LOAD_GUARD', 'off'), description='响应序列化期间触发懒加载时的处理方式（开发/测试环境使用）'
+    )
+    db_batch_chunk_size: int = Field(default=os.getenv('DB_BATCH_CHUNK_SIZE', '1000'), description='批量写入时每次提交的记录数')
+    db_batch_max_size: int = Field(default=os.getenv('DB_BATCH_MAX_SIZE', '100000'), description='单次批量请求允许的最大记录数')
+    db_export_chunk_size: int = Field(
+        default=os.getenv('DB_EXPORT_CHUNK_SIZE', '1000'), description='流式导出时每批从数据库读取并写出的记录数'
+    )
+    db_entity_cache_ttl: float = Field(
+        default=os.getenv('DB_ENTITY_CACHE_TTL', '0'),
+        description='按主键读取实体的进程内缓存过期时间（秒），0表示关闭（默认），多worker部署时其他worker的写入最长在TTL后可见'
+    )
+    db_entity_cache_max_size: int = Field(
+        default=os.getenv('DB_ENTITY_CACHE_MAX_SIZE', '10000'), description='实体缓存最大条目数，超出后按LRU淘汰'
+    )
+    db_pool_size: int = Field(default=os.getenv('DB_POOL_SIZE', '5'), description='连接池常驻连接数')
+    db_max_overflow: int = Field(default=os.getenv('DB_MAX_OVERFLOW', '10'), description='连接池允许溢出的连接数')
+    db_pool_timeout: float = Field(default=os.getenv('DB_POOL_TIMEOUT', '30'), description='获取连接的等待超时时间（秒）')
+    db_pool_recycle: int = Field(default=os.getenv('DB_POOL_RECYCLE', '3600'), description='连接回收时间（秒）')
+    db_pool_pre_ping: bool = Field(default=os.getenv('DB_POOL_PRE_PING', 'true'), description='取出连接前是否探活')
+    db_write_coalesce: bool = Field(
+        default=os.getenv('DB_WRITE_COALESCE', 'false'),
+        description='将并发的单条创建请求（创建用户、创建地址）合并为一次多行插入与一次提交',
+    )
+    db_write_coalesce_window_ms: float = Field(
+        default=os.getenv('DB_WRITE_COALESCE_WINDOW_MS', '2'), description='合并写入时第一个请求等待其他请求加入的最长时间（毫秒）'
+    )
+    db_write_coalesce_max_rows: int = Field(
+        default=os.getenv('DB_WRITE_COALESCE_MAX_ROWS', '100'), description='合并写入每批最多记录数，达到后立即写入'
+    )
+    db_replica_urls: str = Field(
+        default=os.getenv('DB_REPLICA_URLS', ''), description='只读副本的同步数据库连接地址，逗号分隔，为空时读写都走主库'
+    )
+    db_replica_async_urls: str = Field(
+        default=os.getenv('DB_REPLICA_ASYNC_URLS', ''), description='只读副本的异步数据库连接地址，逗号分隔，为空时根据db_replica_urls推导'
+    )
+    db_replica_balance: Literal['round_robin', 'least_connections'] = Field(
+        default=os.getenv('DB_REPLICA_BALANCE', 'round_robin'), description='只读副本负载均衡方式：轮询或最少使用中会话'
+    )
+    db_shard_urls: str = Field(
+        default=os.getenv('DB_SHARD_URLS', ''),
+        description='除db_url（分片0）外其他分片的同步数据库连接地址，逗号分隔，为空时不分片',
+    )
+    db_shard_async_urls: str = Field(
+        default=os.getenv('DB_SHARD_ASYNC_URLS', ''), description='其他分片的异步数据库连接地址，逗号分隔，为空时根据db_shard_urls推导'
+    )
+    db_shard_query_workers: int = Field(
+        default=os.getenv('DB_SHARD_QUERY_WORKERS', '16'), description='同步模式下并发查询各分片的线程数'
+    )
+    db_sqlite_wal: bool = Field(
+        default=os.getenv('DB_SQLITE_WAL', 'false'),
+        description='SQLite文件数据库启用WAL模式（默认关闭）；未配置只读副本与分片时写入经单个写连接串行执行，查询使用只读连接池',
+    )
+    db_sqlite_synchronous: Literal['OFF', 'NORMAL', 'FULL', 'EXTRA'] = Field(
+        default=os.getenv('DB_SQLITE_SYNCHRONOUS', 'NORMAL'), description='SQLite的synchronous设置，WAL模式下NORMAL即可保证数据库不损坏'
+    )
+    db_sqlite_busy_timeout: int = Field(
+        default=os.getenv('DB_SQLITE_BUSY_TIMEOUT', '5000'), description='SQLite等待其他连接（进程）释放锁的超时时间（毫秒）'
+    )
+    db_sqlite_cache_size: int = Field(
+        default=os.getenv('DB_SQLITE_CACHE_SIZE', '-65536'), description='SQLite每个连接的页缓存大小，负数表示KiB'
+    )
+    db_sqlite_mmap_size: int = Field(
+        default=os.getenv('DB_SQLITE_MMAP_SIZE', '268435456'), description='SQLite内存映射读取的最大字节数，0表示关闭'
+    )
+    db_read_your_writes_seconds: float = Field(
+        default=os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5'),
+        description='客户端写入后该时间（秒）内的读请求仍走主库，保证读到自己的写入，0表示关闭',
+    )
+
+
+class CacheSettings(BaseModel):
+    """
+    响应缓存配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    cache_backend: Literal['off', 'memory', 'redis'] = Field(
+        default=os.getenv('CACHE_BACKEND', 'off'),
+        description='GET接口响应缓存后端，默认关闭；单进程部署可使用memory，多worker部署时使用redis共享'
+    )
+    cache_redis_url: str = Field(default=os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0'), description='Redis连接地址')
+    cache_prefix: str = Field(default=os.getenv('CACHE_PREFIX', 'fastapi-demo'), description='缓存键前缀')
+    cache_ttl: int = Field(default=os.getenv('CACHE_TTL', '60'), description='响应缓存默认过期时间（秒）')
+    cache_max_size: int = Field(default=os.getenv('CACHE_MAX_SIZE', '10000'), description='内存后端最大条目数，超出后按LRU淘汰')
+    cache_lock_timeout: float = Field(
+        default=os.getenv('CACHE_LOCK_TIMEOUT', '5'), description='缓存重建锁超时时间（秒），异步接口中未抢到锁的请求最多等待该时长'
+    )
+    cache_sync_lock_wait: float = Field(
+        default=os.getenv('CACHE_SYNC_LOCK_WAIT', '0.2'),
+        description='同步接口中未抢到重建锁的请求最多等待的时间（秒），超时后自行执行接口，避免线程池被等待的请求占满'
+    )
+
+
+
+class CompressionSettings(BaseModel):
+    """
+    响应压缩配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    compress_minimum_size: int = Field(
+        default=os.getenv('COMPRESS_MINIMUM_SIZE', '1000'), description='小于该字节数的非流式响应不压缩'
+    )
+    compress_encodings: str = Field(
+        default=os.getenv('COMPRESS_ENCODINGS', 'zstd,br,gzip'),
+        description='服务端支持的压缩算法及优先级，逗号分隔；br需安装brotli，zstd需安装zstandard，未安装时自动跳过',
+    )
+    compress_gzip_level: int = Field(default=os.getenv('COMPRESS_GZIP_LEVEL', '5'), ge=1, le=9, description='gzip压缩级别')
+    compress_brotli_quality: int = Field(
+        default=os.getenv('COMPRESS_BROTLI_QUALITY', '4'), ge=0, le=11, description='brotli压缩质量'
+    )
+    compress_zstd_level: int = Field(default=os.getenv('COMPRESS_ZSTD_LEVEL', '3'), ge=1, le=22, description='zstd压缩级别')
+    compress_content_types: str = Field(
+        default=os.getenv('COMPRESS_CONTENT_TYPES', 'application/json,application/x-ndjson,text/'),
+        description='允许压缩的Content-Type前缀，逗号分隔，已压缩的图片、压缩包等不在其中',
+    )
+
+
+class TraceSettings(BaseModel):
+    """
+    链路追踪配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    trace_id_generator: Literal['uuid4', 'counter', 'ulid'] = Field(
+        default=os.getenv('TRACE_ID_GENERATOR', 'ulid'),
+        description='请求ID生成方式：uuid4 每次读取系统随机数；counter 进程随机前缀 + 自增计数；ulid 毫秒时间 + 进程随机数 + 自增计数，按时间排序',
+    )
+    trace_trust_inbound_id: bool = Field(
+        default=os.getenv('TRACE_TRUST_INBOUND_ID', 'false'),
+        description='是否沿用请求头 X-Request-ID / traceparent 中的ID，默认关闭，仅在网关可信且会清洗这两个请求头时开启',
+    )
+    trace_exporter: Literal['off', 'memory', 'otlp-json'] = Field(
+        default=os.getenv('TRACE_EXPORTER', 'off'),
+        description='链路导出方式：off 不采集；memory 保存在进程内存中（测试用）；otlp-json 按行写入OTLP/JSON文件',
+    )
+    trace_export_path: str = Field(
+        default=os.getenv('TRACE_EXPORT_PATH', './logs/traces.jsonl'), description='otlp-json 导出文件路径')
+    trace_service_name: str = Field(
+        default=os.getenv('TRACE_SERVICE_NAME', 'fastapi-demo'), description='导出链路中的 service.name')
+
+class LogSettings(BaseModel):
+    """
+    日志配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    log_mode: Literal['default', 'batched'] = Field(
+        default=os.getenv('LOG_MODE', 'default'),
+        description='default 使用loguru的enqueue队列；batched 调用方线程只放入有界队列，由后台线程批量写入，队列满时丢弃而不阻塞',
+    )
+    log_format: Literal['text', 'json'] = Field(default=os.getenv('LOG_FORMAT', 'text'), description='text 文本格式；json 每行一条JSON')
+    log_rotation_mb: int = Field(default=os.getenv('LOG_ROTATION_MB', '50'), ge=1, description='日志文件轮转大小（MB）')
+    log_batch_size: int = Field(default=os.getenv('LOG_BATCH_SIZE', '512'), ge=1, description='batched 模式下每次写入的最大条数')
+    log_queue_size: int = Field(
+        default=os.getenv('LOG_QUEUE_SIZE', '10000'), ge=1, description='batched 模式下等待写入的最大条数，超出后丢弃并计数')
+    log_sample_rates: str = Field(
+        default=os.getenv('LOG_SAMPLE_RATES', ''), description='按级别采样比例，如 DEBUG=0.01,INFO=0.1，未列出的级别全部输出')
+    log_rate_limit_burst: int = Field(
+        default=os.getenv('LOG_RATE_LIMIT_BURST', '0'), ge=0, description='同一级别、同一内容的日志每个窗口内最多输出的条数，0表示不限制')
+    log_rate_limit_window: float = Field(
+        default=os.getenv('LOG_RATE_LIMIT_WINDOW', '10'), gt=0, description='重复日志限流的时间窗口（秒）')
+
+
+class RouterSettings(BaseModel):
+    """
+    路由注册配置
+    """
+
+    model_config = ConfigDict(validate_default=True)
+
+    router_discovery: Literal['scan', 'packages', 'manifest'] = Field(
+        default=os.getenv('ROUTER_DISCOVERY', 'scan'),
+        description='控制器发现方式：scan 剪枝遍历项目目录查找control目录；packages 只导入 ROUTER_PACKAGES 中的包；manifest 读取预先生成的路由清单，不扫描文件系统',
+    )
+    router_packages: str = Field(default=os.getenv('ROUTER_PACKAGES', 'control'), description='packages 模式下的控制器包，逗号分隔')
+    router_exclude_dirs: str = Field(
+        default=os.getenv('ROUTER_EXCLUDE_DIRS', 'logs,node_modules,venv'),
+        description='scan 模式下跳过的目录名，逗号分隔；隐藏目录、__pycache__、虚拟环境和不能作为包名的目录总是跳过',
+    )
+    router_manifest_path: str = Field(
+        default=os.getenv('ROUTER_MANIFEST_PATH', 'route_manifest.json'), description='路由清单路径，相对路径基于项目根目录')
+
+
+# 数据库配置实例
+DataBaseConfig = DataBaseSettings()
+# 缓存配置实例
+CacheConfig = CacheSettings()
+# 压缩配置实例
+CompressionConfig = CompressionSettings()
+# 链路追踪配置实例
+TraceConfig = TraceSettings()
+# 日志配置实例
+LogConfig = LogSettings()
+# 路由注册配置实例
+RouterConfig = RouterSettings()
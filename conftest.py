@@ -0,0 +1,54 @@
+"""
+测试共用的夹具：内存SQLite会话与数据库往返次数统计
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from entity.entity_cache import entity_cache
+from entity.models import Base
+
+
+class RoundTripCounter:
+    """
+    统计引擎上执行的语句数与提交次数
+    """
+
+    def __init__(self, engine):
+        self.statements = []
+        self.commits = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    @property
+    def round_trips(self):
+        return len(self.statements) + self.commits
+
+    def reset(self):
+        self.statements.clear()
+        self.commits = 0
+
+
+@pytest.fixture
+def session():
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    Base.metadata.create_all(engine)
+    # 实体缓存为进程级，每个用例使用独立的内存库，需清空避免串用
+    entity_cache.clear()
+    with Session(engine) as db_session:
+        db_session.counter = RoundTripCounter(engine)
+        yield db_session
+    engine.dispose()
+
+
+def measure(session, call):
+    session.counter.reset()
+    result = call()
+    return result, session.counter.round_trips
@@ -0,0 +1,60 @@
+from typing import Any, List, Optional
+from fastapi import Body, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.env import DataBaseConfig
+from entity.database import get_async_session
+from dto.schemas import Address, AddressCreate, BatchResult
+from common.router import APIRouterPro
+from common.vo import DataResponseModel, CrudResponseModel, PageResponseModel
+from utils.cache_util import response_cache
+from service.address_service import AsyncAddressService
+
+router = APIRouterPro(prefix="/addresses", tags=["addresses"], order_num=101,
+                      auto_register=DataBaseConfig.db_async, fast_response=True)
+
+
+@router.post("/users/{user_id}", summary='为用户创建地址接口',
+             description='用于为用户创建地址', response_model=DataResponseModel[Address])
+async def create_address_endpoint(user_id: int, address: AddressCreate,
+                                  session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.create_address(user_id, address, session)
+
+
+@router.post("/users/{user_id}/batch", summary='为用户批量创建地址接口',
+             description='用于为用户批量创建地址，逐条校验并分块提交，返回逐条处理结果',
+             response_model=DataResponseModel[BatchResult])
+async def batch_create_addresses_endpoint(user_id: int,
+                                          addresses: List[Any] = Body(..., description="AddressCreate列表"),
+                                          session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.batch_create_addresses(user_id, addresses, session)
+
+
+@router.get("/users/{user_id}", summary='获取用户所有地址接口',
+            description='用于获取用户所有地址', response_model=DataResponseModel[list[Address]])
+@response_cache.cached(tags=["user-addresses:{user_id}"], namespace="/addresses/users/{user_id}")
+async def list_addresses_endpoint(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.list_addresses(user_id, session)
+
+
+@router.get("/users/{user_id}/page", summary='分页获取用户地址接口',
+            description='用于按游标分页获取用户地址，传入page_num且不传cursor时退化为页码分页',
+            response_model=PageResponseModel[Address])
+async def page_addresses_endpoint(user_id: int,
+                                  page_size: int = Query(20, ge=1, le=100, description="每页记录数"),
+                                  cursor: Optional[str] = Query(None, description="上一页返回的nextCursor"),
+                                  page_num: Optional[int] = Query(None, ge=1, description="页码，仅在无游标时使用"),
+                                  with_total: bool = Query(False, description="是否返回总记录数"),
+                                  session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.page_addresses(user_id, page_size, cursor, page_num, with_total, session)
+
+
+@router.get("/{address_id}", summary='获取指定地址接口',
+            description='用于获取指定地址', response_model=DataResponseModel[Address])
+async def get_address_endpoint(address_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.get_address(address_id, session)
+
+
+@router.delete("/{address_id}", summary='删除地址接口',
+               description='用于删除地址', response_model=CrudResponseModel)
+async def delete_address_endpoint(address_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncAddressService.delete_address(address_id, session)
@@ -0,0 +1,44 @@
+from fastapi import Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from config.env import DataBaseConfig
+from entity.database import get_async_session, get_session
+from common.router import APIRouterPro
+from utils.export_util import ExportFormat
+from service.address_service import AddressService, AsyncAddressService
+from service.user_service import AsyncUserService, UserService
+
+# 导出接口很少被调用，清单模式下懒加载，首次导出时才导入本模块；
+# 排在用户、地址路由之前，避免 /users/export 被 /users/{user_id} 匹配。
+# 同步/异步实现在导入本模块时按 DB_ASYNC 选择，两者路径与参数一致，清单中的路由与auto_register不随 DB_ASYNC 变化
+router = APIRouterPro(order_num=99, auto_register=True, lazy=True)
+
+if DataBaseConfig.db_async:
+    @router.get("/users/export", tags=["users"], summary='导出用户接口',
+                description='用于以NDJSON或CSV格式流式导出所有用户及其地址', response_class=StreamingResponse)
+    async def export_users_endpoint(export_format: ExportFormat = Query("ndjson", alias="format",
+                                                                        description="导出格式：ndjson或csv"),
+                                    session: AsyncSession = Depends(get_async_session)):
+        return await AsyncUserService.export_users(export_format, session)
+
+    @router.get("/addresses/export", tags=["addresses"], summary='导出地址接口',
+                description='用于以NDJSON或CSV格式流式导出所有地址', response_class=StreamingResponse)
+    async def export_addresses_endpoint(export_format: ExportFormat = Query("ndjson", alias="format",
+                                                                            description="导出格式：ndjson或csv"),
+                                        session: AsyncSession = Depends(get_async_session)):
+        return await AsyncAddressService.export_addresses(export_format, session)
+else:
+    @router.get("/users/export", tags=["users"], summary='导出用户接口',
+                description='用于以NDJSON或CSV格式流式导出所有用户及其地址', response_class=StreamingResponse)
+    def export_users_endpoint(export_format: ExportFormat = Query("ndjson", alias="format",
+                                                                  description="导出格式：ndjson或csv"),
+                              session: Session = Depends(get_session)):
+        return UserService.export_users(export_format, session)
+
+    @router.get("/addresses/export", tags=["addresses"], summary='导出地址接口',
+                description='用于以NDJSON或CSV格式流式导出所有地址', response_class=StreamingResponse)
+    def export_addresses_endpoint(export_format: ExportFormat = Query("ndjson", alias="format",
+                                                                      description="导出格式：ndjson或csv"),
+                                  session: Session = Depends(get_session)):
+        return AddressService.export_addresses(export_format, session)
@@ -0,0 +1,20 @@
+from fastapi import Depends
+from sqlalchemy.orm import Session
+from entity.database import get_session
+from common.router import APIRouterPro
+from common.vo import DataResponseModel
+from service.health_service import HealthService
+
+router = APIRouterPro(prefix="/health", tags=["health"], order_num=1)
+
+
+@router.get("/db", summary='数据库健康检查接口',
+            description='用于检查数据库连通性并查看连接池指标', response_model=DataResponseModel[dict])
+def db_health_endpoint(session: Session = Depends(get_session)):
+    return HealthService.db_health(session)
+
+
+@router.get("/cache", summary='缓存指标接口',
+            description='用于查看按主键读取实体的缓存命中/未命中次数', response_model=DataResponseModel[dict])
+def cache_stats_endpoint():
+    return HealthService.cache_stats()
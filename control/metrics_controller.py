@@ -0,0 +1,12 @@
+from fastapi.responses import PlainTextResponse
+from common.router import APIRouterPro
+from service.health_service import HealthService
+
+router = APIRouterPro(tags=["metrics"], order_num=2)
+
+
+# 请求指标只在事件循环线程中更新，使用异步接口在同一线程中读取
+@router.get("/metrics", summary='Prometheus指标接口',
+            description='用于Prometheus抓取按路由聚合的请求耗时直方图、分位数、状态码与字节数', response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return HealthService.prometheus_metrics()
@@ -0,0 +1,79 @@
+from typing import Any, List, Optional
+from fastapi import Body, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.env import DataBaseConfig
+from entity.database import get_async_session
+from dto.schemas import BatchResult, User, UserCreate
+from common.router import APIRouterPro
+from common.vo import DataResponseModel, CrudResponseModel, PageResponseModel
+from utils.cache_util import response_cache
+from service.user_service import AsyncUserService
+
+router = APIRouterPro(prefix="/users", tags=["users"], order_num=100,
+                      auto_register=DataBaseConfig.db_async, fast_response=True)
+
+
+@router.post("/", summary='创建新用户接口',
+             description='用于创建新用户', response_model=DataResponseModel[User])
+async def create_user_endpoint(user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.create_user(user, session)
+
+
+@router.post("/batch", summary='批量创建用户接口',
+             description='用于批量创建用户，逐条校验并分块提交，返回逐条处理结果',
+             response_model=DataResponseModel[BatchResult])
+async def batch_create_users_endpoint(users: List[Any] = Body(..., description="UserCreate列表"),
+                                      session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.batch_create_users(users, session)
+
+
+@router.put("/batch", summary='批量更新用户接口',
+            description='用于批量更新用户，逐条校验并分块提交，返回逐条处理结果',
+            response_model=DataResponseModel[BatchResult])
+async def batch_update_users_endpoint(users: List[Any] = Body(..., description="UserUpdate列表"),
+                                      session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.batch_update_users(users, session)
+
+
+@router.delete("/batch", summary='批量删除用户接口',
+               description='用于批量删除用户及其地址，返回逐条处理结果',
+               response_model=DataResponseModel[BatchResult])
+async def batch_delete_users_endpoint(user_ids: List[int] = Body(..., description="用户ID列表"),
+                                      session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.batch_delete_users(user_ids, session)
+
+
+@router.get("/", summary='获取所有用户接口',
+            description='用于获取所有用户', response_model=DataResponseModel[list[User]])
+async def list_users_endpoint(session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.list_users(session)
+
+
+@router.get("/page", summary='分页获取用户接口',
+            description='用于按游标分页获取用户，传入page_num且不传cursor时退化为页码分页',
+            response_model=PageResponseModel[User])
+async def page_users_endpoint(page_size: int = Query(20, ge=1, le=100, description="每页记录数"),
+                              cursor: Optional[str] = Query(None, description="上一页返回的nextCursor"),
+                              page_num: Optional[int] = Query(None, ge=1, description="页码，仅在无游标时使用"),
+                              with_total: bool = Query(False, description="是否返回总记录数"),
+                              session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.page_users(page_size, cursor, page_num, with_total, session)
+
+
+@router.get("/{user_id}", summary='获取指定用户接口',
+            description='用于获取指定用户', response_model=DataResponseModel[User])
+@response_cache.cached(tags=["user:{user_id}"], namespace="/users/{user_id}")
+async def get_user_endpoint(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.get_user(user_id, session)
+
+
+@router.put("/{user_id}", summary='更新用户信息接口',
+            description='用于更新用户信息', response_model=DataResponseModel[User])
+async def update_user_endpoint(user_id: int, user: UserCreate, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.update_user(user_id, user, session)
+
+
+@router.delete("/{user_id}", summary='删除用户接口',
+               description='用于删除用户', response_model=CrudResponseModel)
+async def delete_user_endpoint(user_id: int, session: AsyncSession = Depends(get_async_session)):
+    return await AsyncUserService.delete_user(user_id, session)
@@ -51,6 +51,10 @@ class UserCreate(UserBase):
     pass
 
 
+class UserUpdate(UserBase):
+    id: int = Field(..., description="用户ID")
+
+
 class User(UserBase):
     id: int
     addresses: List[Address] = []
@@ -60,3 +64,17 @@ class User(UserBase):
         "str_strip_whitespace": True,
         "validate_assignment": True
     }
+
+
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="请求列表中的下标")
+    success: bool = Field(..., description="是否成功")
+    id: Optional[int] = Field(None, description="记录ID")
+    msg: Optional[str] = Field(None, description="失败原因")
+
+
+class BatchResult(BaseModel):
+    total: int = Field(..., description="提交的记录数")
+    success_count: int = Field(..., description="成功的记录数")
+    failure_count: int = Field(..., description="失败的记录数")
+    items: List[BatchItemResult] = Field(default_factory=list, description="逐条处理结果")
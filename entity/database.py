@@ -1,19 +1,184 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from typing import Any, Optional
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from config.env import DataBaseConfig
 from .models import Base
+from .lazy_load_guard import register_lazy_load_guard
+from .query_logger import register_query_logger
+from .query_tracer import register_query_tracer
+from .pool_metrics import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, instrument_pool
+from .routing_session import ReplicaSet, RoutingSession
+from .sharding import UserShardedSession, init_shard
+from .sqlite_profile import WRITER_POOL_OPTIONS, is_sqlite_file, register_sqlite_profile
+
+# 同步驱动与异步驱动的对应关系
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'mysql': 'mysql+aiomysql',
+    'mysql+pymysql': 'mysql+aiomysql',
+}
+
+
+def get_async_url(url: str) -> str:
+    """
+    根据同步数据库连接地址推导异步数据库连接地址
+
+    :param url: 同步数据库连接地址
+    :return: 异步数据库连接地址
+    """
+    sync_url = make_url(url)
+    async_driver = ASYNC_DRIVERS.get(sync_url.drivername, sync_url.drivername)
+    return sync_url.set(drivername=async_driver).render_as_string(hide_password=False)
+
+
+def get_pool_options(url: str, poolclass: type) -> dict[str, Any]:
+    """
+    根据数据库配置生成连接池参数，SQLite内存库使用SQLAlchemy默认的单连接池
+
+    :param url: 数据库连接地址
+    :param poolclass: 连接池类型
+    :return: create_engine的连接池参数
+    """
+    if make_url(url).get_backend_name() == 'sqlite' and not is_sqlite_file(url):
+        return {}
+    return {
+        'poolclass': poolclass,
+        'pool_size': DataBaseConfig.db_pool_size,
+        'max_overflow': DataBaseConfig.db_max_overflow,
+        'pool_timeout': DataBaseConfig.db_pool_timeout,
+        'pool_recycle': DataBaseConfig.db_pool_recycle,
+        'pool_pre_ping': DataBaseConfig.db_pool_pre_ping,
+    }
+
+
+def create_db_engine(url: str, name: str = 'primary', read_only: bool = False, **kwargs: Any) -> Engine:
+    """
+    按数据库配置创建同步引擎，并为连接池注册指标采集、为语句注册慢查询日志与链路span采集
+
+    :param url: 数据库连接地址
+    :param name: 引擎名称，用于区分指标
+    :param read_only: 是否为SQLite只读连接池
+    :param kwargs: 透传给create_engine的其他参数
+    :return: 同步引擎
+    """
+    options = {'echo': DataBaseConfig.db_echo, **get_pool_options(url, InstrumentedQueuePool), **kwargs}
+    db_engine = create_engine(url, **options)
+    if DataBaseConfig.db_sqlite_wal and is_sqlite_file(url):
+        register_sqlite_profile(db_engine, read_only)
+    instrument_pool(name, db_engine.pool)
+    register_query_logger(db_engine)
+    register_query_tracer(db_engine)
+    return db_engine
+
+
+def create_async_db_engine(url: str, name: str = 'primary-async', read_only: bool = False,
+                           **kwargs: Any) -> AsyncEngine:
+    """
+    按数据库配置创建异步引擎，并为连接池注册指标采集、为语句注册慢查询日志与链路span采集
+
+    :param url: 异步数据库连接地址
+    :param name: 引擎名称，用于区分指标
+    :param read_only: 是否为SQLite只读连接池
+    :param kwargs: 透传给create_async_engine的其他参数
+    :return: 异步引擎
+    """
+    options = {'echo': DataBaseConfig.db_echo, **get_pool_options(url, InstrumentedAsyncAdaptedQueuePool), **kwargs}
+    db_engine = create_async_engine(url, **options)
+    if DataBaseConfig.db_sqlite_wal and is_sqlite_file(url):
+        register_sqlite_profile(db_engine.sync_engine, read_only)
+    instrument_pool(name, db_engine.sync_engine.pool)
+    register_query_logger(db_engine.sync_engine)
+    register_query_tracer(db_engine.sync_engine)
+    return db_engine
+
 
 # 使用SQLite数据库进行本地开发
-DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(DATABASE_URL, echo=True,
-                       pool_pre_ping=True, pool_recycle=3600)
+DATABASE_URL = DataBaseConfig.db_url
+ASYNC_DATABASE_URL = DataBaseConfig.db_async_url or get_async_url(DATABASE_URL)
+REPLICA_URLS = [url.strip() for url in DataBaseConfig.db_replica_urls.split(',') if url.strip()]
+SHARD_URLS = [url.strip() for url in DataBaseConfig.db_shard_urls.split(',') if url.strip()]
+
+# SQLite生产配置（DB_SQLITE_WAL=true 时开启）：WAL模式下写入经单个写连接串行执行，查询使用同一数据库文件的只读连接池；配置了只读副本或分片时不启用
+SQLITE_PROFILE = (
+    DataBaseConfig.db_sqlite_wal and is_sqlite_file(DATABASE_URL) and is_sqlite_file(ASYNC_DATABASE_URL)
+    and not REPLICA_URLS and not SHARD_URLS
+)
+writer_options = WRITER_POOL_OPTIONS if SQLITE_PROFILE else {}
+engine = create_db_engine(DATABASE_URL, **writer_options)
+
+# 只读副本，允许读副本的请求中查询语句发往副本，写入始终走主库
+if SQLITE_PROFILE:
+    replica_engines = [create_db_engine(DATABASE_URL, name='sqlite-reader', read_only=True)]
+else:
+    replica_engines = [create_db_engine(url, name=f'replica-{index}') for index, url in enumerate(REPLICA_URLS)]
+replica_set = ReplicaSet(replica_engines, DataBaseConfig.db_replica_balance, consistent=SQLITE_PROFILE)
+
+# 按用户水平分片，DB_URL为分片0；启用分片时不使用只读副本
+shard_engines = [engine, *(create_db_engine(url, name=f'shard-{index}') for index, url in enumerate(SHARD_URLS, 1))]
+if SHARD_URLS:
+    UserShardedSession.configure_fan_out(DataBaseConfig.db_shard_query_workers)
+
+# 异步引擎，仅 DB_ASYNC=true 时创建并由控制器使用异步会话，同步模式下无需安装异步驱动
+ASYNC_REPLICA_URLS = (
+    [url.strip() for url in DataBaseConfig.db_replica_async_urls.split(',') if url.strip()]
+    or [get_async_url(url) for url in REPLICA_URLS]
+)
+ASYNC_SHARD_URLS = (
+    [url.strip() for url in DataBaseConfig.db_shard_async_urls.split(',') if url.strip()]
+    or [get_async_url(url) for url in SHARD_URLS]
+)
+async_engine: Optional[AsyncEngine] = None
+async_replica_engines: list[AsyncEngine] = []
+async_shard_engines: list[AsyncEngine] = []
+AsyncSessionLocal: Optional[async_sessionmaker[AsyncSession]] = None
+if DataBaseConfig.db_async:
+    async_engine = create_async_db_engine(ASYNC_DATABASE_URL, **writer_options)
+    if SQLITE_PROFILE:
+        async_replica_engines = [create_async_db_engine(ASYNC_DATABASE_URL, name='sqlite-reader-async', read_only=True)]
+    else:
+        async_replica_engines = [
+            create_async_db_engine(url, name=f'replica-{index}-async') for index, url in enumerate(ASYNC_REPLICA_URLS)
+        ]
+    async_shard_engines = [
+        async_engine,
+        *(create_async_db_engine(url, name=f'shard-{index}-async') for index, url in enumerate(ASYNC_SHARD_URLS, 1)),
+    ]
+    if SHARD_URLS:
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False, sync_session_class=UserShardedSession,
+            shards=[shard.sync_engine for shard in async_shard_engines])
+    else:
+        async_replica_set = ReplicaSet(
+            [replica.sync_engine for replica in async_replica_engines], DataBaseConfig.db_replica_balance,
+            consistent=SQLITE_PROFILE)
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine, class_=AsyncSession, expire_on_commit=False, sync_session_class=RoutingSession,
+            replicas=async_replica_set)
+
+# 开发/测试环境下检测响应序列化期间的懒加载（N+1查询）
+register_lazy_load_guard(DataBaseConfig.db_lazy_load_guard)
 
 
 def create_tables():
-    """创建数据库表"""
+    """创建数据库表，启用分片时在各分片建表并设置主键区间；已有的表补建索引由 python -m entity.migration 执行"""
     Base.metadata.create_all(engine)
+    if SHARD_URLS:
+        for index, shard in enumerate(shard_engines):
+            init_shard(shard, index)
 
 
 def get_session():
     """获取数据库会话"""
-    with Session(engine) as session:
+    if SHARD_URLS:
+        session = UserShardedSession(shard_engines)
+    else:
+        session = RoutingSession(engine, replicas=replica_set)
+    with session:
+        yield session
+
+
+async def get_async_session():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Hashable, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import MANYTOONE, Session, UOWTransaction
+
+from config.env import DataBaseConfig
+
+# 会话中待提交后失效的缓存键
+PENDING_KEY = 'entity_cache_pending'
+
+
+class EntityCache:
+    """
+    按主键缓存热点实体的进程内读穿缓存，支持TTL过期与LRU淘汰
+
+    缓存值为序列化后的响应数据而非ORM对象，可以跨会话安全共享。多进程部署时各进程缓存独立，
+    其他进程的写入只能依靠TTL过期感知。
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[type, Hashable], tuple[float, Any]] = OrderedDict()
+        # 每次失效递增，读穿加载期间发生失效时放弃回填，避免写入旧数据
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def get(self, model: type, ident: Hashable) -> Optional[Any]:
+        """
+        获取缓存的实体数据
+
+        :param model: ORM模型
+        :param ident: 主键
+        :return: 缓存值，未命中或已过期时返回None
+        """
+        if not self.enabled:
+            return None
+        key = (model, ident)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, model: type, ident: Hashable, value: Any, generation: int) -> None:
+        """
+        回填缓存
+
+        :param model: ORM模型
+        :param ident: 主键
+        :param value: 缓存值
+        :param generation: 开始加载前读取的 generation，加载期间发生过失效时不回填
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[(model, ident)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((model, ident))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model: type, *idents: Hashable) -> None:
+        """
+        使指定实体的缓存失效
+
+        :param model: ORM模型
+        :param idents: 主键
+        """
+        self.invalidate_keys((model, ident) for ident in idents)
+
+    def invalidate_keys(self, keys: Iterable[tuple[type, Hashable]]) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def invalidate_model(self, model: type) -> None:
+        """
+        使指定模型的全部缓存失效
+
+        :param model: ORM模型
+        """
+        with self._lock:
+            self.generation += 1
+            keys = [key for key in self._entries if key[0] is model]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        获取缓存指标快照
+
+        :return: 指标字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'ttl': self.ttl,
+                'max_size': self.max_size,
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+def _affected_keys(instance: Any) -> list[tuple[type, Hashable]]:
+    """
+    获取实例变更后需要失效的缓存键：实例自身及其多对一关联的父实体（父实体的响应中包含子集合）
+    """
+    state = inspect(instance)
+    mapper = state.mapper
+    keys = []
+    if state.identity is not None:
+        keys.append((mapper.class_, state.identity[0] if len(state.identity) == 1 else state.identity))
+    for relationship in mapper.relationships:
+        if relationship.direction is not MANYTOONE:
+            continue
+        for column in relationship.local_columns:
+            history = state.attrs[mapper.get_property_by_column(column).key].history
+            for value in (*history.unchanged, *history.added, *history.deleted):
+                if value is not None:
+                    keys.append((relationship.mapper.class_, value))
+    return keys
+
+
+def register_entity_cache_events(cache: EntityCache) -> None:
+    """
+    注册会话事件：记录工作单元中新增、修改、删除的实体，事务提交后使对应缓存失效，回滚时丢弃
+
+    绕过工作单元的批量 UPDATE/DELETE 语句不会触发这些事件，需由服务层在提交后显式调用 invalidate。
+    缓存关闭（默认）时事件直接返回，运行期间开启缓存（如调整ttl）后即生效
+
+    :param cache: 实体缓存
+    :return: None
+    """
+
+    @event.listens_for(Session, 'after_flush')
+    def collect_changes(session: Session, flush_context: UOWTransaction) -> None:
+        if not cache.enabled:
+            return
+        pending = session.info.setdefault(PENDING_KEY, set())
+        for instance in (*session.new, *session.dirty, *session.deleted):
+            pending.update(_affected_keys(instance))
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidate_committed(session: Session) -> None:
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending:
+            cache.invalidate_keys(pending)
+
+    @event.listens_for(Session, 'after_soft_rollback')
+    def discard_pending(session: Session, previous_transaction: Any) -> None:
+        session.info.pop(PENDING_KEY, None)
+
+
+# 进程内实体缓存实例，工作单元提交后自动失效
+entity_cache = EntityCache(DataBaseConfig.db_entity_cache_ttl, DataBaseConfig.db_entity_cache_max_size)
+register_entity_cache_events(entity_cache)
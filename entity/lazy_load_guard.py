@@ -0,0 +1,35 @@
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from common.vo import CTX_SERIALIZING
+from exceptions.exception import LazyLoadException
+from utils.log_util import logger
+
+
+def register_lazy_load_guard(mode: str) -> Optional[Callable[[ORMExecuteState], None]]:
+    """
+    注册懒加载守卫，响应序列化期间触发关联关系懒加载时告警或抛出异常
+
+    :param mode: off 关闭；warn 记录告警日志；raise 抛出LazyLoadException
+    :return: 注册的事件监听函数，可用 event.remove(Session, 'do_orm_execute', ...) 移除；关闭时返回None
+    """
+    if mode == 'off':
+        return None
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def check_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+        if not orm_execute_state.is_select:
+            return
+        state = orm_execute_state.lazy_loaded_from
+        if state is None or not CTX_SERIALIZING.get():
+            return
+        path = orm_execute_state.loader_strategy_path
+        attribute = path[-1] if path is not None and len(path) else '?'
+        message = f'响应序列化期间触发了懒加载: {state.class_.__name__}.{getattr(attribute, "key", attribute)}，请在查询中添加预加载策略'
+        if mode == 'raise':
+            raise LazyLoadException(message=message)
+        logger.warning(message)
+
+    return check_lazy_load
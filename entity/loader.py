@@ -0,0 +1,72 @@
+import typing
+from functools import lru_cache
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import ORMExecuteState, Session, joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+
+def _find_schema(annotation: Any) -> Optional[type[BaseModel]]:
+    """
+    从字段注解（如 List[Address]、Optional[Address]）中找出嵌套的Pydantic模型
+
+    :param annotation: 字段注解
+    :return: Pydantic模型，不存在时返回None
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        schema = _find_schema(arg)
+        if schema is not None:
+            return schema
+    return None
+
+
+def _build_options(model: type, schema: type[BaseModel], single: bool, depth: int) -> list[LoaderOption]:
+    relationships = inspect(model).relationships
+    options = []
+    for name, field in schema.model_fields.items():
+        relationship = relationships.get(name)
+        if relationship is None:
+            continue
+        attr = getattr(model, name)
+        # 单条查询的顶层关联使用joinedload合并为一次查询，列表查询的集合使用selectinload避免笛卡尔积
+        if (single and depth == 0) or not relationship.uselist:
+            option = joinedload(attr)
+        else:
+            option = selectinload(attr)
+        nested_schema = _find_schema(field.annotation)
+        if nested_schema is not None:
+            nested = _build_options(relationship.mapper.class_, nested_schema, single, depth + 1)
+            if nested:
+                option = option.options(*nested)
+        options.append(option)
+    return options
+
+
+@lru_cache(maxsize=None)
+def loader_options(model: type, schema: type[BaseModel], single: bool = False) -> tuple[LoaderOption, ...]:
+    """
+    根据响应模型实际需要的字段，为ORM模型的关联关系生成预加载策略，避免序列化时触发N+1懒加载
+
+    :param model: ORM模型
+    :param schema: 响应数据的Pydantic模型
+    :param single: 是否为单条记录查询，单条查询使用joinedload，列表查询使用selectinload
+    :return: 可直接传给 select().options() 的加载策略
+    """
+    return tuple(_build_options(model, schema, single, 0))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def strip_relationship_load_yield_per(orm_execute_state: ORMExecuteState) -> None:
+    """
+    注册了do_orm_execute事件（如懒加载守卫）时，SQLAlchemy会把顶层查询的yield_per传给selectinload的关联查询，
+    关联查询对结果去重（unique）与yield_per冲突而报错；关联查询本身已按顶层批次执行，去掉该选项即可
+
+    :param orm_execute_state: ORM执行状态
+    :return: None
+    """
+    if orm_execute_state.is_relationship_load and orm_execute_state.execution_options.get('yield_per'):
+        orm_execute_state.update_execution_options(yield_per=None)
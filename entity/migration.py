@@ -0,0 +1,56 @@
+"""
+数据库迁移：为已存在的表补建模型中新增的索引。大表建索引耗时较长且多个worker同时执行会互相冲突，
+因此不在应用启动时执行，升级后在启动应用前运行一次
+
+运行方式:
+    python -m entity.migration
+"""
+from sqlalchemy import Engine, inspect
+from sqlalchemy.exc import DBAPIError
+
+from utils.log_util import logger
+from .models import Base
+
+
+def ensure_indexes(engine: Engine) -> list[str]:
+    """
+    为已存在的表补建模型中声明但数据库中缺少的索引。create_all 只创建缺少的表，不会为已有的表添加后来声明的索引；
+    已有索引的列与模型中索引的列相同或以其为前缀时视为已存在（如MySQL为外键自动创建的索引），不重复创建
+
+    :param engine: 同步引擎
+    :return: 新建的索引名称
+    """
+    inspector = inspect(engine)
+    table_names = set(inspector.get_table_names())
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names or not table.indexes:
+            continue
+        existing = [index['column_names'] for index in inspector.get_indexes(table.name)]
+        for index in sorted(table.indexes, key=lambda item: item.name):
+            columns = [column.name for column in index.columns]
+            if any(names[:len(columns)] == columns for names in existing):
+                continue
+            try:
+                index.create(engine)
+            except DBAPIError:
+                # 同时运行的其他迁移已创建同名索引
+                if index.name not in {item['name'] for item in inspect(engine).get_indexes(table.name)}:
+                    raise
+                continue
+            existing.append(columns)
+            created.append(index.name)
+            logger.info(f'已为{table.name}表补建索引{index.name}({", ".join(columns)})')
+    return created
+
+
+def main() -> None:
+    from entity.database import create_tables, shard_engines
+
+    create_tables()
+    created = [name for shard in shard_engines for name in ensure_indexes(shard)]
+    print(f'✅ 已补建 {len(created)} 个索引')
+
+
+if __name__ == '__main__':
+    main()
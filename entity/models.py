@@ -12,7 +12,7 @@ class User(Base):
     __tablename__ = "user_account"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(30))
+    name: Mapped[str] = mapped_column(String(30), index=True)
     fullname: Mapped[Optional[str]] = mapped_column(String(50), default=None)
 
     addresses: Mapped[List["Address"]] = relationship(
@@ -33,7 +33,8 @@ class Address(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     email_address: Mapped[str] = mapped_column(String(100))
-    user_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"))
+    # 按用户查询地址与加载User.addresses时使用；二级索引隐含主键，按用户过滤并按id排序分页也可直接使用该索引
+    user_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"), index=True)
 
     user: Mapped["User"] = relationship(back_populates="addresses")
 
@@ -0,0 +1,166 @@
+import bisect
+import threading
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# 等待连接耗时直方图的桶上界（秒）
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """
+    连接池指标，记录取出/归还次数、等待连接耗时分布与获取连接超时次数
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_sum = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe_wait(self, seconds: float) -> None:
+        """
+        记录一次获取连接的等待耗时
+
+        :param seconds: 等待耗时（秒）
+        """
+        index = bisect.bisect_left(WAIT_BUCKETS, seconds)
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum += seconds
+            self.wait_buckets[index] += 1
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        获取当前指标快照
+
+        :return: 指标字典
+        """
+        pool = self.pool
+        status = {}
+        if isinstance(pool, QueuePool):
+            status = {
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'timeout': pool.timeout(),
+            }
+        with self._lock:
+            cumulative = 0
+            histogram = {}
+            for upper, count in zip((*WAIT_BUCKETS, float('inf')), self.wait_buckets):
+                cumulative += count
+                histogram['+Inf' if upper == float('inf') else str(upper)] = cumulative
+            return {
+                'name': self.name,
+                'pool': type(pool).__name__ if pool is not None else None,
+                **status,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'checkout_timeouts': self.timeouts,
+                'wait_seconds': {
+                    'count': self.wait_count,
+                    'sum': round(self.wait_sum, 6),
+                    'max': round(self.wait_max, 6),
+                    'buckets': histogram,
+                },
+            }
+
+
+# 所有已注册引擎的连接池指标，键为引擎名称
+pool_metrics_registry: dict[str, PoolMetrics] = {}
+
+
+class _InstrumentedPoolMixin:
+    """
+    统计获取连接等待耗时与超时次数的连接池混入类
+    """
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self) -> Any:
+        metrics = self.metrics
+        if metrics is None:
+            return super()._do_get()
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with metrics._lock:
+                metrics.timeouts += 1
+            raise
+        finally:
+            metrics.observe_wait(time.perf_counter() - start)
+
+    def recreate(self) -> Pool:
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = new_pool
+        return new_pool
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """
+    带等待耗时统计的QueuePool
+    """
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """
+    带等待耗时统计的AsyncAdaptedQueuePool
+    """
+
+
+def instrument_pool(name: str, pool: Pool) -> PoolMetrics:
+    """
+    为连接池注册事件监听并加入指标注册表
+
+    :param name: 引擎名称
+    :param pool: 连接池对象
+    :return: 连接池指标
+    """
+    metrics = PoolMetrics(name)
+    metrics.pool = pool
+    if isinstance(pool, _InstrumentedPoolMixin):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, 'connect')
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        with metrics._lock:
+            metrics.connects += 1
+
+    @event.listens_for(pool, 'checkout')
+    def on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        with metrics._lock:
+            metrics.checkouts += 1
+
+    @event.listens_for(pool, 'checkin')
+    def on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        with metrics._lock:
+            metrics.checkins += 1
+
+    @event.listens_for(pool, 'invalidate')
+    def on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Optional[BaseException]) -> None:
+        with metrics._lock:
+            metrics.invalidations += 1
+
+    pool_metrics_registry[name] = metrics
+    return metrics
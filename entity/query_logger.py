@@ -0,0 +1,81 @@
+import random
+import time
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from config.env import DataBaseConfig
+from utils.log_util import logger
+
+# 日志中参数的最大长度，避免批量语句的参数撑爆日志
+MAX_PARAMS_LENGTH = 500
+
+
+class QueryLogger:
+    """
+    基于引擎事件的SQL日志记录器，仅记录慢查询以及按比例采样的普通查询
+    """
+
+    def __init__(self, slow_query_ms: float, sample_rate: float) -> None:
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.sample_rate = sample_rate
+
+    def before_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        start_times = conn.info.get('query_start_time')
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        if elapsed >= self.slow_query_seconds:
+            logger.warning(self.format_entry('慢查询', elapsed, statement, parameters))
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            logger.info(self.format_entry('SQL采样', elapsed, statement, parameters))
+
+    def handle_error(self, exception_context: Any) -> None:
+        # 语句执行失败时不会触发 after_cursor_execute，在此取出开始时间，避免其残留在连接上错配给后续语句
+        connection = exception_context.connection
+        if connection is None or exception_context.statement is None:
+            return
+        start_times = connection.info.get('query_start_time')
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        if elapsed >= self.slow_query_seconds:
+            logger.warning(self.format_entry(
+                '慢查询（执行失败）', elapsed, exception_context.statement, exception_context.parameters))
+
+    @staticmethod
+    def format_entry(title: str, elapsed: float, statement: str, parameters: Any) -> str:
+        """
+        格式化日志内容，trace_id由日志过滤器注入
+
+        :param title: 日志标题
+        :param elapsed: 语句耗时（秒）
+        :param statement: SQL语句
+        :param parameters: SQL参数
+        :return: 日志内容
+        """
+        params = repr(parameters)
+        if len(params) > MAX_PARAMS_LENGTH:
+            params = f'{params[:MAX_PARAMS_LENGTH]}...'
+        return f'{title} {elapsed * 1000:.2f}ms: {" ".join(statement.split())} | 参数: {params}'
+
+
+def register_query_logger(engine: Engine) -> QueryLogger:
+    """
+    为引擎注册SQL日志记录器，异步引擎需传入其sync_engine
+
+    :param engine: 同步引擎
+    :return: SQL日志记录器
+    """
+    query_logger = QueryLogger(DataBaseConfig.db_slow_query_ms, DataBaseConfig.db_query_sample_rate)
+    event.listen(engine, 'before_cursor_execute', query_logger.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', query_logger.after_cursor_execute)
+    event.listen(engine, 'handle_error', query_logger.handle_error)
+    return query_logger
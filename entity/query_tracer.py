@@ -0,0 +1,111 @@
+import hashlib
+import re
+import time
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import Engine, event
+
+from middlewares.trace_middleware.tracer import CTX_SPAN, SPAN_KIND_CLIENT, STATUS_ERROR, TraceSpan
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+# 各驱动的参数占位符：? / %s / %(name)s / :name
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|(?<!:):\w+|\?')
+# IN (?, ?, ?) 与多行 VALUES (?), (?) 的长度随参数个数变化，折叠为一个
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_VALUES_ROWS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+_WHITESPACE = re.compile(r'\s+')
+_TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+[`"\[]?(\w+)', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_statement(statement: str) -> tuple[str, str, str]:
+    """
+    生成语句指纹：去掉字面量与参数个数差异后的语句相同即视为同一类查询，用于按指纹聚合慢查询与查询扇出
+
+    :param statement: 发往数据库的SQL语句
+    :return: (span名称, 归一化后的语句, 指纹)，span名称如 SELECT users
+    """
+    normalized = _STRING.sub('?', statement)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _PLACEHOLDER_LIST.sub('?', normalized)
+    normalized = _VALUES_ROWS.sub('(?)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    operation = normalized.split(' ', 1)[0].upper()
+    table = _TABLE.search(normalized)
+    name = f'{operation} {table.group(1)}' if table is not None else operation
+    return name, normalized, hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+class QueryTracer:
+    """
+    基于引擎事件的数据库span采集器：请求处于链路采集中时，每条语句记录为当前span的子span
+    """
+
+    def before_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        if CTX_SPAN.get() is not None:
+            conn.info.setdefault('trace_span_start', []).append(time.time_ns())
+
+    def after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        span = self.start_span(conn, statement, parameters, executemany)
+        if span is None:
+            return
+        # DML为影响行数；SELECT只有预先缓冲结果的驱动（如pymysql）能给出行数，SQLite为-1时不记录
+        rowcount = cursor.rowcount
+        if rowcount is not None and rowcount >= 0:
+            span.attributes['db.response.rows'] = rowcount
+        span.end()
+
+    def handle_error(self, exception_context: Any) -> None:
+        if exception_context.connection is None or exception_context.statement is None:
+            return
+        span = self.start_span(
+            exception_context.connection, exception_context.statement, exception_context.parameters,
+            exception_context.execution_context is not None and exception_context.execution_context.executemany)
+        if span is None:
+            return
+        span.status_code = STATUS_ERROR
+        span.attributes['error.type'] = type(exception_context.original_exception).__name__
+        span.end()
+
+    @staticmethod
+    def start_span(conn: Any, statement: str, parameters: Any, executemany: bool) -> Optional[TraceSpan]:
+        """
+        以 before_cursor_execute 记录的开始时间创建语句span
+
+        :return: 语句span，不在链路采集中时返回None
+        """
+        parent = CTX_SPAN.get()
+        start_times = conn.info.get('trace_span_start')
+        if parent is None or not start_times:
+            return None
+        name, normalized, fingerprint = fingerprint_statement(statement)
+        attributes = {
+            'db.system.name': conn.dialect.name,
+            'db.query.text': normalized,
+            'db.query.fingerprint': fingerprint,
+        }
+        if executemany:
+            attributes['db.operation.batch.size'] = len(parameters)
+        return parent.trace.start_span(
+            name, SPAN_KIND_CLIENT, parent=parent, start_time_ns=start_times.pop(), attributes=attributes)
+
+
+def register_query_tracer(engine: Engine) -> QueryTracer:
+    """
+    为引擎注册数据库span采集，异步引擎需传入其sync_engine
+
+    :param engine: 同步引擎
+    :return: 数据库span采集器
+    """
+    query_tracer = QueryTracer()
+    event.listen(engine, 'before_cursor_execute', query_tracer.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', query_tracer.after_cursor_execute)
+    event.listen(engine, 'handle_error', query_tracer.handle_error)
+    return query_tracer
@@ -0,0 +1,97 @@
+import threading
+from contextvars import ContextVar
+from typing import Any, Literal, Optional, Sequence
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.sql.dml import UpdateBase
+
+# 当前请求是否允许从只读副本读取，由只读副本路由中间件按请求方法与最近写入时间设置；默认读写都走主库
+CTX_USE_REPLICA: ContextVar[bool] = ContextVar('use_replica', default=False)
+
+
+class ReplicaSet:
+    """
+    只读副本集合，为每个会话选择一个副本：round_robin 依次轮流，least_connections 选择当前使用中会话最少的副本。
+
+    consistent 表示副本与主库之间没有复制延迟（如SQLite WAL模式下同一数据库文件的只读连接池），
+    此时不区分请求方法，所有查询都可以发往副本，会话的写事务结束后查询也回到副本
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        strategy: Literal['round_robin', 'least_connections'] = 'round_robin',
+        consistent: bool = False,
+    ) -> None:
+        self.engines = list(engines)
+        self.strategy = strategy
+        self.consistent = consistent
+        self.active = [0] * len(self.engines)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Engine:
+        """
+        选择一个副本，使用完毕后需调用 release 归还
+
+        :return: 副本的同步引擎
+        """
+        with self._lock:
+            index = self._next
+            if self.strategy == 'least_connections':
+                # 从轮转位置开始找，使用中会话数相同的副本之间仍然轮流
+                count = len(self.engines)
+                index = min(((self._next + offset) % count for offset in range(count)), key=self.active.__getitem__)
+            self._next = (index + 1) % len(self.engines)
+            self.active[index] += 1
+            return self.engines[index]
+
+    def release(self, engine: Engine) -> None:
+        """
+        归还 acquire 选择的副本
+
+        :param engine: 副本的同步引擎
+        """
+        with self._lock:
+            self.active[self.engines.index(engine)] -= 1
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话：请求允许读副本时（见 CTX_USE_REPLICA）或副本没有复制延迟时，查询语句发往会话选定的一个只读副本，
+    flush与INSERT/UPDATE/DELETE语句始终发往主库；会话中发生写入后，其后的查询也改走主库
+    """
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper: Any = None, *, clause: Any = None, **kwargs: Any) -> Any:
+        if self.replicas is None or not self.replicas.engines or self.info.get('primary'):
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info['primary'] = True
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if not self.replicas.consistent and not CTX_USE_REPLICA.get():
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._replica is None:
+            self._replica = self.replicas.acquire()
+        return self._replica
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self.info.pop('primary', None)
+            if self._replica is not None:
+                self.replicas.release(self._replica)
+                self._replica = None
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _release_primary(session: RoutingSession, transaction: SessionTransaction) -> None:
+    # 副本没有复制延迟时，写事务提交或回滚后的查询不必再走主库
+    if transaction.parent is None and session.replicas is not None and session.replicas.consistent:
+        session.info.pop('primary', None)
@@ -0,0 +1,383 @@
+import asyncio
+import itertools
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Optional
+
+from sqlalchemy import Connection, Engine, MetaData, event, func, inspect, select, text
+from sqlalchemy.engine import FrozenResult, Result
+from sqlalchemy.ext.horizontal_shard import ShardedSession, execute_and_instances, set_shard_id
+from sqlalchemy.orm import Mapper, ORMExecuteState, Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter, BooleanClauseList, ColumnElement, Label
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.selectable import Exists
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+
+from .models import Address, Base, User
+
+# 每个分片的主键占用的位数：分片k的自增主键从 k << SHARD_ID_BITS 开始，主键右移即得到所在分片，
+# 按ID查找无需路由表；现有单库作为分片0，已有主键不受影响
+SHARD_ID_BITS = 40
+SHARDED_TABLES = (User.__table__, Address.__table__)
+# 决定数据所在分片的列：用户与地址主键都落在所在分片的ID区间内，地址与所属用户在同一分片
+SHARD_KEYS = (User.__table__.c.id, Address.__table__.c.id, Address.__table__.c.user_id)
+# 新用户的放置轮转计数，进程内各会话共享
+_placement = itertools.count()
+
+
+def shard_index(value: int, shard_count: int) -> int:
+    """
+    根据用户或地址的主键（或地址的user_id）计算所在分片
+
+    :param value: 主键值
+    :param shard_count: 分片数量
+    :return: 分片下标，超出分片范围的ID（不存在的数据）路由到分片0
+    """
+    index = int(value) >> SHARD_ID_BITS
+    return index if 0 <= index < shard_count else 0
+
+
+def init_shard(engine: Engine, index: int) -> None:
+    """
+    创建分片的表，并将自增主键的起始值设置为该分片ID区间的下限
+
+    :param engine: 分片的同步引擎
+    :param index: 分片下标
+    :return: None
+    """
+    tables = list(SHARDED_TABLES)
+    if engine.dialect.name == 'sqlite':
+        # 仅分片中的表使用AUTOINCREMENT，以便通过sqlite_sequence设置主键起始值，共享的模型定义不变
+        metadata = MetaData()
+        tables = [table.to_metadata(metadata) for table in SHARDED_TABLES]
+        for table in tables:
+            table.dialect_options['sqlite']['autoincrement'] = True
+    tables[0].metadata.create_all(engine, tables=tables)
+    floor, ceiling = index << SHARD_ID_BITS, (index + 1) << SHARD_ID_BITS
+    with engine.begin() as conn:
+        for table in SHARDED_TABLES:
+            low, high = conn.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+            if low is not None and (index and low <= floor or high >= ceiling):
+                raise ValueError(f'分片{index}的{table.name}表中存在不属于该分片ID区间的数据')
+            if not index:
+                continue
+            if conn.dialect.name == 'sqlite':
+                # 需要表使用AUTOINCREMENT，sqlite_sequence中记录的是已分配的最大ID
+                ddl = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                  {'name': table.name})
+                if 'AUTOINCREMENT' not in ddl.upper():
+                    raise ValueError(f'分片{index}的{table.name}表未使用AUTOINCREMENT，无法设置主键起始值')
+                seq = conn.scalar(text('SELECT seq FROM sqlite_sequence WHERE name = :name'), {'name': table.name})
+                if seq is None:
+                    conn.execute(text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+                                 {'name': table.name, 'seq': floor})
+                elif seq < floor:
+                    conn.execute(text('UPDATE sqlite_sequence SET seq = :seq WHERE name = :name'),
+                                 {'name': table.name, 'seq': floor})
+            elif conn.dialect.name == 'mysql':
+                # 起始值小于当前最大ID+1时MySQL会忽略
+                conn.execute(text(f'ALTER TABLE {table.name} AUTO_INCREMENT = {floor + 1}'))
+            else:
+                raise ValueError(f'不支持为{conn.dialect.name}数据库设置分片ID区间')
+
+
+def _bind_value(bind: BindParameter, params: Any) -> Any:
+    value = bind.effective_value
+    if value is None and isinstance(params, dict):
+        value = params.get(bind.key)
+    return value
+
+
+def _is_shard_key(column: Any) -> bool:
+    return isinstance(column, ColumnElement) and any(column.shares_lineage(key) for key in SHARD_KEYS)
+
+
+def criteria_shards(clause: Any, params: Any, shard_count: int) -> Optional[set[int]]:
+    """
+    从WHERE条件中找出限定分片键的条件：顶层AND连接的 分片键 = 值 / 分片键 IN (...)，以及EXISTS子查询中的此类条件
+
+    :param clause: WHERE条件
+    :param params: 执行时传入的参数
+    :param shard_count: 分片数量
+    :return: 条件限定的分片下标集合，没有限定时返回None
+    """
+    if clause is None:
+        return None
+    if isinstance(clause, BooleanClauseList) and clause.operator is operators.and_:
+        shards = None
+        for child in clause.clauses:
+            child_shards = criteria_shards(child, params, shard_count)
+            if child_shards is not None:
+                shards = child_shards if shards is None else shards & child_shards
+        return shards
+    if isinstance(clause, Exists):
+        element = clause.element
+        while not hasattr(element, 'whereclause') and hasattr(element, 'element'):
+            element = element.element
+        return criteria_shards(getattr(element, 'whereclause', None), params, shard_count)
+    if isinstance(clause, BinaryExpression):
+        column, bind = clause.left, clause.right
+        if isinstance(column, BindParameter):
+            column, bind = bind, column
+        if not isinstance(bind, BindParameter) or not _is_shard_key(column):
+            return None
+        value = _bind_value(bind, params)
+        if value is None:
+            return None
+        if clause.operator is operators.eq:
+            return {shard_index(value, shard_count)}
+        if clause.operator is operators.in_op:
+            return {shard_index(item, shard_count) for item in value}
+    return None
+
+
+def _aggregate(column: Any) -> Optional[Callable[[list[Any]], Any]]:
+    """
+    各分片结果需要合并计算的聚合列：COUNT求和，EXISTS取或
+    """
+    if isinstance(column, Label):
+        column = column.element
+    if isinstance(column, FunctionElement) and column.name.lower() == 'count':
+        return sum
+    if isinstance(column, Exists):
+        return any
+    return None
+
+
+class UserShardedSession(ShardedSession):
+    """
+    按用户分片的会话，基于SQLAlchemy水平分片扩展：
+
+    - 用户及其地址位于同一分片，新用户按轮转选择分片，主键由所在分片的自增区间生成（见 SHARD_ID_BITS）
+    - 按主键、user_id 等分片键（=、IN）查询、更新、删除的语句只发往对应分片
+    - 未限定分片键的查询并发发往所有分片后合并：按主键升序排序的结果按分片顺序拼接即整体有序，
+      LIMIT/OFFSET 在合并后截取，COUNT 求和、EXISTS 取或；按其他列排序时各分片结果按分片顺序拼接
+    - 流式读取（yield_per）的查询依次读取各分片，不缓冲全部结果
+    """
+
+    # 同步会话并发查询各分片使用的线程池，由 configure_fan_out 设置
+    fan_out_executor: Optional[ThreadPoolExecutor] = None
+
+    def __init__(self, shards: Sequence[Engine], **kwargs: Any) -> None:
+        super().__init__(
+            shard_chooser=self._shard_chooser,
+            identity_chooser=self._identity_chooser,
+            execute_chooser=self._execute_chooser,
+            shards=dict(enumerate(shards)),
+            **kwargs,
+        )
+        self.shard_count = len(shards)
+        # 用支持并发查询、按行分组写入的执行钩子代替扩展默认的逐个分片执行
+        event.remove(self, 'do_orm_execute', execute_and_instances)
+        event.listen(self, 'do_orm_execute', self._execute, retval=True)
+
+    @classmethod
+    def configure_fan_out(cls, workers: int) -> None:
+        """
+        创建同步会话并发查询各分片的线程池
+
+        :param workers: 线程数
+        """
+        cls.fan_out_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shard-query')
+
+    def get_bind(self, mapper: Any = None, *, shard_id: Any = None, instance: Any = None, clause: Any = None,
+                 **kwargs: Any) -> Any:
+        # 仅用于获取方言等信息的 get_bind() 调用，各分片使用同类数据库，返回分片0
+        if shard_id is None and mapper is None and instance is None and clause is None:
+            shard_id = 0
+        return super().get_bind(mapper, shard_id=shard_id, instance=instance, clause=clause, **kwargs)
+
+    def _shard_chooser(self, mapper: Mapper, instance: Any, clause: Any = None, **kwargs: Any) -> int:
+        if isinstance(instance, User):
+            if instance.id is not None:
+                return shard_index(instance.id, self.shard_count)
+            return next(_placement) % self.shard_count
+        if isinstance(instance, Address):
+            if instance.user_id is not None:
+                return shard_index(instance.user_id, self.shard_count)
+            if instance.user is not None:
+                return self._choose_shard_and_assign(inspect(instance.user).mapper, instance.user)
+            raise ValueError('地址必须关联用户才能确定所在分片')
+        shards = criteria_shards(clause, None, self.shard_count) if clause is not None else None
+        return min(shards) if shards else 0
+
+    def _identity_chooser(self, mapper: Mapper, primary_key: Sequence[Any], **kwargs: Any) -> list[int]:
+        return [shard_index(primary_key[0], self.shard_count)]
+
+    def _execute_chooser(self, orm_context: ORMExecuteState) -> list[int]:
+        statement = orm_context.statement
+        if orm_context.is_insert:
+            where = getattr(statement.select, 'whereclause', None)
+        else:
+            where = getattr(statement, 'whereclause', None)
+        shards = criteria_shards(where, orm_context.parameters, self.shard_count)
+        return sorted(shards) if shards is not None else list(range(self.shard_count))
+
+    def _execute(self, orm_context: ORMExecuteState) -> Optional[Result]:
+        if self._explicit_shard(orm_context):
+            return execute_and_instances(orm_context)
+        statement = orm_context.statement
+        params = orm_context.parameters
+        if orm_context.is_insert and statement.select is None:
+            rows = params if isinstance(params, list) else [params or self._statement_values(statement)]
+            return self._execute_rows(orm_context, rows, bulk=bool(params))
+        if orm_context.is_update and isinstance(params, list) and statement.whereclause is None:
+            return self._execute_rows(orm_context, params, bulk=True)
+        shards = self._execute_chooser(orm_context)
+        if len(shards) == 1:
+            return self._invoke(orm_context, shards[0])
+        if not orm_context.is_select or self._streaming(orm_context):
+            partial = [self._invoke(orm_context, shard_id) for shard_id in shards]
+            return partial[0].merge(*partial[1:])
+        return self._fan_out(orm_context, shards)
+
+    @staticmethod
+    def _explicit_shard(orm_context: ORMExecuteState) -> bool:
+        """
+        语句已指定分片（set_shard_id选项、懒加载/预加载沿用父对象所在分片、shard_id参数）时交给扩展默认处理
+        """
+        if any(isinstance(option, set_shard_id) for option in orm_context._non_compile_orm_options):
+            return True
+        if orm_context.is_select:
+            active_options = orm_context.load_options
+        elif orm_context.is_update or orm_context.is_delete:
+            active_options = orm_context.update_delete_options
+        else:
+            active_options = None
+        return (
+            active_options is not None and active_options._identity_token is not None
+            or '_sa_shard_id' in orm_context.execution_options
+            or 'shard_id' in orm_context.bind_arguments
+        )
+
+    @staticmethod
+    def _streaming(orm_context: ORMExecuteState) -> bool:
+        options = orm_context.execution_options
+        return bool(options.get('yield_per') or options.get('stream_results') or orm_context.load_options._yield_per)
+
+    @staticmethod
+    def _statement_values(statement: Any) -> dict[str, Any]:
+        return {getattr(key, 'key', key): getattr(value, 'value', value)
+                for key, value in (statement._values or {}).items()}
+
+    @staticmethod
+    def _invoke(orm_context: ORMExecuteState, shard_id: int) -> Result:
+        bind_arguments = dict(orm_context.bind_arguments)
+        bind_arguments['shard_id'] = shard_id
+        orm_context.update_execution_options(identity_token=shard_id)
+        return orm_context.invoke_statement(bind_arguments=bind_arguments)
+
+    def _shard_connection(self, orm_context: ORMExecuteState, shard_id: int) -> Connection:
+        return self.connection(bind_arguments={**orm_context.bind_arguments, 'shard_id': shard_id})
+
+    @staticmethod
+    def _execute_on_connection(
+        orm_context: ORMExecuteState, connection: Connection, shard_id: int, statement: Any, params: Any
+    ) -> Any:
+        """
+        用本会话事务中某个分片的连接创建子会话执行语句；查询结果冻结后返回，由调用方合并回本会话
+        """
+        with Session(bind=connection) as child:
+            result = child.execute(
+                statement, params,
+                execution_options={**orm_context.local_execution_options, 'identity_token': shard_id})
+            return result.freeze() if getattr(result, 'returns_rows', True) else result
+
+    def _row_shard(self, table_name: str, row: dict[str, Any], placement: Callable[[], int]) -> int:
+        """
+        确定INSERT/按主键批量UPDATE的一行参数所在分片：地址按user_id，指定了主键的按主键，未指定主键的新用户按轮转放置
+        """
+        if table_name == Address.__tablename__ and row.get('user_id') is not None:
+            return shard_index(row['user_id'], self.shard_count)
+        if row.get('id') is not None:
+            return shard_index(row['id'], self.shard_count)
+        if table_name == Address.__tablename__:
+            raise ValueError('地址必须指定user_id才能确定所在分片')
+        return placement()
+
+    def _execute_rows(self, orm_context: ORMExecuteState, rows: list[dict[str, Any]], bulk: bool) -> Result:
+        """
+        INSERT与按主键批量UPDATE按行分组到各分片执行，未指定主键的新用户整条语句放到同一分片。
+        扩展不支持分片会话中的批量INSERT/UPDATE，多行参数的语句在子会话中执行，RETURNING的结果按参数顺序合并回本会话
+        """
+        placed: list[int] = []
+
+        def placement() -> int:
+            if not placed:
+                placed.append(next(_placement) % self.shard_count)
+            return placed[0]
+
+        table_name = orm_context.statement.table.name
+        groups: dict[int, list[int]] = {}
+        for position, row in enumerate(rows):
+            groups.setdefault(self._row_shard(table_name, row, placement), []).append(position)
+        if not bulk:
+            return self._invoke(orm_context, next(iter(groups)))
+        partial = {
+            shard_id: self._execute_on_connection(
+                orm_context, self._shard_connection(orm_context, shard_id), shard_id, orm_context.statement,
+                [rows[position] for position in positions])
+            for shard_id, positions in groups.items()
+        }
+        results = list(partial.values())
+        if not isinstance(results[0], FrozenResult):
+            return results[0].merge(*results[1:]) if len(results) > 1 else results[0]
+        ordered: list[Any] = [None] * len(rows)
+        for shard_id, frozen in partial.items():
+            for position, row in zip(groups[shard_id], self._merge_rows(frozen)):
+                ordered[position] = row
+        return results[0].with_new_rows(ordered)()
+
+    def _merge_rows(self, frozen: FrozenResult) -> list[tuple[Any, ...]]:
+        """
+        将子会话加载的实体合并到本会话（不再查询数据库），返回替换为本会话实体后的各行
+        """
+        return [tuple(self.merge(value, load=False) if isinstance(value, Base) else value for value in row)
+                for row in frozen.rewrite_rows()]
+
+    def _fan_out(self, orm_context: ORMExecuteState, shards: list[int]) -> Result:
+        """
+        并发在各分片执行查询：每个分片使用本会话事务中该分片的连接创建子会话执行，同步引擎在线程池中执行，
+        异步引擎在各自的greenlet中并发执行；结果合并回本会话的身份映射
+        """
+        statement = orm_context.statement
+        limit, offset = statement._limit, statement._offset
+        if limit is not None or offset:
+            # 各分片取前 offset+limit 条，合并后再截取
+            statement = statement.offset(None)
+            if limit is not None:
+                statement = statement.limit(limit + (offset or 0))
+        params = orm_context.parameters
+        # 连接在当前线程从会话事务中取得，各子会话再分别在线程/greenlet中使用自己分片的连接
+        connections = {shard_id: self._shard_connection(orm_context, shard_id) for shard_id in shards}
+
+        def query_shard(shard_id: int) -> FrozenResult:
+            return self._execute_on_connection(orm_context, connections[shard_id], shard_id, statement, params)
+
+        if connections[shards[0]].dialect.is_async:
+
+            async def gather() -> list[FrozenResult]:
+                return await asyncio.gather(*(greenlet_spawn(query_shard, shard_id) for shard_id in shards))
+
+            frozen_results = await_only(gather())
+        else:
+            executor = self.fan_out_executor
+            if executor is None:
+                frozen_results = [query_shard(shard_id) for shard_id in shards]
+            else:
+                futures = [executor.submit(copy_context().run, query_shard, shard_id) for shard_id in shards[1:]]
+                frozen_results = [query_shard(shards[0]), *(future.result() for future in futures)]
+
+        aggregates = [_aggregate(column) for column in statement.selected_columns]
+        if aggregates and all(aggregates) and not statement._group_by_clauses:
+            rows = [row for frozen in frozen_results for row in frozen.rewrite_rows()]
+            combined = tuple(aggregate([row[i] for row in rows]) for i, aggregate in enumerate(aggregates))
+            return frozen_results[0].with_new_rows([combined])()
+        rows = [row for frozen in frozen_results for row in self._merge_rows(frozen)]
+        if offset:
+            rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        return frozen_results[0].with_new_rows(rows)()
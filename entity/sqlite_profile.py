@@ -0,0 +1,60 @@
+from typing import Any
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+
+from config.env import DataBaseConfig
+
+# 写引擎的连接池参数：只保留一个写连接，并发的写事务在连接池中排队等待，而不是在SQLite中争抢写锁
+WRITER_POOL_OPTIONS = {'pool_size': 1, 'max_overflow': 0}
+
+
+def is_sqlite_file(url: str) -> bool:
+    """
+    判断连接地址是否为SQLite文件数据库（内存库不适用WAL与读写分离）
+
+    :param url: 数据库连接地址
+    :return: 是否为SQLite文件数据库
+    """
+    db_url = make_url(url)
+    return db_url.get_backend_name() == 'sqlite' and db_url.database not in (None, '', ':memory:')
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[tuple[str, Any]]:
+    """
+    每个连接建立时执行的PRAGMA
+
+    :param read_only: 是否为只读连接，只读连接额外设置 query_only，误用其执行写入时直接报错
+    :return: (名称, 值) 列表，按顺序执行
+    """
+    pragmas = [
+        # journal_mode 持久化在数据库文件中，其余设置仅对当前连接生效
+        ('journal_mode', 'WAL'),
+        ('synchronous', DataBaseConfig.db_sqlite_synchronous),
+        ('busy_timeout', DataBaseConfig.db_sqlite_busy_timeout),
+        ('cache_size', DataBaseConfig.db_sqlite_cache_size),
+        ('mmap_size', DataBaseConfig.db_sqlite_mmap_size),
+    ]
+    if read_only:
+        pragmas.append(('query_only', 'ON'))
+    return pragmas
+
+
+def register_sqlite_profile(engine: Engine, read_only: bool = False) -> None:
+    """
+    为SQLite引擎注册连接建立事件，在每个新连接上执行WAL等PRAGMA
+
+    :param engine: 同步引擎（异步引擎传入其 sync_engine）
+    :param read_only: 是否为只读连接池
+    :return: None
+    """
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
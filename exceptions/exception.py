@@ -59,3 +59,13 @@ class ModelValidatorException(Exception):
     def __init__(self, data: Optional[str] = None, message: Optional[str] = None) -> None:
         self.data = data
         self.message = message
+
+
+class LazyLoadException(Exception):
+    """
+    自定义懒加载异常LazyLoadException
+    """
+
+    def __init__(self, data: Optional[str] = None, message: Optional[str] = None) -> None:
+        self.data = data
+        self.message = message
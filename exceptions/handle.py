@@ -4,6 +4,7 @@ from pydantic_validation_decorator import FieldValidationError
 
 from exceptions.exception import (
     AuthException,
+    LazyLoadException,
     LoginException,
     ModelValidatorException,
     PermissionException,
@@ -11,7 +12,7 @@ from exceptions.exception import (
     ServiceWarning,
 )
 from utils.log_util import logger
-from utils.response_util import JSONResponse, ResponseUtil, jsonable_encoder
+from utils.response_util import FastJSONResponse, ResponseUtil
 
 
 def handle_exception(app: FastAPI) -> None:
@@ -58,12 +59,16 @@ def handle_exception(app: FastAPI) -> None:
         logger.warning(exc.message)
         return ResponseUtil.failure(data=exc.data, msg=exc.message)
 
+    # 自定义懒加载异常
+    @app.exception_handler(LazyLoadException)
+    async def lazy_load_exception_handler(request: Request, exc: LazyLoadException) -> Response:
+        logger.error(exc.message)
+        return ResponseUtil.error(data=exc.data, msg=exc.message)
+
     # 处理其他http请求异常
     @app.exception_handler(HTTPException)
     async def http_exception_handler(request: Request, exc: HTTPException) -> Response:
-        return JSONResponse(
-            content=jsonable_encoder({'code': exc.status_code, 'msg': exc.detail}), status_code=exc.status_code
-        )
+        return FastJSONResponse(content={'code': exc.status_code, 'msg': exc.detail}, status_code=exc.status_code)
 
     # 处理Pydantic请求体验证异常
     @app.exception_handler(RequestValidationError)
@@ -84,9 +89,9 @@ def handle_exception(app: FastAPI) -> None:
         }
         from datetime import datetime
         result['time'] = datetime.now()
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=HttpStatusConstant.BAD_REQUEST,
-            content=jsonable_encoder(result)
+            content=result
         )
 
     # 处理其他异常
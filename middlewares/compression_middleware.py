@@ -0,0 +1,238 @@
+import zlib
+from collections.abc import Sequence
+from typing import Callable, Optional
+
+from fastapi import FastAPI
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.env import CompressionConfig
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Compressor:
+    """
+    流式压缩器接口，compress 可在每个分块后同步刷新，使客户端能及时解压已收到的内容
+    """
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+
+class GzipCompressor(Compressor):
+    def __init__(self, level: int) -> None:
+        # wbits=31 输出带gzip头的deflate流
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor(Compressor):
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + self._compressor.flush() if flush else output
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor(Compressor):
+    def __init__(self, level: int) -> None:
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else output
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_compressors(
+    gzip_level: int, brotli_quality: int, zstd_level: int
+) -> dict[str, Callable[[], Compressor]]:
+    """
+    获取当前环境可用的压缩算法，brotli与zstandard为可选依赖
+
+    :param gzip_level: gzip压缩级别
+    :param brotli_quality: brotli压缩质量
+    :param zstd_level: zstd压缩级别
+    :return: 编码名称到压缩器工厂的映射
+    """
+    factories: dict[str, Callable[[], Compressor]] = {'gzip': lambda: GzipCompressor(gzip_level)}
+    if brotli is not None:
+        factories['br'] = lambda: BrotliCompressor(brotli_quality)
+    if zstandard is not None:
+        factories['zstd'] = lambda: ZstdCompressor(zstd_level)
+    return factories
+
+
+def negotiate_encoding(accept_encoding: str, encodings: Sequence[str]) -> Optional[str]:
+    """
+    根据请求头 Accept-Encoding 选择压缩算法，q值高者优先，q值相同时按服务端优先级
+
+    :param accept_encoding: Accept-Encoding 请求头
+    :param encodings: 服务端支持的压缩算法，按优先级排列
+    :return: 选中的压缩算法，客户端不接受任何压缩时返回None
+    """
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件，按 Accept-Encoding 协商 zstd / br / gzip，只压缩允许的Content-Type
+
+    - 已设置 Content-Encoding 的响应原样返回
+    - 单次发送的响应体小于 minimum_size 时不压缩
+    - 流式响应逐块压缩并同步刷新，不等待响应结束，也不缓存整个响应体
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        encodings: Sequence[str] = ('zstd', 'br', 'gzip'),
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        content_types: Sequence[str] = ('application/json', 'application/x-ndjson', 'text/'),
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        factories = available_compressors(gzip_level, brotli_quality, zstd_level)
+        self.encodings = tuple(encoding for encoding in encodings if encoding in factories)
+        self.factories = factories
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await CompressionResponder(self, encoding, send).run(scope, receive)
+
+    def compressible(self, headers: Headers) -> bool:
+        return 'content-encoding' not in headers and headers.get('content-type', '').startswith(self.content_types)
+
+
+class CompressionResponder:
+    """
+    单个请求的压缩状态：暂存 http.response.start，收到第一个响应体分块后决定是否压缩
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.started = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.middleware.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message['type']
+        if message_type == 'http.response.start':
+            self.start_message = message
+            return
+        if message_type != 'http.response.body':
+            await self.send(message)
+            return
+        if not self.started:
+            await self.start(message)
+            return
+        if self.compressor is None:
+            await self.send(message)
+            return
+        more_body = message.get('more_body', False)
+        body = self.compressor.compress(message.get('body', b''), flush=more_body)
+        if not more_body:
+            body += self.compressor.finish()
+        if body or not more_body:
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+    async def start(self, message: Message) -> None:
+        self.started = True
+        start_message = self.start_message
+        headers = MutableHeaders(raw=start_message['headers'])
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if not self.middleware.compressible(headers):
+            await self.send(start_message)
+            await self.send(message)
+            return
+        headers.add_vary_header('Accept-Encoding')
+        if not more_body and len(body) < self.middleware.minimum_size:
+            await self.send(start_message)
+            await self.send(message)
+            return
+        self.compressor = self.middleware.factories[self.encoding]()
+        headers['Content-Encoding'] = self.encoding
+        if more_body:
+            # 流式响应总长度未知，改为分块传输
+            del headers['Content-Length']
+            body = self.compressor.compress(body, flush=True)
+        else:
+            body = self.compressor.compress(body, flush=False) + self.compressor.finish()
+            headers['Content-Length'] = str(len(body))
+        await self.send(start_message)
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+
+def add_compression_middleware(app: FastAPI) -> None:
+    """
+    添加响应压缩中间件
+
+    :param app: FastAPI对象
+    :return:
+    """
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=CompressionConfig.compress_minimum_size,
+        encodings=[item.strip() for item in CompressionConfig.compress_encodings.split(',') if item.strip()],
+        gzip_level=CompressionConfig.compress_gzip_level,
+        brotli_quality=CompressionConfig.compress_brotli_quality,
+        zstd_level=CompressionConfig.compress_zstd_level,
+        content_types=[item.strip() for item in CompressionConfig.compress_content_types.split(',') if item.strip()],
+    )
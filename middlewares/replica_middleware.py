@@ -0,0 +1,70 @@
+import time
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config.env import DataBaseConfig
+from entity.database import REPLICA_URLS
+from entity.routing_session import CTX_USE_REPLICA
+
+# 记录客户端最近一次写入后需要读主库截止时间的Cookie
+PRIMARY_COOKIE = 'db_primary_until'
+SAFE_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class ReplicaRoutingMiddleware:
+    """
+    只读副本路由中间件
+
+    - GET/HEAD/OPTIONS 请求允许查询发往只读副本，其他请求读写都走主库
+    - 写请求成功后通过Cookie记录截止时间，同一客户端在窗口内的读请求仍走主库，避免因复制延迟读不到自己的写入
+    """
+
+    def __init__(self, app: ASGIApp, read_your_writes_seconds: float = 5) -> None:
+        self.app = app
+        self.read_your_writes_seconds = read_your_writes_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        now = time.time()
+        if scope['method'] in SAFE_METHODS:
+            try:
+                primary_until = float(HTTPConnection(scope).cookies.get(PRIMARY_COOKIE, 0))
+            except ValueError:
+                primary_until = 0
+            token = CTX_USE_REPLICA.set(primary_until <= now)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                CTX_USE_REPLICA.reset(token)
+            return
+        if not self.read_your_writes_seconds:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    'Set-Cookie',
+                    f'{PRIMARY_COOKIE}={now + self.read_your_writes_seconds:.3f}; '
+                    f'Max-Age={int(self.read_your_writes_seconds) + 1}; Path=/; HttpOnly; SameSite=Lax',
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def add_replica_middleware(app: FastAPI) -> None:
+    """
+    添加只读副本路由中间件，未配置只读副本时不添加
+
+    :param app: FastAPI对象
+    :return:
+    """
+    if REPLICA_URLS:
+        app.add_middleware(ReplicaRoutingMiddleware, read_your_writes_seconds=DataBaseConfig.db_read_your_writes_seconds)
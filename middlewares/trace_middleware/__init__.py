@@ -1,9 +1,15 @@
 from fastapi import FastAPI
 
 from .ctx import TraceCtx
+from .exporter import InMemorySpanExporter, OTLPJsonFileSpanExporter, SpanExporter
+from .metrics import RequestMetrics, request_metrics
 from .middle import TraceASGIMiddleware
+from .tracer import Trace, TraceSpan, Tracer, tracer
 
-__all__ = ('TraceASGIMiddleware', 'TraceCtx')
+__all__ = (
+    'InMemorySpanExporter', 'OTLPJsonFileSpanExporter', 'RequestMetrics', 'SpanExporter', 'Trace', 'TraceASGIMiddleware',
+    'TraceCtx', 'TraceSpan', 'Tracer', 'request_metrics', 'tracer',
+)
 
 __version__ = '0.1.0'
 
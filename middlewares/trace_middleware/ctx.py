@@ -1,13 +1,147 @@
 import contextvars
+import itertools
+import os
+import re
+import time
+from collections.abc import Callable, Iterable
+from typing import Optional
 from uuid import uuid4
 
+from config.env import TraceConfig
+
 CTX_REQUEST_ID: contextvars.ContextVar[str] = contextvars.ContextVar('request-id', default='')
 
+# Crockford Base32 字母表（ULID使用），按每10位查表一次输出2个字符
+_CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_BASE32_PAIRS = tuple(a + b for a in _CROCKFORD for b in _CROCKFORD)
+_MASK_40 = (1 << 40) - 1
+
+# 进程级随机数，fork后的子进程重新生成，避免多worker之间ID重复
+_process_random_text = ''
+_process_prefix = ''
+_counter = itertools.count()
+# 最近一次的 (毫秒时间戳, 编码后的时间部分)，整体替换保证多线程读取时两者一致
+_millis_cache = (-1, '')
+
+
+def _encode_base32(value: int, pairs: int) -> str:
+    return ''.join(_BASE32_PAIRS[(value >> (10 * i)) & 0x3FF] for i in range(pairs - 1, -1, -1))
+
+
+def _reseed() -> None:
+    global _process_random_text, _process_prefix, _counter
+    _process_random_text = _encode_base32(int.from_bytes(os.urandom(5), 'big'), 4)
+    _process_prefix = os.urandom(6).hex()
+    _counter = itertools.count()
+
+
+_reseed()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed)
+
+
+def uuid4_id() -> str:
+    """
+    随机UUID，每次调用读取系统随机数
+
+    :return: 32位十六进制请求ID
+    """
+    return uuid4().hex
+
+
+def counter_id() -> str:
+    """
+    进程随机前缀 + 自增计数，不读取系统随机数；itertools.count 的自增在GIL下是原子的
+
+    :return: 请求ID，如 3f9a1c0e2b7d-1a
+    """
+    return f'{_process_prefix}-{next(_counter):x}'
+
+
+def ulid_id() -> str:
+    """
+    ULID格式的请求ID：48位毫秒时间戳 + 40位进程随机数 + 40位自增计数，按字典序排序即按时间排序
+
+    :return: 26位Crockford Base32请求ID
+    """
+    global _millis_cache
+    millis = time.time_ns() // 1_000_000
+    cached_millis, millis_text = _millis_cache
+    if millis != cached_millis:
+        # 时间部分50位（高2位补0）编码为10个字符，同一毫秒内复用
+        millis_text = _encode_base32(millis, 5)
+        _millis_cache = (millis, millis_text)
+    # 随机部分80位编码为16个字符，其中进程随机数部分已预先编码，只需编码计数部分
+    count = next(_counter) & _MASK_40
+    return (millis_text + _process_random_text + _BASE32_PAIRS[count >> 30] + _BASE32_PAIRS[(count >> 20) & 0x3FF]
+            + _BASE32_PAIRS[(count >> 10) & 0x3FF] + _BASE32_PAIRS[count & 0x3FF])
+
+
+ID_GENERATORS: dict[str, Callable[[], str]] = {'uuid4': uuid4_id, 'counter': counter_id, 'ulid': ulid_id}
+
+# 入站请求ID只接受常见的安全字符，避免日志注入与超长响应头
+_INBOUND_ID = re.compile(rb'[A-Za-z0-9._:\-]{1,128}')
+_TRACEPARENT = re.compile(rb'[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}')
+
+
+def parse_traceparent(value: bytes) -> Optional[tuple[str, str]]:
+    """
+    解析W3C traceparent请求头
+
+    :param value: 请求头的值，如 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01
+    :return: (trace-id, parent-id)，格式不合法或ID全为0时返回None
+    """
+    match = _TRACEPARENT.fullmatch(value)
+    if match is None or match.group(1) == b'0' * 32 or match.group(2) == b'0' * 16:
+        return None
+    return match.group(1).decode(), match.group(2).decode()
+
+
+def inbound_request_id(headers: Iterable[tuple[bytes, bytes]]) -> Optional[str]:
+    """
+    从ASGI原始请求头中读取上游传入的请求ID，X-Request-ID优先，其次为W3C traceparent中的trace-id
+
+    :param headers: ASGI scope中的原始请求头
+    :return: 合法的请求ID，不存在或不合法时返回None
+    """
+    traceparent = None
+    for name, value in headers:
+        if name == b'x-request-id':
+            if _INBOUND_ID.fullmatch(value):
+                return value.decode()
+        elif name == b'traceparent':
+            traceparent = value
+    if traceparent is not None:
+        parsed = parse_traceparent(traceparent)
+        if parsed is not None:
+            return parsed[0]
+    return None
+
 
 class TraceCtx:
-    @staticmethod
-    def set_id() -> str:
-        _id = uuid4().hex
+    # 请求ID生成函数，可通过 use_generator 切换
+    id_generator = staticmethod(ID_GENERATORS[TraceConfig.trace_id_generator])
+    # 是否沿用上游传入的请求ID
+    trust_inbound_id = TraceConfig.trace_trust_inbound_id
+
+    @classmethod
+    def use_generator(cls, name: str) -> None:
+        """
+        切换请求ID生成方式
+
+        :param name: uuid4、counter 或 ulid
+        """
+        cls.id_generator = staticmethod(ID_GENERATORS[name])
+
+    @classmethod
+    def set_id(cls, request_id: Optional[str] = None) -> str:
+        """
+        设置当前请求的ID
+
+        :param request_id: 可选，上游传入的请求ID，不传时生成新ID
+        :return: 请求ID
+        """
+        _id = request_id or cls.id_generator()
         CTX_REQUEST_ID.set(_id)
         return _id
 
@@ -0,0 +1,138 @@
+import json
+import os
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Optional, TextIO
+
+if TYPE_CHECKING:
+    from .tracer import Trace, TraceSpan
+
+# 导出的OTLP数据中的instrumentation scope名称
+SCOPE_NAME = 'middlewares.trace_middleware'
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    # bool 是 int 的子类，需先判断；OTLP/JSON 中int64按字符串编码
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_span(span: 'TraceSpan') -> dict[str, Any]:
+    data = {
+        'traceId': span.trace.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': span.kind,
+        'startTimeUnixNano': str(span.start_time_ns),
+        'endTimeUnixNano': str(span.end_time_ns),
+        'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+        'status': {'code': span.status_code},
+    }
+    if span.parent_span_id:
+        data['parentSpanId'] = span.parent_span_id
+    return data
+
+
+def to_otlp(traces: list['Trace'], service_name: str) -> dict[str, Any]:
+    """
+    将链路转换为OTLP/JSON格式的 ExportTraceServiceRequest
+
+    :param traces: 链路列表
+    :param service_name: 资源属性 service.name
+    :return: 可直接json序列化的字典
+    """
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+            'scopeSpans': [{
+                'scope': {'name': SCOPE_NAME},
+                'spans': [_otlp_span(span) for trace in traces for span in trace.spans],
+            }],
+        }],
+    }
+
+
+class SpanExporter:
+    """
+    链路导出器基类，每个请求结束后调用一次export，在事件循环线程中执行，实现应避免阻塞
+    """
+
+    def export(self, trace: 'Trace') -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """
+    将链路保存在内存中，用于测试与本地排查，超出容量后丢弃最早的链路
+    """
+
+    def __init__(self, max_traces: int = 1000) -> None:
+        self.traces: deque['Trace'] = deque(maxlen=max_traces)
+
+    def export(self, trace: 'Trace') -> None:
+        self.traces.append(trace)
+
+    def get_finished_spans(self) -> list['TraceSpan']:
+        return [span for trace in self.traces for span in trace.spans]
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+
+class OTLPJsonFileSpanExporter(SpanExporter):
+    """
+    每条链路写为一行OTLP/JSON，可由 OpenTelemetry Collector 的 otlpjsonfile receiver 读取后转发到Jaeger、Tempo等后端
+
+    写入经过文件缓冲，进程退出（shutdown）时落盘
+    """
+
+    def __init__(self, path: str, service_name: str) -> None:
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file: Optional[TextIO] = None
+
+    def export(self, trace: 'Trace') -> None:
+        line = json.dumps(to_otlp([trace], self.service_name), ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def create_exporter(name: str, path: str, service_name: str) -> Optional[SpanExporter]:
+    """
+    根据配置创建导出器
+
+    :param name: off、memory 或 otlp-json
+    :param path: otlp-json 导出文件路径
+    :param service_name: 资源属性 service.name
+    :return: 导出器，off 时返回None
+    """
+    if name == 'memory':
+        return InMemorySpanExporter()
+    if name == 'otlp-json':
+        return OTLPJsonFileSpanExporter(path, service_name)
+    return None
@@ -0,0 +1,158 @@
+import bisect
+from typing import Optional
+
+# 请求耗时直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# /metrics 输出的分位数
+QUANTILES = (0.5, 0.95, 0.99)
+# 请求生命周期各阶段：接收请求体、接口处理（请求体接收完成到响应开始）、发送响应体
+STAGES = ('receive', 'handler', 'send')
+
+
+class RouteMetrics:
+    """
+    单个路由（方法 + 路由模板）的请求指标
+    """
+
+    __slots__ = ('count', 'duration_sum', 'buckets', 'stage_sums', 'statuses', 'request_bytes', 'response_bytes')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.stage_sums = [0.0] * len(STAGES)
+        self.statuses: dict[int, int] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def quantile(self, q: float) -> float:
+        """
+        按直方图估算分位数，桶内线性插值（与Prometheus的histogram_quantile一致）
+
+        :param q: 分位数，0~1
+        :return: 估算的耗时（秒）
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for upper, count in zip(LATENCY_BUCKETS, self.buckets):
+            if count and cumulative + count >= rank:
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+            lower = upper
+        # 落在 +Inf 桶中时返回最大的有限桶上界
+        return LATENCY_BUCKETS[-1]
+
+
+class RequestMetrics:
+    """
+    HTTP请求指标注册表，按路由模板（而非实际路径）聚合，避免路径参数导致标签基数膨胀
+
+    只在事件循环线程中由链路追踪中间件更新，不加锁
+    """
+
+    def __init__(self) -> None:
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stages: tuple[float, float, float],
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        """
+        记录一次请求
+
+        :param method: 请求方法
+        :param route: 路由模板，如 /users/{user_id}
+        :param status: 响应状态码
+        :param duration: 请求总耗时（秒）
+        :param stages: 各阶段耗时（秒），顺序同 STAGES
+        :param request_bytes: 请求体字节数
+        :param response_bytes: 响应体字节数
+        """
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.count += 1
+        metrics.duration_sum += duration
+        metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        stage_sums = metrics.stage_sums
+        stage_sums[0] += stages[0]
+        stage_sums[1] += stages[1]
+        stage_sums[2] += stages[2]
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+        metrics.request_bytes += request_bytes
+        metrics.response_bytes += response_bytes
+
+    def clear(self) -> None:
+        self.routes.clear()
+
+    def render_prometheus(self) -> str:
+        """
+        生成Prometheus文本格式的指标
+
+        :return: 指标文本
+        """
+        lines = [
+            '# HELP http_request_duration_seconds HTTP request latency.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        routes = sorted(self.routes.items())
+        for (method, route), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for upper, count in zip((*LATENCY_BUCKETS, None), metrics.buckets):
+                cumulative += count
+                le = '+Inf' if upper is None else repr(upper)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {metrics.duration_sum:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {metrics.count}')
+        lines += [
+            '# HELP http_request_duration_quantile_seconds HTTP request latency quantiles estimated from the histogram.',
+            '# TYPE http_request_duration_quantile_seconds gauge',
+        ]
+        for (method, route), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for q in QUANTILES:
+                lines.append(
+                    f'http_request_duration_quantile_seconds{{{labels},quantile="{q}"}} {metrics.quantile(q):.6f}')
+        lines += [
+            '# HELP http_request_stage_seconds_total Time spent in each request lifecycle stage.',
+            '# TYPE http_request_stage_seconds_total counter',
+        ]
+        for (method, route), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for stage, total in zip(STAGES, metrics.stage_sums):
+                lines.append(f'http_request_stage_seconds_total{{{labels},stage="{stage}"}} {total:.6f}')
+        lines += ['# HELP http_requests_total HTTP requests by status code.', '# TYPE http_requests_total counter']
+        for (method, route), metrics in routes:
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+        for name, attribute, description in (
+            ('http_request_body_bytes_total', 'request_bytes', 'HTTP request body bytes received.'),
+            ('http_response_body_bytes_total', 'response_bytes', 'HTTP response body bytes sent.'),
+        ):
+            lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+            for (method, route), metrics in routes:
+                lines.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {getattr(metrics, attribute)}')
+        return '\n'.join(lines) + '\n'
+
+    def get(self, method: str, route: str) -> Optional[RouteMetrics]:
+        return self.routes.get((method, route))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 全局请求指标实例
+request_metrics = RequestMetrics()
@@ -1,8 +1,6 @@
-from functools import wraps
-
 from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from .span import Span, get_current_span
+from .span import Span
 
 
 class TraceASGIMiddleware:
@@ -19,7 +17,6 @@ class TraceASGIMiddleware:
     async def my_receive(receive: Receive, span: Span) -> Receive:
         await span.request_before()
 
-        @wraps(receive)
         async def my_receive() -> Message:
             message = await receive()
             await span.request_after(message)
@@ -32,7 +29,8 @@ class TraceASGIMiddleware:
             await self.app(scope, receive, send)
             return
 
-        async with get_current_span(scope) as span:
+        span = Span(scope)
+        try:
             handle_outgoing_receive = await self.my_receive(receive, span)
 
             async def handle_outgoing_request(message: 'Message') -> None:
@@ -40,3 +38,5 @@ class TraceASGIMiddleware:
                 await send(message)
 
             await self.app(scope, handle_outgoing_receive, handle_outgoing_request)
+        finally:
+            span.finish()
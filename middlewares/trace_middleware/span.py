@@ -1,25 +1,48 @@
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+from time import perf_counter
 
 from starlette.types import Message, Scope
 
-from .ctx import TraceCtx
+from .ctx import TraceCtx, inbound_request_id
+from .metrics import request_metrics
+from .tracer import STATUS_ERROR, tracer
 
 
 class Span:
     """
     整个http生命周期：
         request(before) --> request(after) --> response(before) --> response(after)
+
+    各阶段记录单调时钟时间戳，请求结束后汇总到按路由聚合的请求指标中；
+    配置了链路导出器时同时作为链路的根span，请求期间执行的数据库语句记录为其子span
     """
 
+    __slots__ = (
+        'scope', 'request_id', 'receive_start', 'body_end', 'response_start', 'response_end',
+        'status', 'request_bytes', 'response_bytes', 'trace_root',
+    )
+
     def __init__(self, scope: Scope) -> None:
         self.scope = scope
+        self.request_id = b''
+        self.receive_start = 0.0
+        self.body_end = 0.0
+        self.response_start = 0.0
+        self.response_end = 0.0
+        self.status = 500
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.trace_root = None
 
     async def request_before(self) -> None:
         """
         request_before: 处理header信息等, 如记录请求体信息
         """
-        TraceCtx.set_id()
+        self.receive_start = perf_counter()
+        inbound_id = inbound_request_id(self.scope['headers']) if TraceCtx.trust_inbound_id else None
+        request_id = TraceCtx.set_id(inbound_id)
+        # 响应头使用的字节串在请求开始时生成一次
+        self.request_id = request_id.encode()
+        self.trace_root = tracer.start_trace(self.scope, request_id)
 
     async def request_after(self, message: Message) -> Message:
         """
@@ -28,6 +51,10 @@ class Span:
         example:
             message: {'type': 'http.request', 'body': b'{\r\n    "name": "\xe8\x8b\x8f\xe8\x8b\x8f\xe8\x8b\x8f"\r\n}', 'more_body': False}
         """
+        if message['type'] == 'http.request':
+            self.request_bytes += len(message.get('body', b''))
+            if not message.get('more_body', False):
+                self.body_end = perf_counter()
         return message
 
     async def response(self, message: Message) -> Message:
@@ -39,10 +66,47 @@ class Span:
             pass
         """
         if message['type'] == 'http.response.start':
-            message['headers'].append((b'request-id', TraceCtx.get_id().encode()))
+            self.response_start = perf_counter()
+            self.status = message['status']
+            message['headers'].append((b'request-id', self.request_id))
+        elif message['type'] == 'http.response.body':
+            self.response_bytes += len(message.get('body', b''))
+            if not message.get('more_body', False):
+                self.response_end = perf_counter()
         return message
 
-
-@asynccontextmanager
-async def get_current_span(scope: Scope) -> AsyncGenerator[Span, None]:
-    yield Span(scope)
+    def finish(self) -> None:
+        """
+        请求结束（包括异常与客户端断开）时汇总各阶段耗时
+        """
+        end = self.response_end or perf_counter()
+        start = self.receive_start
+        # 未读取请求体（如GET请求）时接收阶段耗时为0；未开始响应时全部计入接口处理阶段
+        body_end = self.body_end or start
+        response_start = self.response_start or end
+        route = self.scope.get('route')
+        route_path = route.path if route is not None else 'unmatched'
+        request_metrics.observe(
+            self.scope['method'],
+            route_path,
+            self.status,
+            end - start,
+            (body_end - start, response_start - body_end, end - response_start),
+            self.request_bytes,
+            self.response_bytes,
+        )
+        root = self.trace_root
+        if root is not None:
+            attributes = root.attributes
+            # 根span以路由模板命名，避免路径参数导致span名称基数膨胀
+            if route is not None:
+                root.name = f"{self.scope['method']} {route_path}"
+                attributes['http.route'] = route_path
+            else:
+                root.name = self.scope['method']
+            attributes['http.response.status_code'] = self.status
+            attributes['http.request.body.size'] = self.request_bytes
+            attributes['http.response.body.size'] = self.response_bytes
+            if self.status >= 500:
+                root.status_code = STATUS_ERROR
+            tracer.end_trace(root)
@@ -0,0 +1,190 @@
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from loguru import logger
+from starlette.types import Scope
+
+from config.env import TraceConfig
+
+from .ctx import TraceCtx, parse_traceparent
+from .exporter import SpanExporter, create_exporter
+
+# OpenTelemetry SpanKind 与 StatusCode 的取值
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+# 当前请求中正在进行的span，数据库语句等子span挂在它下面；未采集链路时为None
+CTX_SPAN: ContextVar[Optional['TraceSpan']] = ContextVar('trace-span', default=None)
+
+_TRACE_ID = re.compile(r'[0-9a-f]{32}')
+
+
+def _new_span_id() -> str:
+    return f'{random.getrandbits(64):016x}'
+
+
+class TraceSpan:
+    """
+    链路中的一个span，字段与OpenTelemetry的span数据模型一致，时间为Unix纳秒时间戳
+    """
+
+    __slots__ = (
+        'trace', 'span_id', 'parent_span_id', 'name', 'kind', 'start_time_ns', 'end_time_ns', 'attributes',
+        'status_code',
+    )
+
+    def __init__(
+        self, trace: 'Trace', name: str, kind: int, parent_span_id: str, start_time_ns: int, attributes: dict[str, Any]
+    ) -> None:
+        self.trace = trace
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_time_ns = start_time_ns
+        self.end_time_ns = 0
+        self.attributes = attributes
+        self.status_code = STATUS_UNSET
+
+    def end(self, end_time_ns: Optional[int] = None) -> None:
+        self.end_time_ns = end_time_ns or time.time_ns()
+
+    @property
+    def duration(self) -> float:
+        """
+        span耗时（秒），未结束时为0
+        """
+        return max(self.end_time_ns - self.start_time_ns, 0) / 1e9
+
+    def __repr__(self) -> str:
+        return f'TraceSpan(name={self.name!r}, span_id={self.span_id!r}, parent_span_id={self.parent_span_id!r})'
+
+
+class Trace:
+    """
+    一次请求的完整链路：第一个span为请求的根span，其余为挂在其下的子span（如数据库语句）
+    """
+
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: list[TraceSpan] = []
+
+    @property
+    def root(self) -> TraceSpan:
+        return self.spans[0]
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        parent: Optional[TraceSpan] = None,
+        parent_span_id: str = '',
+        start_time_ns: Optional[int] = None,
+        attributes: Optional[dict[str, Any]] = None,
+    ) -> TraceSpan:
+        """
+        创建span并加入链路
+
+        :param name: span名称
+        :param kind: SPAN_KIND_*
+        :param parent: 父span，不传时使用 parent_span_id
+        :param parent_span_id: 父span的ID，根span为上游traceparent中的parent-id或空
+        :param start_time_ns: 开始时间（Unix纳秒），不传时为当前时间
+        :param attributes: span属性
+        :return: span
+        """
+        span = TraceSpan(
+            self,
+            name,
+            kind,
+            parent.span_id if parent is not None else parent_span_id,
+            start_time_ns or time.time_ns(),
+            attributes if attributes is not None else {},
+        )
+        # 同步接口在线程池中执行语句，list.append 在GIL下是原子的，无需加锁
+        self.spans.append(span)
+        return span
+
+    def children(self, span: TraceSpan) -> list[TraceSpan]:
+        return [child for child in self.spans if child.parent_span_id == span.span_id]
+
+
+class Tracer:
+    """
+    链路采集入口：为每个请求创建根span，请求结束后整条链路交给导出器；未配置导出器时不采集，开销只有一次属性判断
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None) -> None:
+        self.exporter = exporter
+
+    def set_exporter(self, exporter: Optional[SpanExporter]) -> None:
+        """
+        替换导出器，旧导出器会被关闭
+
+        :param exporter: 新的导出器，None表示停止采集
+        """
+        previous, self.exporter = self.exporter, exporter
+        if previous is not None and previous is not exporter:
+            previous.shutdown()
+
+    def start_trace(self, scope: Scope, request_id: str) -> Optional[TraceSpan]:
+        """
+        为请求创建链路与根span，并设为当前span
+
+        :param scope: ASGI scope
+        :param request_id: 请求ID
+        :return: 根span，未采集时返回None
+        """
+        if self.exporter is None:
+            return None
+        trace_id = None
+        parent_span_id = ''
+        if TraceCtx.trust_inbound_id:
+            for name, value in scope['headers']:
+                if name == b'traceparent':
+                    parsed = parse_traceparent(value)
+                    if parsed is not None:
+                        trace_id, parent_span_id = parsed
+                    break
+        if trace_id is None:
+            # 请求ID本身是32位十六进制（uuid4或上游trace-id）时直接用作trace-id，便于在日志与链路之间对照
+            trace_id = request_id if _TRACE_ID.fullmatch(request_id) else f'{random.getrandbits(128):032x}'
+        root = Trace(trace_id).start_span(
+            f"{scope['method']} {scope['path']}",
+            SPAN_KIND_SERVER,
+            parent_span_id=parent_span_id,
+            attributes={'http.request.method': scope['method'], 'url.path': scope['path'], 'request.id': request_id},
+        )
+        CTX_SPAN.set(root)
+        return root
+
+    def end_trace(self, root: TraceSpan) -> None:
+        """
+        结束根span并导出整条链路，导出失败只记录日志，不影响请求
+
+        :param root: start_trace返回的根span
+        """
+        root.end()
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(root.trace)
+        except Exception:
+            logger.exception('链路导出失败')
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+# 全局链路采集实例
+tracer = Tracer(create_exporter(TraceConfig.trace_exporter, TraceConfig.trace_export_path, TraceConfig.trace_service_name))
@@ -1,41 +1,203 @@
-from typing import List
+from collections.abc import Sequence
+from typing import Any, List, Optional
+from sqlalchemy import String, delete, exists, func, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.responses import Response
 
+from config.env import DataBaseConfig
+from entity.entity_cache import entity_cache
 from entity.models import User as UserModel, Address as AddressModel
-from dto.schemas import Address, AddressCreate
-from common.vo import DataResponseModel, CrudResponseModel
+from dto.schemas import Address, AddressCreate, BatchResult
+from common.vo import DataResponseModel, CrudResponseModel, PageResponseModel
+from utils.batch_util import BatchUtil
+from utils.cache_util import response_cache
+from utils.coalesce_util import AsyncWriteCoalescer, WriteCoalescer
+from utils.export_util import ExportFormat, ExportUtil
+from utils.page_util import PageUtil
+from utils.response_util import ResponseUtil
+
+
+def _insert_address_stmt(user_id: int, email_address: str):
+    """
+    生成仅在用户存在时插入地址的语句，用EXISTS子查询代替查询用户实体
+
+    :param user_id: 用户ID
+    :param email_address: 邮箱地址
+    :return: INSERT ... SELECT ... WHERE EXISTS 语句
+    """
+    return insert(AddressModel).from_select(
+        ["email_address", "user_id"],
+        select(literal(email_address, String), literal(user_id)).where(exists().where(UserModel.id == user_id)))
+
+
+def _user_exists_stmt(user_id: int):
+    """
+    生成判断用户是否存在的语句
+
+    :param user_id: 用户ID
+    :return: SELECT EXISTS 语句
+    """
+    return select(exists().where(UserModel.id == user_id))
+
+
+def _invalidate_user_addresses(user_ids: Sequence[int]) -> None:
+    """
+    地址写操作提交后使所属用户的实体缓存与接口响应缓存失效
+
+    :param user_ids: 所属用户ID
+    """
+    entity_cache.invalidate(UserModel, *user_ids)
+    response_cache.invalidate(*(f"{prefix}:{user_id}" for user_id in user_ids for prefix in ("user", "user-addresses")))
+
+
+def _export_addresses_stmt():
+    """
+    生成按主键顺序流式导出地址的语句
+
+    :return: 设置了yield_per的 SELECT 语句
+    """
+    return (select(AddressModel).order_by(AddressModel.id)
+            .execution_options(yield_per=DataBaseConfig.db_export_chunk_size))
+
+
+def _address_responses(items: List[tuple[int, AddressCreate]], existing: set[int],
+                       address_ids: List[int]) -> List[DataResponseModel[Address]]:
+    """
+    按请求顺序生成合并写入的各条响应，用户不存在的请求返回404
+
+    :param items: 各请求的(用户ID, 地址数据)
+    :param existing: 存在的用户ID
+    :param address_ids: 已插入地址的主键，与用户存在的请求按顺序对应
+    :return: 按顺序对应各请求的响应
+    """
+    ids = iter(address_ids)
+    return [
+        DataResponseModel[Address](data=Address(id=next(ids), email_address=address.email_address, user_id=user_id))
+        if user_id in existing else DataResponseModel[Address](code=404, msg="用户不存在", success=False, data=None)
+        for user_id, address in items
+    ]
+
+
+def _create_addresses_together(session: Session,
+                               items: List[tuple[int, AddressCreate]]) -> List[DataResponseModel[Address]]:
+    """
+    合并写入多个请求的新地址：一次查询用户是否存在、一次多行插入、一次提交；失败时逐条按单条创建重试
+
+    :param session: leader请求的数据库会话
+    :param items: 各请求的(用户ID, 地址数据)
+    :return: 按顺序对应各请求的响应
+    """
+    if len(items) == 1:
+        return [AddressService.create_one_address(*items[0], session)]
+    try:
+        existing = set(session.scalars(select(UserModel.id).where(UserModel.id.in_({user_id for user_id, _ in items}))))
+        rows = [{"email_address": address.email_address, "user_id": user_id}
+                for user_id, address in items if user_id in existing]
+        db_addresses = BatchUtil.insert_returning(session, AddressModel, rows) if rows else []
+        if db_addresses is None:
+            # 不支持RETURNING的数据库（如MySQL）逐条插入以获取自增主键，仍在同一事务中一次提交
+            db_addresses = [AddressModel(**row) for row in rows]
+            session.add_all(db_addresses)
+            session.flush()
+        address_ids = [db_address.id for db_address in db_addresses]
+        session.commit()
+    except Exception:
+        session.rollback()
+        return [AddressService.create_one_address(user_id, address, session) for user_id, address in items]
+    _invalidate_user_addresses(sorted(existing))
+    return _address_responses(items, existing, address_ids)
+
+
+async def _async_create_addresses_together(session: AsyncSession,
+                                           items: List[tuple[int, AddressCreate]]) -> List[DataResponseModel[Address]]:
+    """
+    _create_addresses_together的异步版本
+    """
+    if len(items) == 1:
+        return [await AsyncAddressService.create_one_address(*items[0], session)]
+    try:
+        existing = set(await session.scalars(
+            select(UserModel.id).where(UserModel.id.in_({user_id for user_id, _ in items}))))
+        rows = [{"email_address": address.email_address, "user_id": user_id}
+                for user_id, address in items if user_id in existing]
+        db_addresses = await BatchUtil.async_insert_returning(session, AddressModel, rows) if rows else []
+        if db_addresses is None:
+            db_addresses = [AddressModel(**row) for row in rows]
+            session.add_all(db_addresses)
+            await session.flush()
+        address_ids = [db_address.id for db_address in db_addresses]
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        return [await AsyncAddressService.create_one_address(user_id, address, session) for user_id, address in items]
+    _invalidate_user_addresses(sorted(existing))
+    return _address_responses(items, existing, address_ids)
 
 
 class AddressService:
     @staticmethod
     def create_address(user_id: int, address: AddressCreate, session: Session) -> DataResponseModel[Address]:
-        """为用户创建地址"""
+        """为用户创建地址，启用合并写入时与并发的其他创建请求合并为一次插入"""
+        if address_create_coalescer.enabled:
+            return address_create_coalescer.submit(session, (user_id, address))
+        return AddressService.create_one_address(user_id, address, session)
+
+    @staticmethod
+    def create_one_address(user_id: int, address: AddressCreate, session: Session) -> DataResponseModel[Address]:
+        """单独为用户创建一个地址并提交"""
         try:
-            user = session.query(UserModel).filter(
-                UserModel.id == user_id).first()
-            if user is None:
+            # 使用 Pydantic 验证后的数据，插入与用户存在性检查合并为一条语句
+            stmt = _insert_address_stmt(user_id, address.email_address)
+            if session.get_bind().dialect.insert_returning:
+                address_id = session.scalar(stmt.returning(AddressModel.id))
+            else:
+                result = session.execute(stmt)
+                address_id = result.lastrowid if result.rowcount else None
+            if address_id is None:
+                session.rollback()
                 return DataResponseModel[Address](code=404, msg="用户不存在", success=False, data=None)
 
-            # 使用 Pydantic 验证后的数据
-            db_address = AddressModel(
-                email_address=address.email_address, user_id=user_id)
-            session.add(db_address)
             session.commit()
-            session.refresh(db_address)
-            return DataResponseModel[Address](data=db_address)
+            _invalidate_user_addresses([user_id])
+            return DataResponseModel[Address](
+                data=Address(id=address_id, email_address=address.email_address, user_id=user_id))
         except Exception as e:
             session.rollback()
             return DataResponseModel[Address](code=500, msg=f"创建地址失败: {str(e)}", success=False, data=None)
 
+    @staticmethod
+    def batch_create_addresses(user_id: int, addresses: List[Any],
+                               session: Session) -> DataResponseModel[BatchResult]:
+        """为用户批量创建地址"""
+        if len(addresses) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        try:
+            if not session.scalar(_user_exists_stmt(user_id)):
+                return DataResponseModel[BatchResult](code=404, msg="用户不存在", success=False)
+        except Exception as e:
+            return DataResponseModel[BatchResult](code=500, msg=f"批量创建地址失败: {str(e)}", success=False)
+        valid, results = BatchUtil.validate_items(addresses, AddressCreate)
+        rows = [(index, {"email_address": address.email_address, "user_id": user_id}) for index, address in valid]
+        BatchUtil.bulk_insert(session, AddressModel, rows, results, "创建地址失败")
+        _invalidate_user_addresses([user_id])
+        return BatchUtil.build_response(len(addresses), results)
+
     @staticmethod
     def get_address(address_id: int, session: Session) -> DataResponseModel[Address]:
         """获取指定地址"""
         try:
-            address = session.query(AddressModel).filter(
-                AddressModel.id == address_id).first()
+            cached = entity_cache.get(AddressModel, address_id)
+            if cached is not None:
+                return DataResponseModel[Address](data=cached)
+            generation = entity_cache.generation
+            address = session.get(AddressModel, address_id)
             if address is None:
                 return DataResponseModel[Address](code=404, msg="地址不存在", success=False, data=None)
-            return DataResponseModel[Address](data=address)
+            data = Address.model_validate(address)
+            entity_cache.put(AddressModel, address_id, data, generation)
+            return DataResponseModel[Address](data=data)
         except Exception as e:
             return DataResponseModel[Address](code=500, msg=f"获取地址失败: {str(e)}", success=False, data=None)
 
@@ -43,29 +205,219 @@ class AddressService:
     def list_addresses(user_id: int, session: Session) -> DataResponseModel[List[Address]]:
         """获取用户的所有地址"""
         try:
-            user = session.query(UserModel).filter(
-                UserModel.id == user_id).first()
-            if user is None:
+            addresses = session.scalars(select(AddressModel).where(AddressModel.user_id == user_id)).all()
+            # 仅在没有地址时才需要区分用户不存在与地址为空
+            if not addresses and not session.scalar(_user_exists_stmt(user_id)):
                 return DataResponseModel[List[Address]](code=404, msg="用户不存在", success=False, data=None)
-
-            addresses = session.query(AddressModel).filter(
-                AddressModel.user_id == user_id).all()
             return DataResponseModel[List[Address]](data=addresses)
         except Exception as e:
             return DataResponseModel[List[Address]](code=500, msg=f"获取地址列表失败: {str(e)}", success=False, data=None)
 
+    @staticmethod
+    def export_addresses(export_format: ExportFormat, session: Session) -> Response:
+        """流式导出所有地址"""
+        try:
+            result = session.scalars(_export_addresses_stmt())
+        except Exception as e:
+            return ResponseUtil.error(msg=f"导出地址失败: {str(e)}")
+        return ExportUtil.response(ExportUtil.iterate(result, session, Address, export_format), "addresses", export_format)
+
+    @staticmethod
+    def page_addresses(user_id: int, page_size: int, cursor: Optional[str], page_num: Optional[int],
+                       with_total: bool, session: Session) -> PageResponseModel[Address]:
+        """分页获取用户的地址"""
+        try:
+            stmt, current_page = PageUtil.build_page_stmt(
+                select(AddressModel).where(AddressModel.user_id == user_id), AddressModel.id, page_size, cursor,
+                page_num)
+            rows = session.scalars(stmt).all()
+            total = None
+            if with_total:
+                total = PageUtil.get_cached_total(f"address:{user_id}")
+                if total is None:
+                    generation = PageUtil.count_generation
+                    total = session.scalar(
+                        select(func.count()).select_from(AddressModel).where(AddressModel.user_id == user_id))
+                    PageUtil.set_cached_total(f"address:{user_id}", total, generation)
+            return PageResponseModel[Address](**PageUtil.build_page(rows, page_size, current_page, total))
+        except ValueError as e:
+            return PageResponseModel[Address](code=400, msg=str(e), success=False, page_size=page_size)
+        except Exception as e:
+            return PageResponseModel[Address](code=500, msg=f"分页获取地址失败: {str(e)}", success=False,
+                                              page_size=page_size)
+
     @staticmethod
     def delete_address(address_id: int, session: Session) -> CrudResponseModel:
         """删除地址"""
         try:
-            address = session.query(AddressModel).filter(
-                AddressModel.id == address_id).first()
-            if address is None:
+            stmt = (delete(AddressModel).where(AddressModel.id == address_id)
+                    .execution_options(synchronize_session=False))
+            # 通过RETURNING取得所属用户，用于失效用户缓存
+            if session.get_bind().dialect.delete_returning:
+                user_ids = session.scalars(stmt.returning(AddressModel.user_id)).all()
+            else:
+                user_ids = session.scalars(select(AddressModel.user_id).where(AddressModel.id == address_id)).all()
+                if user_ids:
+                    session.execute(stmt)
+            if not user_ids:
+                session.rollback()
                 return CrudResponseModel(is_success=False, message="地址不存在", result=None)
 
-            session.delete(address)
             session.commit()
+            entity_cache.invalidate(AddressModel, address_id)
+            _invalidate_user_addresses(user_ids)
             return CrudResponseModel(is_success=True, message="地址已删除", result={"address_id": address_id})
         except Exception as e:
             session.rollback()
             return CrudResponseModel(is_success=False, message=f"删除地址失败: {str(e)}", result=None)
+
+
+class AsyncAddressService:
+    """
+    地址服务（异步）
+    """
+
+    @staticmethod
+    async def create_address(user_id: int, address: AddressCreate, session: AsyncSession) -> DataResponseModel[Address]:
+        """为用户创建地址，启用合并写入时与并发的其他创建请求合并为一次插入"""
+        if async_address_create_coalescer.enabled:
+            return await async_address_create_coalescer.submit(session, (user_id, address))
+        return await AsyncAddressService.create_one_address(user_id, address, session)
+
+    @staticmethod
+    async def create_one_address(user_id: int, address: AddressCreate,
+                                 session: AsyncSession) -> DataResponseModel[Address]:
+        """单独为用户创建一个地址并提交"""
+        try:
+            stmt = _insert_address_stmt(user_id, address.email_address)
+            if session.get_bind().dialect.insert_returning:
+                address_id = await session.scalar(stmt.returning(AddressModel.id))
+            else:
+                result = await session.execute(stmt)
+                address_id = result.lastrowid if result.rowcount else None
+            if address_id is None:
+                await session.rollback()
+                return DataResponseModel[Address](code=404, msg="用户不存在", success=False, data=None)
+
+            await session.commit()
+            _invalidate_user_addresses([user_id])
+            return DataResponseModel[Address](
+                data=Address(id=address_id, email_address=address.email_address, user_id=user_id))
+        except Exception as e:
+            await session.rollback()
+            return DataResponseModel[Address](code=500, msg=f"创建地址失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def batch_create_addresses(user_id: int, addresses: List[Any],
+                                     session: AsyncSession) -> DataResponseModel[BatchResult]:
+        """为用户批量创建地址"""
+        if len(addresses) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        try:
+            if not await session.scalar(_user_exists_stmt(user_id)):
+                return DataResponseModel[BatchResult](code=404, msg="用户不存在", success=False)
+        except Exception as e:
+            return DataResponseModel[BatchResult](code=500, msg=f"批量创建地址失败: {str(e)}", success=False)
+        valid, results = BatchUtil.validate_items(addresses, AddressCreate)
+        rows = [(index, {"email_address": address.email_address, "user_id": user_id}) for index, address in valid]
+        await BatchUtil.async_bulk_insert(session, AddressModel, rows, results, "创建地址失败")
+        _invalidate_user_addresses([user_id])
+        return BatchUtil.build_response(len(addresses), results)
+
+    @staticmethod
+    async def get_address(address_id: int, session: AsyncSession) -> DataResponseModel[Address]:
+        """获取指定地址"""
+        try:
+            cached = entity_cache.get(AddressModel, address_id)
+            if cached is not None:
+                return DataResponseModel[Address](data=cached)
+            generation = entity_cache.generation
+            address = await session.get(AddressModel, address_id)
+            if address is None:
+                return DataResponseModel[Address](code=404, msg="地址不存在", success=False, data=None)
+            data = Address.model_validate(address)
+            entity_cache.put(AddressModel, address_id, data, generation)
+            return DataResponseModel[Address](data=data)
+        except Exception as e:
+            return DataResponseModel[Address](code=500, msg=f"获取地址失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def list_addresses(user_id: int, session: AsyncSession) -> DataResponseModel[List[Address]]:
+        """获取用户的所有地址"""
+        try:
+            addresses = (await session.scalars(
+                select(AddressModel).where(AddressModel.user_id == user_id))).all()
+            if not addresses and not await session.scalar(_user_exists_stmt(user_id)):
+                return DataResponseModel[List[Address]](code=404, msg="用户不存在", success=False, data=None)
+            return DataResponseModel[List[Address]](data=addresses)
+        except Exception as e:
+            return DataResponseModel[List[Address]](code=500, msg=f"获取地址列表失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def export_addresses(export_format: ExportFormat, session: AsyncSession) -> Response:
+        """流式导出所有地址"""
+        try:
+            result = await session.stream_scalars(_export_addresses_stmt())
+        except Exception as e:
+            return ResponseUtil.error(msg=f"导出地址失败: {str(e)}")
+        return ExportUtil.response(
+            ExportUtil.aiterate(result, session, Address, export_format), "addresses", export_format)
+
+    @staticmethod
+    async def page_addresses(user_id: int, page_size: int, cursor: Optional[str], page_num: Optional[int],
+                             with_total: bool, session: AsyncSession) -> PageResponseModel[Address]:
+        """分页获取用户的地址"""
+        try:
+            stmt, current_page = PageUtil.build_page_stmt(
+                select(AddressModel).where(AddressModel.user_id == user_id), AddressModel.id, page_size, cursor,
+                page_num)
+            rows = (await session.scalars(stmt)).all()
+            total = None
+            if with_total:
+                total = PageUtil.get_cached_total(f"address:{user_id}")
+                if total is None:
+                    generation = PageUtil.count_generation
+                    total = await session.scalar(
+                        select(func.count()).select_from(AddressModel).where(AddressModel.user_id == user_id))
+                    PageUtil.set_cached_total(f"address:{user_id}", total, generation)
+            return PageResponseModel[Address](**PageUtil.build_page(rows, page_size, current_page, total))
+        except ValueError as e:
+            return PageResponseModel[Address](code=400, msg=str(e), success=False, page_size=page_size)
+        except Exception as e:
+            return PageResponseModel[Address](code=500, msg=f"分页获取地址失败: {str(e)}", success=False,
+                                              page_size=page_size)
+
+    @staticmethod
+    async def delete_address(address_id: int, session: AsyncSession) -> CrudResponseModel:
+        """删除地址"""
+        try:
+            stmt = (delete(AddressModel).where(AddressModel.id == address_id)
+                    .execution_options(synchronize_session=False))
+            if session.get_bind().dialect.delete_returning:
+                user_ids = (await session.scalars(stmt.returning(AddressModel.user_id))).all()
+            else:
+                user_ids = (await session.scalars(
+                    select(AddressModel.user_id).where(AddressModel.id == address_id))).all()
+                if user_ids:
+                    await session.execute(stmt)
+            if not user_ids:
+                await session.rollback()
+                return CrudResponseModel(is_success=False, message="地址不存在", result=None)
+
+            await session.commit()
+            entity_cache.invalidate(AddressModel, address_id)
+            _invalidate_user_addresses(user_ids)
+            return CrudResponseModel(is_success=True, message="地址已删除", result={"address_id": address_id})
+        except Exception as e:
+            await session.rollback()
+            return CrudResponseModel(is_success=False, message=f"删除地址失败: {str(e)}", result=None)
+
+
+# 并发的单条创建地址请求合并写入，DB_WRITE_COALESCE=true 时启用
+address_create_coalescer = WriteCoalescer(
+    _create_addresses_together, DataBaseConfig.db_write_coalesce, DataBaseConfig.db_write_coalesce_window_ms,
+    DataBaseConfig.db_write_coalesce_max_rows)
+async_address_create_coalescer = AsyncWriteCoalescer(
+    _async_create_addresses_together, DataBaseConfig.db_write_coalesce, DataBaseConfig.db_write_coalesce_window_ms,
+    DataBaseConfig.db_write_coalesce_max_rows)
@@ -0,0 +1,37 @@
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.responses import PlainTextResponse
+
+from entity.entity_cache import entity_cache
+from entity.pool_metrics import pool_metrics_registry
+from middlewares.trace_middleware import request_metrics
+from common.vo import DataResponseModel, generic_model_cache
+from utils.cache_util import response_cache
+
+
+class HealthService:
+    @staticmethod
+    def db_health(session: Session) -> DataResponseModel[dict]:
+        """数据库连通性与连接池指标"""
+        pools = [metrics.snapshot() for metrics in pool_metrics_registry.values()]
+        try:
+            start = time.perf_counter()
+            session.execute(text("SELECT 1"))
+            latency_ms = round((time.perf_counter() - start) * 1000, 3)
+            return DataResponseModel[dict](data={"status": "up", "ping_ms": latency_ms, "pools": pools})
+        except Exception as e:
+            return DataResponseModel[dict](code=500, msg=f"数据库不可用: {str(e)}", success=False,
+                                           data={"status": "down", "pools": pools})
+
+    @staticmethod
+    def cache_stats() -> DataResponseModel[dict]:
+        """实体缓存、响应缓存与响应模型类缓存指标"""
+        return DataResponseModel[dict](
+            data={"entity_cache": entity_cache.snapshot(), "response_cache": response_cache.snapshot(),
+                  "model_cache": generic_model_cache.info()})
+
+    @staticmethod
+    def prometheus_metrics() -> PlainTextResponse:
+        """Prometheus文本格式的请求指标"""
+        return PlainTextResponse(request_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
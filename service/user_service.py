@@ -1,34 +1,216 @@
-from typing import List
+from collections.abc import Iterable
+from typing import Any, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from starlette.responses import Response
 from datetime import datetime
-from entity.models import User as UserModel
-from dto.schemas import User, UserCreate
-from common.vo import DataResponseModel, CrudResponseModel
+from entity.entity_cache import entity_cache
+from entity.loader import loader_options
+from config.env import DataBaseConfig
+from entity.models import User as UserModel, Address as AddressModel
+from dto.schemas import BatchItemResult, BatchResult, User, UserCreate, UserUpdate
+from common.vo import DataResponseModel, CrudResponseModel, PageResponseModel
+from utils.batch_util import BatchUtil
+from utils.cache_util import response_cache
+from utils.coalesce_util import AsyncWriteCoalescer, WriteCoalescer
+from utils.export_util import ExportFormat, ExportUtil
+from utils.page_util import PageUtil
+from utils.response_util import ResponseUtil
+
+
+def _invalidate_users(user_ids: Iterable[int], deleted: bool = False) -> None:
+    """
+    写操作提交后使用户的实体缓存与接口响应缓存失效
+
+    :param user_ids: 用户ID
+    :param deleted: 用户是否已删除，删除时其地址缓存一并失效
+    """
+    user_ids = list(user_ids)
+    entity_cache.invalidate(UserModel, *user_ids)
+    tags = [f"user:{user_id}" for user_id in user_ids]
+    if deleted:
+        entity_cache.invalidate_model(AddressModel)
+        tags += [f"user-addresses:{user_id}" for user_id in user_ids]
+    response_cache.invalidate(*tags)
+
+
+def _export_users_stmt():
+    """
+    生成按主键顺序流式导出用户的语句，yield_per按批次读取（隐含stream_results，支持的驱动使用服务端游标），
+    地址按批次selectinload预加载
+
+    :return: 设置了yield_per的 SELECT 语句
+    """
+    return (select(UserModel).options(*loader_options(UserModel, User)).order_by(UserModel.id)
+            .execution_options(yield_per=DataBaseConfig.db_export_chunk_size))
+
+
+def _create_users_together(session: Session, users: List[UserCreate]) -> List[DataResponseModel[User]]:
+    """
+    合并写入多个请求的新用户：一次多行插入、一次提交；失败时逐条按单条创建重试，使每个请求得到各自的结果
+
+    :param session: leader请求的数据库会话
+    :param users: 各请求的用户数据
+    :return: 按顺序对应各请求的响应
+    """
+    if len(users) == 1:
+        return [UserService.create_one_user(users[0], session)]
+    try:
+        rows = [{"name": user.name, "fullname": user.fullname} for user in users]
+        db_users = BatchUtil.insert_returning(session, UserModel, rows)
+        if db_users is None:
+            # 不支持RETURNING的数据库（如MySQL）逐条插入以获取自增主键，仍在同一事务中一次提交
+            db_users = [UserModel(**row) for row in rows]
+            session.add_all(db_users)
+            session.flush()
+        for db_user in db_users:
+            set_committed_value(db_user, "addresses", [])
+        responses = [DataResponseModel[User](data=db_user) for db_user in db_users]
+        session.commit()
+        return responses
+    except Exception:
+        session.rollback()
+        return [UserService.create_one_user(user, session) for user in users]
+
+
+async def _async_create_users_together(session: AsyncSession,
+                                       users: List[UserCreate]) -> List[DataResponseModel[User]]:
+    """
+    _create_users_together的异步版本
+    """
+    if len(users) == 1:
+        return [await AsyncUserService.create_one_user(users[0], session)]
+    try:
+        rows = [{"name": user.name, "fullname": user.fullname} for user in users]
+        db_users = await BatchUtil.async_insert_returning(session, UserModel, rows)
+        if db_users is None:
+            db_users = [UserModel(**row) for row in rows]
+            session.add_all(db_users)
+            await session.flush()
+        for db_user in db_users:
+            set_committed_value(db_user, "addresses", [])
+        responses = [DataResponseModel[User](data=db_user) for db_user in db_users]
+        await session.commit()
+        return responses
+    except Exception:
+        await session.rollback()
+        return [await AsyncUserService.create_one_user(user, session) for user in users]
 
 
 class UserService:
     @staticmethod
     def create_user(user: UserCreate, session: Session) -> DataResponseModel[User]:
-        """创建新用户"""
+        """创建新用户，启用合并写入时与并发的其他创建请求合并为一次插入"""
+        if user_create_coalescer.enabled:
+            return user_create_coalescer.submit(session, user)
+        return UserService.create_one_user(user, session)
+
+    @staticmethod
+    def create_one_user(user: UserCreate, session: Session) -> DataResponseModel[User]:
+        """单独创建一个用户并提交"""
         try:
-            db_user = UserModel(name=user.name, fullname=user.fullname)
-            session.add(db_user)
+            values = {"name": user.name, "fullname": user.fullname}
+            if session.get_bind().dialect.insert_returning:
+                db_user = session.scalars(insert(UserModel).returning(UserModel), [values]).one()
+            else:
+                db_user = UserModel(**values)
+                session.add(db_user)
+                session.flush()
+            # 新用户尚无地址，直接标记为已加载，避免序列化时懒加载
+            set_committed_value(db_user, "addresses", [])
+            # 提交前生成响应，避免提交后属性过期触发refresh查询
+            response = DataResponseModel[User](data=db_user)
             session.commit()
-            session.refresh(db_user)
-            return DataResponseModel[User](data=db_user)
+            return response
         except Exception as e:
             session.rollback()
             return DataResponseModel[User](code=500, msg=f"创建用户失败: {str(e)}", success=False, data=None)
 
+    @staticmethod
+    def batch_create_users(users: List[Any], session: Session) -> DataResponseModel[BatchResult]:
+        """批量创建用户"""
+        if len(users) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        valid, results = BatchUtil.validate_items(users, UserCreate)
+        rows = [(index, {"name": user.name, "fullname": user.fullname}) for index, user in valid]
+        BatchUtil.bulk_insert(session, UserModel, rows, results, "创建用户失败")
+        return BatchUtil.build_response(len(users), results)
+
+    @staticmethod
+    def batch_update_users(users: List[Any], session: Session) -> DataResponseModel[BatchResult]:
+        """批量更新用户"""
+        if len(users) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        valid, results = BatchUtil.validate_items(users, UserUpdate)
+        for chunk in BatchUtil.chunks(valid, DataBaseConfig.db_batch_chunk_size):
+            try:
+                existing = set(session.scalars(
+                    select(UserModel.id).where(UserModel.id.in_({user.id for _, user in chunk}))))
+                now = datetime.now()
+                rows = [{"id": user.id, "name": user.name, "fullname": user.fullname, "update_time": now}
+                        for _, user in chunk if user.id in existing]
+                if rows:
+                    session.execute(update(UserModel), rows)
+                session.commit()
+                _invalidate_users(existing)
+            except Exception as e:
+                session.rollback()
+                for index, user in chunk:
+                    results[index] = BatchItemResult(index=index, success=False, id=user.id, msg=f"更新用户失败: {str(e)}")
+                continue
+            for index, user in chunk:
+                results[index] = BatchItemResult(index=index, success=user.id in existing, id=user.id,
+                                                 msg=None if user.id in existing else "用户不存在")
+        return BatchUtil.build_response(len(users), results)
+
+    @staticmethod
+    def batch_delete_users(user_ids: List[int], session: Session) -> DataResponseModel[BatchResult]:
+        """批量删除用户及其地址"""
+        if len(user_ids) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        results = {}
+        for chunk in BatchUtil.chunks(list(enumerate(user_ids)), DataBaseConfig.db_batch_chunk_size):
+            try:
+                ids = {user_id for _, user_id in chunk}
+                existing = set(session.scalars(select(UserModel.id).where(UserModel.id.in_(ids))))
+                if existing:
+                    session.execute(delete(AddressModel).where(AddressModel.user_id.in_(existing))
+                                    .execution_options(synchronize_session=False))
+                    session.execute(delete(UserModel).where(UserModel.id.in_(existing))
+                                    .execution_options(synchronize_session=False))
+                session.commit()
+                if existing:
+                    _invalidate_users(existing, deleted=True)
+            except Exception as e:
+                session.rollback()
+                for index, user_id in chunk:
+                    results[index] = BatchItemResult(index=index, success=False, id=user_id, msg=f"删除用户失败: {str(e)}")
+                continue
+            for index, user_id in chunk:
+                results[index] = BatchItemResult(index=index, success=user_id in existing, id=user_id,
+                                                 msg=None if user_id in existing else "用户不存在")
+        return BatchUtil.build_response(len(user_ids), results)
+
     @staticmethod
     def get_user(user_id: int, session: Session) -> DataResponseModel[User]:
         """获取指定用户"""
         try:
-            user = session.query(UserModel).filter(
-                UserModel.id == user_id).first()
+            cached = entity_cache.get(UserModel, user_id)
+            if cached is not None:
+                return DataResponseModel[User](data=cached)
+            generation = entity_cache.generation
+            # Session.get 优先从身份映射中获取，未命中时才按主键查询
+            user = session.get(UserModel, user_id, options=loader_options(UserModel, User, single=True))
             if user is None:
                 return DataResponseModel[User](code=404, msg="用户不存在", success=False, data=None)
-            return DataResponseModel[User](data=user)
+            data = User.model_validate(user)
+            entity_cache.put(UserModel, user_id, data, generation)
+            return DataResponseModel[User](data=data)
         except Exception as e:
             return DataResponseModel[User](code=500, msg=f"获取用户失败: {str(e)}", success=False, data=None)
 
@@ -36,27 +218,66 @@ class UserService:
     def list_users(session: Session) -> DataResponseModel[List[User]]:
         """获取所有用户"""
         try:
-            users = session.query(UserModel).all()
+            users = session.scalars(select(UserModel).options(*loader_options(UserModel, User))).all()
             return DataResponseModel[List[User]](data=users)
         except Exception as e:
             return DataResponseModel[List[User]](code=500, msg=f"获取用户列表失败: {str(e)}", success=False, data=None)
 
+    @staticmethod
+    def export_users(export_format: ExportFormat, session: Session) -> Response:
+        """流式导出所有用户及其地址"""
+        try:
+            result = session.scalars(_export_users_stmt())
+        except Exception as e:
+            return ResponseUtil.error(msg=f"导出用户失败: {str(e)}")
+        return ExportUtil.response(ExportUtil.iterate(result, session, User, export_format), "users", export_format)
+
+    @staticmethod
+    def page_users(page_size: int, cursor: Optional[str], page_num: Optional[int], with_total: bool,
+                   session: Session) -> PageResponseModel[User]:
+        """分页获取用户"""
+        try:
+            stmt, current_page = PageUtil.build_page_stmt(
+                select(UserModel).options(*loader_options(UserModel, User)), UserModel.id, page_size, cursor, page_num)
+            rows = session.scalars(stmt).all()
+            total = None
+            if with_total:
+                total = PageUtil.get_cached_total("user_account")
+                if total is None:
+                    generation = PageUtil.count_generation
+                    total = session.scalar(select(func.count()).select_from(UserModel))
+                    PageUtil.set_cached_total("user_account", total, generation)
+            return PageResponseModel[User](**PageUtil.build_page(rows, page_size, current_page, total))
+        except ValueError as e:
+            return PageResponseModel[User](code=400, msg=str(e), success=False, page_size=page_size)
+        except Exception as e:
+            return PageResponseModel[User](code=500, msg=f"分页获取用户失败: {str(e)}", success=False, page_size=page_size)
+
     @staticmethod
     def update_user(user_id: int, user: UserCreate, session: Session) -> DataResponseModel[User]:
         """更新用户信息"""
         try:
-            db_user = session.query(UserModel).filter(
-                UserModel.id == user_id).first()
+            # 使用 Pydantic 验证后的数据
+            stmt = (update(UserModel).where(UserModel.id == user_id)
+                    .values(name=user.name, fullname=user.fullname, update_time=datetime.now())
+                    .execution_options(synchronize_session=False))
+            if session.get_bind().dialect.update_returning:
+                db_user = session.scalars(stmt.returning(UserModel)).one_or_none()
+                if db_user is not None:
+                    addresses = session.scalars(select(AddressModel).where(AddressModel.user_id == user_id)).all()
+                    set_committed_value(db_user, "addresses", list(addresses))
+            else:
+                session.execute(stmt)
+                db_user = session.scalars(
+                    select(UserModel).options(*loader_options(UserModel, User, single=True))
+                    .where(UserModel.id == user_id)).unique().one_or_none()
             if db_user is None:
+                session.rollback()
                 return DataResponseModel[User](code=404, msg="用户不存在", success=False, data=None)
-
-            # 使用 Pydantic 验证后的数据
-            db_user.name = user.name
-            db_user.fullname = user.fullname
-            db_user.update_time = datetime.now()
+            response = DataResponseModel[User](data=db_user)
             session.commit()
-            session.refresh(db_user)
-            return DataResponseModel[User](data=db_user)
+            _invalidate_users([user_id])
+            return response
         except Exception as e:
             session.rollback()
             return DataResponseModel[User](code=500, msg=f"更新用户失败: {str(e)}", success=False, data=None)
@@ -65,14 +286,236 @@ class UserService:
     def delete_user(user_id: int, session: Session) -> CrudResponseModel:
         """删除用户"""
         try:
-            db_user = session.query(UserModel).filter(
-                UserModel.id == user_id).first()
-            if db_user is None:
+            # 直接按条件删除，代替查询用户并级联加载地址后逐条删除
+            session.execute(delete(AddressModel).where(AddressModel.user_id == user_id)
+                            .execution_options(synchronize_session=False))
+            result = session.execute(delete(UserModel).where(UserModel.id == user_id)
+                                     .execution_options(synchronize_session=False))
+            if result.rowcount == 0:
+                session.rollback()
                 return CrudResponseModel(is_success=False, message="用户不存在", result=None)
 
-            session.delete(db_user)
             session.commit()
+            _invalidate_users([user_id], deleted=True)
             return CrudResponseModel(is_success=True, message="用户已删除", result={"user_id": user_id})
         except Exception as e:
             session.rollback()
             return CrudResponseModel(is_success=False, message=f"删除用户失败: {str(e)}", result=None)
+
+
+class AsyncUserService:
+    """
+    用户服务（异步），异步会话中不允许隐式懒加载，关联关系需按响应模型显式预加载
+    """
+
+    @staticmethod
+    async def create_user(user: UserCreate, session: AsyncSession) -> DataResponseModel[User]:
+        """创建新用户，启用合并写入时与并发的其他创建请求合并为一次插入"""
+        if async_user_create_coalescer.enabled:
+            return await async_user_create_coalescer.submit(session, user)
+        return await AsyncUserService.create_one_user(user, session)
+
+    @staticmethod
+    async def create_one_user(user: UserCreate, session: AsyncSession) -> DataResponseModel[User]:
+        """单独创建一个用户并提交"""
+        try:
+            values = {"name": user.name, "fullname": user.fullname}
+            if session.get_bind().dialect.insert_returning:
+                db_user = (await session.scalars(insert(UserModel).returning(UserModel), [values])).one()
+            else:
+                db_user = UserModel(**values)
+                session.add(db_user)
+                await session.flush()
+            # 新用户尚无地址，直接标记为已加载，避免序列化时懒加载
+            set_committed_value(db_user, "addresses", [])
+            # 提交前生成响应，避免提交后属性过期触发refresh查询
+            response = DataResponseModel[User](data=db_user)
+            await session.commit()
+            return response
+        except Exception as e:
+            await session.rollback()
+            return DataResponseModel[User](code=500, msg=f"创建用户失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def batch_create_users(users: List[Any], session: AsyncSession) -> DataResponseModel[BatchResult]:
+        """批量创建用户"""
+        if len(users) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        valid, results = BatchUtil.validate_items(users, UserCreate)
+        rows = [(index, {"name": user.name, "fullname": user.fullname}) for index, user in valid]
+        await BatchUtil.async_bulk_insert(session, UserModel, rows, results, "创建用户失败")
+        return BatchUtil.build_response(len(users), results)
+
+    @staticmethod
+    async def batch_update_users(users: List[Any], session: AsyncSession) -> DataResponseModel[BatchResult]:
+        """批量更新用户"""
+        if len(users) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        valid, results = BatchUtil.validate_items(users, UserUpdate)
+        for chunk in BatchUtil.chunks(valid, DataBaseConfig.db_batch_chunk_size):
+            try:
+                existing = set(await session.scalars(
+                    select(UserModel.id).where(UserModel.id.in_({user.id for _, user in chunk}))))
+                now = datetime.now()
+                rows = [{"id": user.id, "name": user.name, "fullname": user.fullname, "update_time": now}
+                        for _, user in chunk if user.id in existing]
+                if rows:
+                    await session.execute(update(UserModel), rows)
+                await session.commit()
+                _invalidate_users(existing)
+            except Exception as e:
+                await session.rollback()
+                for index, user in chunk:
+                    results[index] = BatchItemResult(index=index, success=False, id=user.id, msg=f"更新用户失败: {str(e)}")
+                continue
+            for index, user in chunk:
+                results[index] = BatchItemResult(index=index, success=user.id in existing, id=user.id,
+                                                 msg=None if user.id in existing else "用户不存在")
+        return BatchUtil.build_response(len(users), results)
+
+    @staticmethod
+    async def batch_delete_users(user_ids: List[int], session: AsyncSession) -> DataResponseModel[BatchResult]:
+        """批量删除用户及其地址"""
+        if len(user_ids) > DataBaseConfig.db_batch_max_size:
+            return DataResponseModel[BatchResult](
+                code=400, msg=f"单次最多提交{DataBaseConfig.db_batch_max_size}条记录", success=False)
+        results = {}
+        for chunk in BatchUtil.chunks(list(enumerate(user_ids)), DataBaseConfig.db_batch_chunk_size):
+            try:
+                ids = {user_id for _, user_id in chunk}
+                existing = set(await session.scalars(select(UserModel.id).where(UserModel.id.in_(ids))))
+                if existing:
+                    await session.execute(delete(AddressModel).where(AddressModel.user_id.in_(existing))
+                                          .execution_options(synchronize_session=False))
+                    await session.execute(delete(UserModel).where(UserModel.id.in_(existing))
+                                          .execution_options(synchronize_session=False))
+                await session.commit()
+                if existing:
+                    _invalidate_users(existing, deleted=True)
+            except Exception as e:
+                await session.rollback()
+                for index, user_id in chunk:
+                    results[index] = BatchItemResult(index=index, success=False, id=user_id, msg=f"删除用户失败: {str(e)}")
+                continue
+            for index, user_id in chunk:
+                results[index] = BatchItemResult(index=index, success=user_id in existing, id=user_id,
+                                                 msg=None if user_id in existing else "用户不存在")
+        return BatchUtil.build_response(len(user_ids), results)
+
+    @staticmethod
+    async def get_user(user_id: int, session: AsyncSession) -> DataResponseModel[User]:
+        """获取指定用户"""
+        try:
+            cached = entity_cache.get(UserModel, user_id)
+            if cached is not None:
+                return DataResponseModel[User](data=cached)
+            generation = entity_cache.generation
+            user = await session.get(UserModel, user_id, options=loader_options(UserModel, User, single=True))
+            if user is None:
+                return DataResponseModel[User](code=404, msg="用户不存在", success=False, data=None)
+            data = User.model_validate(user)
+            entity_cache.put(UserModel, user_id, data, generation)
+            return DataResponseModel[User](data=data)
+        except Exception as e:
+            return DataResponseModel[User](code=500, msg=f"获取用户失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def list_users(session: AsyncSession) -> DataResponseModel[List[User]]:
+        """获取所有用户"""
+        try:
+            users = (await session.scalars(select(UserModel).options(*loader_options(UserModel, User)))).all()
+            return DataResponseModel[List[User]](data=users)
+        except Exception as e:
+            return DataResponseModel[List[User]](code=500, msg=f"获取用户列表失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def export_users(export_format: ExportFormat, session: AsyncSession) -> Response:
+        """流式导出所有用户及其地址"""
+        try:
+            result = await session.stream_scalars(_export_users_stmt())
+        except Exception as e:
+            return ResponseUtil.error(msg=f"导出用户失败: {str(e)}")
+        return ExportUtil.response(
+            ExportUtil.aiterate(result, session, User, export_format), "users", export_format)
+
+    @staticmethod
+    async def page_users(page_size: int, cursor: Optional[str], page_num: Optional[int], with_total: bool,
+                         session: AsyncSession) -> PageResponseModel[User]:
+        """分页获取用户"""
+        try:
+            stmt, current_page = PageUtil.build_page_stmt(
+                select(UserModel).options(*loader_options(UserModel, User)), UserModel.id, page_size, cursor, page_num)
+            rows = (await session.scalars(stmt)).all()
+            total = None
+            if with_total:
+                total = PageUtil.get_cached_total("user_account")
+                if total is None:
+                    generation = PageUtil.count_generation
+                    total = await session.scalar(select(func.count()).select_from(UserModel))
+                    PageUtil.set_cached_total("user_account", total, generation)
+            return PageResponseModel[User](**PageUtil.build_page(rows, page_size, current_page, total))
+        except ValueError as e:
+            return PageResponseModel[User](code=400, msg=str(e), success=False, page_size=page_size)
+        except Exception as e:
+            return PageResponseModel[User](code=500, msg=f"分页获取用户失败: {str(e)}", success=False, page_size=page_size)
+
+    @staticmethod
+    async def update_user(user_id: int, user: UserCreate, session: AsyncSession) -> DataResponseModel[User]:
+        """更新用户信息"""
+        try:
+            # 使用 Pydantic 验证后的数据
+            stmt = (update(UserModel).where(UserModel.id == user_id)
+                    .values(name=user.name, fullname=user.fullname, update_time=datetime.now())
+                    .execution_options(synchronize_session=False))
+            if session.get_bind().dialect.update_returning:
+                db_user = (await session.scalars(stmt.returning(UserModel))).one_or_none()
+                if db_user is not None:
+                    addresses = (await session.scalars(
+                        select(AddressModel).where(AddressModel.user_id == user_id))).all()
+                    set_committed_value(db_user, "addresses", list(addresses))
+            else:
+                await session.execute(stmt)
+                db_user = (await session.scalars(
+                    select(UserModel).options(*loader_options(UserModel, User, single=True))
+                    .where(UserModel.id == user_id))).unique().one_or_none()
+            if db_user is None:
+                await session.rollback()
+                return DataResponseModel[User](code=404, msg="用户不存在", success=False, data=None)
+            response = DataResponseModel[User](data=db_user)
+            await session.commit()
+            _invalidate_users([user_id])
+            return response
+        except Exception as e:
+            await session.rollback()
+            return DataResponseModel[User](code=500, msg=f"更新用户失败: {str(e)}", success=False, data=None)
+
+    @staticmethod
+    async def delete_user(user_id: int, session: AsyncSession) -> CrudResponseModel:
+        """删除用户"""
+        try:
+            # 直接按条件删除，代替查询用户并级联加载地址后逐条删除
+            await session.execute(delete(AddressModel).where(AddressModel.user_id == user_id)
+                                  .execution_options(synchronize_session=False))
+            result = await session.execute(delete(UserModel).where(UserModel.id == user_id)
+                                           .execution_options(synchronize_session=False))
+            if result.rowcount == 0:
+                await session.rollback()
+                return CrudResponseModel(is_success=False, message="用户不存在", result=None)
+
+            await session.commit()
+            _invalidate_users([user_id], deleted=True)
+            return CrudResponseModel(is_success=True, message="用户已删除", result={"user_id": user_id})
+        except Exception as e:
+            await session.rollback()
+            return CrudResponseModel(is_success=False, message=f"删除用户失败: {str(e)}", result=None)
+
+
+# 并发的单条创建用户请求合并写入，DB_WRITE_COALESCE=true 时启用
+user_create_coalescer = WriteCoalescer(
+    _create_users_together, DataBaseConfig.db_write_coalesce, DataBaseConfig.db_write_coalesce_window_ms,
+    DataBaseConfig.db_write_coalesce_max_rows)
+async_user_create_coalescer = AsyncWriteCoalescer(
+    _async_create_users_together, DataBaseConfig.db_write_coalesce, DataBaseConfig.db_write_coalesce_window_ms,
+    DataBaseConfig.db_write_coalesce_max_rows)
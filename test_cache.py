@@ -0,0 +1,251 @@
+"""
+实体缓存与响应缓存测试：缓存命中、写入后失效、TTL与LRU淘汰、单飞加载
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from common.vo import DataResponseModel
+from control import address_controller, user_controller
+from dto.schemas import AddressCreate, UserCreate
+from entity.database import get_session
+from entity.entity_cache import EntityCache, entity_cache
+from entity.models import Address as AddressModel, User as UserModel
+from service.address_service import AddressService
+from service.user_service import UserService
+from utils.cache_util import MemoryCacheBackend, RedisCacheBackend, ResponseCache, response_cache
+
+from conftest import measure
+
+
+@pytest.fixture
+def entity_cache_on(monkeypatch):
+    # 实体缓存默认关闭（DB_ENTITY_CACHE_TTL=0），用例中显式开启
+    monkeypatch.setattr(entity_cache, 'ttl', 60)
+
+
+def test_get_user_served_from_cache(session, entity_cache_on):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    session.expunge_all()
+
+    result, trips = measure(session, lambda: UserService.get_user(user_id, session))
+    assert result.data.name == 'alice' and trips == 1
+    session.expunge_all()
+    hits = entity_cache.hits
+    result, trips = measure(session, lambda: UserService.get_user(user_id, session))
+    assert result.data.name == 'alice' and trips == 0
+    assert entity_cache.hits == hits + 1
+
+    # 服务自身的写路径使缓存失效
+    UserService.update_user(user_id, UserCreate(name='bob'), session)
+    assert UserService.get_user(user_id, session).data.name == 'bob'
+    AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session)
+    assert len(UserService.get_user(user_id, session).data.addresses) == 1
+
+
+def test_unit_of_work_commit_invalidates_cache(session, entity_cache_on):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    address_id = AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session).data.id
+    assert AddressService.get_address(address_id, session).data.email_address == 'a@example.com'
+    assert len(UserService.get_user(user_id, session).data.addresses) == 1
+
+    # 绕过服务直接通过ORM修改，提交后由 after_commit 事件失效
+    session.get(AddressModel, address_id).email_address = 'b@example.com'
+    session.commit()
+    assert AddressService.get_address(address_id, session).data.email_address == 'b@example.com'
+    assert UserService.get_user(user_id, session).data.addresses[0].email_address == 'b@example.com'
+
+    # 回滚的修改不影响缓存
+    session.get(UserModel, user_id).name = 'carol'
+    session.flush()
+    session.rollback()
+    assert UserService.get_user(user_id, session).data.name == 'alice'
+
+
+def test_entity_cache_ttl_and_lru():
+    cache = EntityCache(ttl=60, max_size=2)
+    for ident in (1, 2, 3):
+        cache.put(UserModel, ident, ident, cache.generation)
+    assert cache.get(UserModel, 1) is None and cache.evictions == 1
+    assert cache.get(UserModel, 2) == 2
+
+    # 加载期间发生失效时不回填
+    generation = cache.generation
+    cache.invalidate(UserModel, 2)
+    cache.put(UserModel, 2, 'stale', generation)
+    assert cache.get(UserModel, 2) is None
+
+    cache.ttl = -1
+    assert not cache.enabled and cache.get(UserModel, 3) is None
+
+
+class FakeRedis:
+    """
+    测试用的Redis替身，实现响应缓存后端用到的命令
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _get(self, name):
+        value, expire_at = self.data.get(name, (None, None))
+        if expire_at is not None and expire_at < time.monotonic():
+            self.data.pop(name, None)
+            return None
+        return value
+
+    def get(self, name):
+        with self.lock:
+            return self._get(name)
+
+    def set(self, name, value, ex=None, px=None, nx=False):
+        with self.lock:
+            if nx and self._get(name) is not None:
+                return None
+            ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+            value = value.encode() if isinstance(value, str) else value
+            self.data[name] = (value, time.monotonic() + ttl if ttl is not None else None)
+            return True
+
+    def delete(self, *names):
+        # 与真实Redis一致，str 与 bytes 形式的键指向同一条记录
+        names = [name.decode() if isinstance(name, bytes) else name for name in names]
+        with self.lock:
+            return sum(self.data.pop(name, None) is not None for name in names)
+
+    def sadd(self, name, *values):
+        with self.lock:
+            members = self._get(name) or set()
+            members.update(value.encode() if isinstance(value, str) else value for value in values)
+            self.data[name] = (members, self.data.get(name, (None, None))[1])
+
+    def smembers(self, name):
+        with self.lock:
+            return set(self._get(name) or ())
+
+    def expire(self, name, seconds):
+        with self.lock:
+            if name in self.data:
+                self.data[name] = (self.data[name][0], time.monotonic() + seconds)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cached_client(request, session, monkeypatch, entity_cache_on):
+    backend = MemoryCacheBackend(100) if request.param == 'memory' else RedisCacheBackend(FakeRedis())
+    monkeypatch.setattr(response_cache, 'backend', backend)
+    entity_cache.clear()
+
+    def override_session():
+        with Session(session.get_bind()) as db_session:
+            yield db_session
+
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.include_router(address_controller.router)
+    app.dependency_overrides[get_session] = override_session
+    with TestClient(app) as client:
+        yield client
+
+
+def test_response_cache_invalidated_by_writes(cached_client, session):
+    counter = session.counter
+    user_id = cached_client.post('/users/', json={'name': 'alice', 'fullname': 'Alice'}).json()['data']['id']
+
+    first = cached_client.get(f'/users/{user_id}').json()
+    counter.reset()
+    assert cached_client.get(f'/users/{user_id}').json() == first
+    assert counter.round_trips == 0
+
+    cached_client.put(f'/users/{user_id}', json={'name': 'bob', 'fullname': 'Bob'})
+    assert cached_client.get(f'/users/{user_id}').json()['data']['name'] == 'bob'
+
+    assert cached_client.get(f'/addresses/users/{user_id}').json()['data'] == []
+    address_id = cached_client.post(
+        f'/addresses/users/{user_id}', json={'email_address': 'a@example.com'}).json()['data']['id']
+    assert len(cached_client.get(f'/addresses/users/{user_id}').json()['data']) == 1
+    assert len(cached_client.get(f'/users/{user_id}').json()['data']['addresses']) == 1
+
+    cached_client.delete(f'/addresses/{address_id}')
+    assert cached_client.get(f'/addresses/users/{user_id}').json()['data'] == []
+    cached_client.delete(f'/users/{user_id}')
+    assert cached_client.get(f'/users/{user_id}').json()['code'] == 404
+
+
+@pytest.mark.parametrize('backend_factory', [lambda: MemoryCacheBackend(100), lambda: RedisCacheBackend(FakeRedis())])
+def test_response_cache_single_flight(backend_factory):
+    # 本进程内的重建完成时唤醒等待的同步请求，等待时间需长于重建耗时
+    cache = ResponseCache(backend_factory(), 'test', ttl=60, lock_timeout=5, poll_interval=0.005, sync_lock_wait=1)
+    calls = []
+
+    @cache.cached(tags=['user:{user_id}'])
+    def endpoint(user_id: int):
+        calls.append(user_id)
+        time.sleep(0.1)
+        return DataResponseModel[dict](data={'id': user_id})
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        bodies = {response.body for response in executor.map(lambda _: endpoint(user_id=1), range(8))}
+    assert calls == [1] and len(bodies) == 1
+    assert cache.lock_waits == 7
+
+    cache.invalidate('user:1')
+    endpoint(user_id=1)
+    assert calls == [1, 1]
+
+
+
+@pytest.mark.parametrize('backend_factory', [lambda: MemoryCacheBackend(100), lambda: RedisCacheBackend(FakeRedis())])
+def test_response_cache_sync_waiter_falls_through(backend_factory):
+    backend = backend_factory()
+    cache = ResponseCache(backend, 'test', ttl=60, lock_timeout=5, sync_lock_wait=0.05)
+    calls = []
+
+    @cache.cached(namespace='endpoint')
+    def endpoint(user_id: int):
+        calls.append(user_id)
+        return DataResponseModel[dict](data={'id': user_id})
+
+    # 其他worker持有重建锁且迟迟未写入缓存时，同步请求只短暂等待后自行执行，不占用线程池直到锁超时
+    assert backend.acquire_lock(f'{cache.build_key("endpoint", {"user_id": 1})}:lock', 'other', 5)
+    start = time.monotonic()
+    endpoint(user_id=1)
+    assert time.monotonic() - start < 1
+    assert calls == [1] and cache.lock_waits == 0
+
+
+def test_response_cache_off_executes_endpoint(session, monkeypatch):
+    # CACHE_BACKEND=off（默认）时每次请求都执行接口
+    monkeypatch.setattr(response_cache, 'backend', None)
+    entity_cache.clear()
+    user_id = UserService.create_user(UserCreate(name='alice'), session).data.id
+
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.dependency_overrides[get_session] = lambda: session
+    with TestClient(app) as client:
+        for _ in range(2):
+            entity_cache.clear()
+            session.counter.reset()
+            assert client.get(f'/users/{user_id}').json()['data']['name'] == 'alice'
+            assert session.counter.round_trips == 1
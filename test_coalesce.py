@@ -0,0 +1,133 @@
+"""
+合并写入测试：并发的单条创建合并为一次批量插入与一次提交
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from dto.schemas import AddressCreate, UserCreate
+from entity.entity_cache import entity_cache
+from entity.models import Base, User as UserModel
+from service.address_service import AddressService, AsyncAddressService
+from service.user_service import AsyncUserService, UserService
+from utils.coalesce_util import AsyncWriteCoalescer
+
+from conftest import RoundTripCounter
+
+
+def test_write_coalescing_batches_single_creates(tmp_path, monkeypatch):
+    from service import address_service, user_service
+
+    engine = create_engine(f'sqlite:///{tmp_path / "coalesce.db"}')
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # 模拟数据库拒绝其中一条记录，整批插入失败后逐条重试
+        conn.exec_driver_sql(
+            "CREATE TRIGGER reject_user BEFORE INSERT ON user_account WHEN NEW.name = 'rejected' "
+            "BEGIN SELECT RAISE(ABORT, 'user rejected'); END")
+    counter = RoundTripCounter(engine)
+    entity_cache.clear()
+    for coalescer in (user_service.user_create_coalescer, address_service.address_create_coalescer):
+        monkeypatch.setattr(coalescer, 'enabled', True)
+        monkeypatch.setattr(coalescer, 'window', 5)
+        monkeypatch.setattr(coalescer, 'max_rows', 8)
+
+    def concurrently(call, count):
+        barrier = threading.Barrier(count)
+
+        def run(i):
+            with Session(engine) as db_session:
+                barrier.wait()
+                return call(i, db_session)
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            return list(executor.map(run, range(count)))
+
+    # 8个并发请求凑满一批，一条多行INSERT、一次提交，各请求得到各自的新用户
+    users = concurrently(lambda i, db_session: UserService.create_user(UserCreate(name=f'user{i}'), db_session), 8)
+    assert all(user.success for user in users)
+    assert [user.data.name for user in users] == [f'user{i}' for i in range(8)]
+    with Session(engine) as db_session:
+        assert all(db_session.get(UserModel, user.data.id).name == user.data.name for user in users)
+    assert len([s for s in counter.statements if s.startswith('INSERT')]) == 1 and counter.commits == 1
+
+    user_ids = [user.data.id for user in users]
+    counter.reset()
+    addresses = concurrently(lambda i, db_session: AddressService.create_address(
+        user_ids[i] if i else 999, AddressCreate(email_address=f'user{i}@example.com'), db_session), 8)
+    assert addresses[0].code == 404
+    assert [address.data.user_id for address in addresses[1:]] == user_ids[1:]
+    assert [address.data.email_address for address in addresses[1:]] == [f'user{i}@example.com' for i in range(1, 8)]
+    assert len([s for s in counter.statements if s.startswith('INSERT')]) == 1 and counter.commits == 1
+
+    # 整批失败时逐条重试，只有被拒绝的请求失败
+    counter.reset()
+    names = ['rejected' if i == 3 else f'retry{i}' for i in range(8)]
+    users = concurrently(lambda i, db_session: UserService.create_user(UserCreate(name=names[i]), db_session), 8)
+    assert [user.success for user in users] == [i != 3 for i in range(8)]
+    assert 'user rejected' in users[3].msg
+    assert counter.commits == 7
+    with Session(engine) as db_session:
+        assert db_session.scalar(select(func.count()).select_from(UserModel)) == 15
+
+    async def scenario():
+        async_engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "coalesce.db"}')
+        async_counter = RoundTripCounter(async_engine.sync_engine)
+        for coalescer in (user_service.async_user_create_coalescer, address_service.async_address_create_coalescer):
+            monkeypatch.setattr(coalescer, 'enabled', True)
+            monkeypatch.setattr(coalescer, 'window', 5)
+            monkeypatch.setattr(coalescer, 'max_rows', 4)
+
+        async def create(i):
+            async with AsyncSession(async_engine, expire_on_commit=False) as db_session:
+                user = await AsyncUserService.create_user(UserCreate(name=f'async{i}'), db_session)
+                address = await AsyncAddressService.create_address(
+                    user.data.id, AddressCreate(email_address=f'async{i}@example.com'), db_session)
+                return user, address
+
+        try:
+            results = await asyncio.gather(*(create(i) for i in range(4)))
+            assert [user.data.name for user, _ in results] == [f'async{i}' for i in range(4)]
+            assert [address.data.user_id for user, address in results] == [user.data.id for user, _ in results]
+            assert len([s for s in async_counter.statements if s.startswith('INSERT')]) == 2
+            assert async_counter.commits == 2
+        finally:
+            await async_engine.dispose()
+
+    asyncio.run(scenario())
+    engine.dispose()
+
+
+def test_async_coalescer_survives_leader_cancellation():
+    flushed = []
+
+    async def flush(session, items):
+        await asyncio.sleep(0.01)
+        flushed.append(list(items))
+        return [f'saved-{item}' for item in items]
+
+    class FakeSession:
+        def get_bind(self):
+            return 'db'
+
+    async def scenario():
+        coalescer = AsyncWriteCoalescer(flush, enabled=True, window_ms=5000, max_rows=4)
+        session = FakeSession()
+        leader = asyncio.create_task(coalescer.submit(session, 0))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(coalescer.submit(session, i)) for i in range(1, 3)]
+        await asyncio.sleep(0)
+        # leader在等待时间窗口期间被取消，批次仍然写入，其他调用方得到各自的结果
+        leader.cancel()
+        late = asyncio.create_task(coalescer.submit(session, 3))
+        assert await asyncio.gather(*followers, late) == ['saved-1', 'saved-2', 'saved-3']
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert flushed == [[0, 1, 2, 3]]
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+"""
+响应压缩中间件测试：编码协商与压缩输出
+"""
+import asyncio
+import zlib
+
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middlewares.compression_middleware import CompressionMiddleware, negotiate_encoding
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding('gzip, deflate, br', ('zstd', 'br', 'gzip')) == 'br'
+    assert negotiate_encoding('gzip;q=1.0, br;q=0.5', ('zstd', 'br', 'gzip')) == 'gzip'
+    assert negotiate_encoding('*;q=0.1, gzip;q=0', ('zstd', 'gzip')) == 'zstd'
+    assert negotiate_encoding('identity', ('gzip',)) is None
+
+
+def test_compression_middleware():
+    router = APIRouter()
+
+    @router.get('/json')
+    def json_endpoint():
+        return {'rows': ['x' * 20] * 100}
+
+    @router.get('/small')
+    def small_endpoint():
+        return {'ok': True}
+
+    @router.get('/image')
+    def image_endpoint():
+        return Response(content=b'\x89PNG' * 1000, media_type='image/png')
+
+    @router.get('/stream')
+    def stream_endpoint():
+        return StreamingResponse((f'{i}\n'.encode() for i in range(1000)), media_type='application/x-ndjson')
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(CompressionMiddleware, encodings=('gzip',))
+    with TestClient(app) as client:
+        gzip_headers = {'Accept-Encoding': 'gzip'}
+        response = client.get('/json', headers=gzip_headers)
+        assert response.headers['content-encoding'] == 'gzip' and response.headers['vary'] == 'Accept-Encoding'
+        assert response.json() == {'rows': ['x' * 20] * 100}
+        assert int(response.headers['content-length']) < 200
+        assert 'content-encoding' not in client.get('/small', headers=gzip_headers).headers
+        assert 'content-encoding' not in client.get('/image', headers=gzip_headers).headers
+        assert 'content-encoding' not in client.get('/json', headers={'Accept-Encoding': 'identity'}).headers
+
+        response = client.get('/stream', headers=gzip_headers)
+        assert response.headers['content-encoding'] == 'gzip' and 'content-length' not in response.headers
+        assert response.content == b''.join(f'{i}\n'.encode() for i in range(1000))
+
+    # 流式响应每个分块同步刷新，客户端收到即可解压，无需等待响应结束
+    async def stream_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'first\n', 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'second\n', 'more_body': False})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'headers': [(b'accept-encoding', b'gzip')]}
+    asyncio.run(CompressionMiddleware(stream_app, encodings=('gzip',))(scope, None, send))
+    decompressor = zlib.decompressobj(31)
+    assert decompressor.decompress(messages[1]['body']) == b'first\n'
+    assert decompressor.decompress(messages[2]['body']) == b'second\n' and decompressor.eof
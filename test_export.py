@@ -0,0 +1,74 @@
+"""
+导出接口测试：分批流式输出，客户端断开时释放会话
+"""
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+
+from config.env import DataBaseConfig
+from control import export_controller
+from dto.schemas import AddressCreate, UserCreate
+from entity.database import get_session
+from service.address_service import AddressService
+from service.user_service import UserService
+
+
+@pytest.fixture
+def export_client(session, monkeypatch):
+    monkeypatch.setattr(DataBaseConfig, 'db_export_chunk_size', 2)
+    for i in range(5):
+        UserService.create_user(UserCreate(name=f'user{i}', fullname=None), session)
+    AddressService.create_address(1, AddressCreate(email_address='a@example.com'), session)
+
+    def override_session():
+        with Session(session.get_bind()) as db_session:
+            yield db_session
+
+    app = FastAPI()
+    app.include_router(export_controller.router)
+    app.dependency_overrides[get_session] = override_session
+    with TestClient(app) as client:
+        yield client
+
+
+def test_export_streams_in_batches(export_client, session):
+    session.counter.reset()
+    response = export_client.get('/users/export')
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert [user['id'] for user in users] == [1, 2, 3, 4, 5]
+    assert users[0]['addresses'] == [{'email_address': 'a@example.com', 'id': 1, 'user_id': 1}]
+    # 一次流式查询 + 每批（2条）一次地址预加载查询
+    assert len(session.counter.statements) == 1 + 3
+
+    rows = list(csv.reader(io.StringIO(export_client.get('/addresses/export', params={'format': 'csv'}).text)))
+    assert rows == [['email_address', 'id', 'user_id'], ['a@example.com', '1', '1']]
+
+
+def test_export_releases_session_on_disconnect(export_client, session):
+    response = UserService.export_users('ndjson', session)
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(60)
+
+    async def send(message):
+        if message['type'] == 'http.response.body':
+            sent.append(message['body'])
+            raise OSError('client disconnected')
+
+    async def run():
+        with pytest.raises(ClientDisconnect):
+            await response({'type': 'http', 'asgi': {'spec_version': '2.4'}}, receive, send)
+        # 断开后立即释放，而不是等到事件循环关闭时回收异步生成器
+        assert not session.in_transaction()
+
+    asyncio.run(run())
+    assert sent[0].count(b'\n') == 2
@@ -0,0 +1,99 @@
+"""
+预加载测试：按响应模型生成的预加载策略使查询次数与记录数无关，懒加载守卫发现未预加载的关联
+"""
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from common.vo import DataResponseModel
+from dto.schemas import Address, AddressCreate, User, UserCreate
+from entity import lazy_load_guard
+from entity.lazy_load_guard import register_lazy_load_guard
+from entity.loader import loader_options
+from entity.models import Address as AddressModel, User as UserModel
+from exceptions.exception import LazyLoadException
+from service.address_service import AddressService
+from service.user_service import UserService
+
+
+def create_users(session, count):
+    for i in range(count):
+        user_id = UserService.create_user(UserCreate(name=f'user{i}'), session).data.id
+        for j in range(2):
+            AddressService.create_address(user_id, AddressCreate(email_address=f'u{i}a{j}@example.com'), session)
+    session.expunge_all()
+
+
+@pytest.fixture
+def guard():
+    listeners = []
+
+    def register(mode):
+        listener = register_lazy_load_guard(mode)
+        listeners.append(listener)
+        return listener
+
+    yield register
+    for listener in listeners:
+        event.remove(Session, 'do_orm_execute', listener)
+
+
+def test_loader_options_follow_response_model():
+    assert len(loader_options(UserModel, User)) == 1
+    # 每种组合只生成一次
+    assert loader_options(UserModel, User) is loader_options(UserModel, User)
+    # 响应模型不包含关联字段时不预加载
+    assert loader_options(AddressModel, Address) == ()
+
+
+@pytest.mark.parametrize('count', [3, 12])
+def test_list_users_query_count_independent_of_rows(session, count):
+    create_users(session, count)
+    session.counter.reset()
+    result = UserService.list_users(session)
+    assert len(result.data) == count and all(len(user.addresses) == 2 for user in result.data)
+    # 用户一次查询，所有用户的地址一次selectin查询
+    assert len(session.counter.statements) == 2
+
+    session.expunge_all()
+    session.counter.reset()
+    # 单条查询使用joinedload，一次查询带出地址
+    assert len(UserService.get_user(1, session).data.addresses) == 2
+    assert len(session.counter.statements) == 1
+
+
+def test_without_loader_options_is_n_plus_one(session):
+    create_users(session, 5)
+    session.counter.reset()
+    users = session.scalars(select(UserModel)).all()
+    DataResponseModel[list[User]](data=users)
+    # 不预加载时每个用户的地址各触发一次懒加载
+    assert len(session.counter.statements) == 1 + 5
+
+
+def test_lazy_load_guard_raises_on_unplanned_load(session, guard):
+    create_users(session, 2)
+    guard('raise')
+    users = session.scalars(select(UserModel)).all()
+    # 守卫在读取关联属性时抛出LazyLoadException，Pydantic将其报告为对应字段的校验错误
+    with pytest.raises(ValidationError) as exc_info:
+        DataResponseModel[list[User]](data=users)
+    errors = exc_info.value.errors()
+    assert [error['loc'] for error in errors] == [('data', 0, 'addresses'), ('data', 1, 'addresses')]
+    assert all(error['ctx']['error'].startswith(LazyLoadException.__name__) for error in errors)
+
+    # 序列化之外的懒加载与预加载后的序列化不受影响
+    session.expunge_all()
+    assert len(session.scalars(select(UserModel)).first().addresses) == 2
+    assert len(UserService.list_users(session).data) == 2
+
+
+def test_lazy_load_guard_warns(session, guard, monkeypatch):
+    create_users(session, 1)
+    warnings = []
+    monkeypatch.setattr(lazy_load_guard.logger, 'warning', warnings.append)
+    guard('warn')
+    assert register_lazy_load_guard('off') is None
+    DataResponseModel[list[User]](data=session.scalars(select(UserModel)).all())
+    assert len(warnings) == 1 and 'User.addresses' in warnings[0]
@@ -0,0 +1,81 @@
+"""
+日志测试：重复日志采样、批量写入sink不阻塞、JSON格式与轮转压缩
+"""
+import io
+import json
+import threading
+import time
+import zipfile
+
+from utils.log_util import BackgroundCompressor, BatchedSink, LogSampler, logger
+
+
+def test_log_sampler_limits_repeated_messages(monkeypatch):
+    sampler = LogSampler({'DEBUG': 0.0}, burst=2, window=10)
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    sampler._window_start = 0.0
+
+    def record(level, message, no=30):
+        return {'level': type('Level', (), {'name': level, 'no': no})(), 'message': message}
+
+    assert not sampler(record('DEBUG', 'debug', 10))
+    assert [sampler(record('WARNING', 'same')) for _ in range(5)] == [True, True, False, False, False]
+    assert sampler(record('WARNING', 'other'))
+    # 下一窗口第一次输出时附带被抑制的条数
+    now[0] = 10.0
+    first = record('WARNING', 'same')
+    assert sampler(first) and first['message'].endswith('另有3条相同日志已抑制)')
+    assert sampler(record('WARNING', 'same')) and not sampler(record('WARNING', 'same'))
+
+
+def test_batched_sink_drops_instead_of_blocking():
+    release = threading.Event()
+
+    class SlowStream(io.StringIO):
+        def write(self, text):
+            release.wait(5)
+            return super().write(text)
+
+    stream = SlowStream()
+    sink = BatchedSink(stream=stream, queue_size=2)
+    handler_id = logger.add(sink, format='{message}', colorize=False)
+    try:
+        start = time.perf_counter()
+        for i in range(20):
+            logger.error(f'storm {i}')
+        # 写线程阻塞时调用方不等待，超出队列容量的日志被丢弃
+        assert time.perf_counter() - start < 1 and sink.dropped_total >= 15
+    finally:
+        release.set()
+        logger.remove(handler_id)
+    lines = stream.getvalue().splitlines()
+    assert any('丢弃' in line for line in lines) and 'storm 19' not in lines
+    assert len(lines) == 20 - sink.dropped_total + 1
+
+
+def test_batched_sink_json_rotation(tmp_path):
+    compressor = BackgroundCompressor()
+    path = tmp_path / 'app.log'
+    sink = BatchedSink(path=str(path), rotation_bytes=200, compressor=compressor, serialize=True)
+    handler_id = logger.add(sink, format=lambda record: '', colorize=False)
+    for i in range(10):
+        logger.bind(user_id=i).warning(f'message {i}')
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception('boom')
+    logger.remove(handler_id)
+    compressor.shutdown()
+
+    # 轮转后的文件在后台压缩为zip
+    archives = sorted(tmp_path.glob('app.*.log.zip'))
+    assert len(archives) > 1 and not list(tmp_path.glob('app.*.log'))
+    text = ''
+    for archive in archives:
+        with zipfile.ZipFile(archive) as zf:
+            text += zf.read(zf.namelist()[0]).decode()
+    entries = [json.loads(line) for line in (text + path.read_text(encoding='utf-8')).splitlines()]
+    assert [entry['message'] for entry in entries] == [f'message {i}' for i in range(10)] + ['boom']
+    assert entries[0]['extra'] == {'user_id': 0} and 'trace_id' in entries[0]
+    assert 'ZeroDivisionError' in entries[-1]['exception']
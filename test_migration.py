@@ -0,0 +1,106 @@
+"""
+索引测试：热点查询命中索引，已有表补建缺失索引
+"""
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import Session
+
+from dto.schemas import AddressCreate, UserCreate
+from entity.entity_cache import entity_cache
+from entity.models import Base, User as UserModel
+from service.address_service import AddressService
+from service.user_service import UserService
+
+
+def explain_query_plans(engine, call):
+    """执行调用并返回其中各SELECT语句在SQLite中的查询计划"""
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        call()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+    with engine.connect() as conn:
+        return {
+            statement: ' | '.join(row[-1] for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+            for statement, parameters in captured
+        }
+
+
+def test_hot_queries_use_indexes(session):
+    engine = session.get_bind()
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session)
+    session.expunge_all()
+    entity_cache.clear()
+
+    plans = explain_query_plans(engine, lambda: (
+        AddressService.list_addresses(user_id, session),
+        AddressService.page_addresses(user_id, 10, None, None, True, session),
+        UserService.list_users(session),
+        UserService.get_user(user_id, session),
+    ))
+    address_plans = [plan for statement, plan in plans.items() if 'FROM address' in statement]
+    assert len(address_plans) >= 3
+    for plan in address_plans:
+        # 按用户过滤并按id排序的分页查询也不需要额外排序
+        assert 'SCAN address' not in plan and 'ix_address_user_id' in plan and 'TEMP B-TREE' not in plan, plan
+
+    by_name = select(UserModel).where(UserModel.name == 'alice')
+    plans = explain_query_plans(engine, lambda: session.scalars(by_name).all())
+    assert all('USING INDEX ix_user_account_name' in plan for plan in plans.values()), plans
+
+
+def create_legacy_tables(engine):
+    """创建添加索引之前的表结构并写入数据"""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE user_account (id INTEGER PRIMARY KEY AUTOINCREMENT, name VARCHAR(30) NOT NULL, '
+            'fullname VARCHAR(50), create_time DATETIME, update_time DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE address (id INTEGER PRIMARY KEY AUTOINCREMENT, email_address VARCHAR(100) NOT NULL, '
+            'user_id INTEGER NOT NULL REFERENCES user_account (id))')
+        conn.exec_driver_sql("INSERT INTO user_account (name) VALUES ('alice')")
+        conn.exec_driver_sql("INSERT INTO address (email_address, user_id) VALUES ('a@example.com', 1)")
+
+
+def test_ensure_indexes_migrates_existing_tables(tmp_path):
+    from entity.migration import ensure_indexes
+
+    engine = create_engine(f'sqlite:///{tmp_path / "legacy.db"}')
+    create_legacy_tables(engine)
+    Base.metadata.create_all(engine)
+
+    assert ensure_indexes(engine) == ['ix_user_account_name', 'ix_address_user_id']
+    assert ensure_indexes(engine) == []
+    with Session(engine) as db_session:
+        assert AddressService.list_addresses(1, db_session).data[0].email_address == 'a@example.com'
+    engine.dispose()
+
+
+def test_migration_command_runs_outside_startup(tmp_path):
+    db_file = tmp_path / 'legacy.db'
+    engine = create_engine(f'sqlite:///{db_file}')
+    create_legacy_tables(engine)
+    env = {**os.environ, 'DB_URL': f'sqlite:///{db_file}'}
+
+    def index_names():
+        return {index['name'] for table in ('user_account', 'address') for index in inspect(engine).get_indexes(table)}
+
+    # 应用启动只建缺少的表，不补建索引
+    subprocess.run([sys.executable, '-c', 'from entity.database import create_tables; create_tables()'],
+                   env=env, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert index_names() == set()
+    result = subprocess.run([sys.executable, '-m', 'entity.migration'], env=env, check=True, capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert '已补建 2 个索引' in result.stdout
+    assert index_names() == {'ix_user_account_name', 'ix_address_user_id'}
+    engine.dispose()
@@ -0,0 +1,148 @@
+"""
+分页测试：键集游标往返、hasNext、无效游标返回400、无游标时按页码分页、总记录数缓存
+"""
+import base64
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from control import address_controller, user_controller
+from dto.schemas import AddressCreate, UserCreate
+from entity.database import get_session
+from entity.models import User as UserModel
+from service.address_service import AddressService
+from service.user_service import UserService
+from utils.page_util import PageUtil
+
+
+@pytest.fixture
+def page_client(session, monkeypatch):
+    monkeypatch.setattr(PageUtil, '_count_cache', {})
+    user_ids = [UserService.create_user(UserCreate(name=f'user{i}'), session).data.id for i in range(5)]
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.include_router(address_controller.router)
+    app.dependency_overrides[get_session] = lambda: session
+    with TestClient(app) as client:
+        yield client, user_ids
+
+
+def test_cursor_round_trip():
+    cursor = PageUtil.encode_cursor(42, 3)
+    # 游标不含填充字符，可直接放入查询参数
+    assert '=' not in cursor
+    assert PageUtil.decode_cursor(cursor) == (42, 3)
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!',
+    base64.urlsafe_b64encode(b'not json').decode(),
+    base64.urlsafe_b64encode(b'{"id": 1}').decode(),
+    base64.urlsafe_b64encode(b'{"id": "x", "p": 1}').decode(),
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match='无效的分页游标'):
+        PageUtil.decode_cursor(cursor)
+
+
+def test_keyset_pages(page_client):
+    client, user_ids = page_client
+    seen, cursor, pages = [], None, []
+    while True:
+        params = {'page_size': 2, **({'cursor': cursor} if cursor else {})}
+        page = client.get('/users/page', params=params).json()
+        assert page['success'] and page['total'] is None
+        seen += [row['id'] for row in page['rows']]
+        pages.append((page['pageNum'], page['hasNext']))
+        cursor = page['nextCursor']
+        if not page['hasNext']:
+            assert cursor is None
+            break
+    assert seen == user_ids
+    assert pages == [(1, True), (2, True), (3, False)]
+
+    # 记录数恰好为页大小的整数倍时，最后一页没有下一页
+    page = client.get('/users/page', params={'page_size': 5}).json()
+    assert len(page['rows']) == 5 and not page['hasNext'] and page['nextCursor'] is None
+
+
+def test_tampered_cursor_returns_400(page_client):
+    client, _ = page_client
+    cursor = client.get('/users/page', params={'page_size': 2}).json()['nextCursor']
+    for tampered in (cursor[:-2], 'x' + cursor, base64.urlsafe_b64encode(b'{"id": []}').decode()):
+        page = client.get('/users/page', params={'page_size': 2, 'cursor': tampered}).json()
+        assert page['code'] == 400 and not page['success'] and page['msg'] == '无效的分页游标'
+
+
+def test_offset_fallback(page_client):
+    client, user_ids = page_client
+    page = client.get('/users/page', params={'page_size': 2, 'page_num': 2}).json()
+    assert [row['id'] for row in page['rows']] == user_ids[2:4]
+    assert page['pageNum'] == 2 and page['hasNext']
+    # 页码分页返回的游标可继续按键集分页
+    page = client.get('/users/page', params={'page_size': 2, 'cursor': page['nextCursor']}).json()
+    assert [row['id'] for row in page['rows']] == user_ids[4:] and page['pageNum'] == 3 and not page['hasNext']
+    # 同时传入游标与页码时以游标为准
+    cursor = PageUtil.encode_cursor(user_ids[0], 2)
+    page = client.get('/users/page', params={'page_size': 2, 'page_num': 3, 'cursor': cursor}).json()
+    assert [row['id'] for row in page['rows']] == user_ids[1:3] and page['pageNum'] == 2
+
+
+def test_total_is_cached(page_client, session, monkeypatch):
+    client, _ = page_client
+    assert client.get('/users/page', params={'with_total': True}).json()['total'] == 5
+    session.counter.reset()
+    # 缓存期内没有写入时不再执行COUNT(*)
+    assert client.get('/users/page', params={'with_total': True}).json()['total'] == 5
+    assert not any('count(' in statement.lower() for statement in session.counter.statements)
+
+    monkeypatch.setattr(PageUtil, 'COUNT_CACHE_SECONDS', -1)
+    PageUtil.set_cached_total('user_account', 5, PageUtil.count_generation)
+    assert PageUtil.get_cached_total('user_account') is None
+
+
+def test_total_invalidated_by_writes(page_client, session):
+    client, user_ids = page_client
+
+    def totals():
+        return (client.get('/users/page', params={'with_total': True}).json()['total'],
+                client.get(f'/addresses/users/{user_ids[0]}/page', params={'with_total': True}).json()['total'])
+
+    assert totals() == (5, 0)
+    # 工作单元中的新增、删除提交后失效
+    UserService.create_user(UserCreate(name='another'), session)
+    AddressService.create_address(user_ids[0], AddressCreate(email_address='a@example.com'), session)
+    assert totals() == (6, 1)
+    UserService.delete_user(user_ids[-1], session)
+    assert totals() == (5, 1)
+    # 绕过工作单元的批量INSERT/DELETE提交后同样失效
+    UserService.batch_create_users([{'name': 'bulk1'}, {'name': 'bulk2'}], session)
+    AddressService.batch_create_addresses(user_ids[0], [{'email_address': 'b@example.com'}], session)
+    assert totals() == (7, 2)
+    UserService.batch_delete_users([user_ids[0]], session)
+    assert totals() == (6, 0)
+    # 回滚的写入不使缓存失效
+    session.add(UserModel(name='rolled'))
+    session.flush()
+    session.rollback()
+    session.counter.reset()
+    assert totals() == (6, 0)
+    assert not any('count(' in statement.lower() for statement in session.counter.statements)
+
+
+def test_total_cache_skips_stale_fill_and_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(PageUtil, '_count_cache', {})
+    monkeypatch.setattr(PageUtil, 'COUNT_CACHE_MAX_SIZE', 2)
+    # COUNT执行期间发生失效时不回填
+    generation = PageUtil.count_generation
+    PageUtil.invalidate_totals(['user_account'])
+    PageUtil.set_cached_total('user_account', 5, generation)
+    assert PageUtil.get_cached_total('user_account') is None
+
+    for key in ('user_account', 'address:1', 'address:2'):
+        PageUtil.set_cached_total(key, 1, PageUtil.count_generation)
+    assert list(PageUtil._count_cache) == ['address:1', 'address:2']
+    PageUtil.invalidate_totals(['address'])
+    assert PageUtil._count_cache == {}
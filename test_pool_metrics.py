@@ -0,0 +1,105 @@
+"""
+连接池指标测试：取出/归还次数、溢出连接、等待耗时与超时次数，引擎按配置创建连接池
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from config.env import DataBaseConfig
+from entity.database import create_async_db_engine, create_db_engine
+from entity.pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool, PoolMetrics, pool_metrics_registry
+)
+
+
+@pytest.fixture
+def pool_config(monkeypatch):
+    monkeypatch.setattr(DataBaseConfig, 'db_pool_size', 1)
+    monkeypatch.setattr(DataBaseConfig, 'db_max_overflow', 1)
+    monkeypatch.setattr(DataBaseConfig, 'db_pool_timeout', 0.2)
+    monkeypatch.setattr(DataBaseConfig, 'db_pool_recycle', 120)
+    monkeypatch.setattr(DataBaseConfig, 'db_pool_pre_ping', False)
+    yield
+    for name in ('test-pool', 'test-pool-async'):
+        pool_metrics_registry.pop(name, None)
+
+
+def test_create_db_engine_applies_pool_config(tmp_path, pool_config):
+    engine = create_db_engine(f'sqlite:///{tmp_path / "pool.db"}', name='test-pool')
+    pool = engine.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    assert (pool.size(), pool._max_overflow, pool.timeout(), pool._recycle, pool._pre_ping) == (1, 1, 0.2, 120, False)
+    assert pool_metrics_registry['test-pool'].pool is pool and pool.metrics is pool_metrics_registry['test-pool']
+
+    # 重建连接池后指标继续指向新的连接池
+    engine.dispose()
+    assert engine.pool is not pool and pool_metrics_registry['test-pool'].pool is engine.pool
+    assert engine.pool.metrics is pool_metrics_registry['test-pool']
+    engine.dispose()
+
+    # 内存库使用SQLAlchemy默认的单连接池，不应用连接池参数
+    memory_engine = create_db_engine('sqlite://', name='test-pool')
+    assert not isinstance(memory_engine.pool, InstrumentedQueuePool)
+    memory_engine.dispose()
+
+
+def test_instrumented_pool_reports_checkouts_overflow_and_wait(tmp_path, pool_config):
+    engine = create_db_engine(f'sqlite:///{tmp_path / "pool.db"}', name='test-pool')
+    metrics = pool_metrics_registry['test-pool']
+    try:
+        first, second = engine.connect(), engine.connect()
+        snapshot = metrics.snapshot()
+        assert snapshot['pool'] == 'InstrumentedQueuePool'
+        assert (snapshot['checked_out'], snapshot['overflow'], snapshot['checkouts'], snapshot['connects']) == (2, 1, 2, 2)
+
+        # 连接池与溢出连接都已用完，获取连接等待到超时
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        snapshot = metrics.snapshot()
+        assert snapshot['checkout_timeouts'] == 1 and snapshot['wait_seconds']['max'] >= 0.2
+
+        # 其他线程归还连接后，等待中的请求取得连接，等待耗时计入直方图
+        timer = threading.Timer(0.05, second.close)
+        timer.start()
+        start = time.perf_counter()
+        with engine.connect() as third:
+            third.execute(text('SELECT 1'))
+        waited = time.perf_counter() - start
+        timer.join()
+        first.close()
+
+        snapshot = metrics.snapshot()
+        assert snapshot['checkouts'] == 3 and snapshot['checkins'] == 3 and snapshot['checked_out'] == 0
+        wait = snapshot['wait_seconds']
+        assert wait['count'] == 4 and wait['buckets']['+Inf'] == 4
+        assert wait['buckets']['0.025'] == 2 and 0.04 <= waited
+    finally:
+        engine.dispose()
+
+
+def test_async_engine_pool_metrics(tmp_path, pool_config):
+    async def scenario():
+        engine = create_async_db_engine(f'sqlite+aiosqlite:///{tmp_path / "pool.db"}', name='test-pool-async')
+        try:
+            assert isinstance(engine.sync_engine.pool, InstrumentedAsyncAdaptedQueuePool)
+            async with engine.connect() as conn:
+                await conn.execute(text('SELECT 1'))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+    snapshot = pool_metrics_registry['test-pool-async'].snapshot()
+    assert snapshot['checkouts'] == 1 and snapshot['checkins'] == 1 and snapshot['wait_seconds']['count'] == 1
+
+
+def test_wait_histogram_buckets():
+    metrics = PoolMetrics('test')
+    for seconds in (0.0005, 0.003, 0.003, 100):
+        metrics.observe_wait(seconds)
+    buckets = metrics.snapshot()['wait_seconds']['buckets']
+    assert (buckets['0.001'], buckets['0.005'], buckets['30.0'], buckets['+Inf']) == (1, 3, 3, 4)
+    assert metrics.snapshot()['wait_seconds']['max'] == 100
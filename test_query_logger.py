@@ -0,0 +1,75 @@
+"""
+SQL日志测试：慢查询记录、普通查询按比例采样，执行失败的语句不残留开始时间
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from entity import query_logger as query_logger_module
+from entity.query_logger import register_query_logger
+
+
+class RecordingLogger:
+    def __init__(self):
+        self.records = []
+
+    def warning(self, message):
+        self.records.append(('WARNING', message))
+
+    def info(self, message):
+        self.records.append(('INFO', message))
+
+
+@pytest.fixture
+def logged_engine(monkeypatch):
+    recorder = RecordingLogger()
+    monkeypatch.setattr(query_logger_module, 'logger', recorder)
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    query_logger = register_query_logger(engine)
+    yield engine, query_logger, recorder
+    engine.dispose()
+
+
+def test_slow_queries_logged(logged_engine):
+    engine, query_logger, recorder = logged_engine
+    query_logger.sample_rate = 0
+    query_logger.slow_query_seconds = 60
+    with engine.connect() as conn:
+        conn.execute(text('SELECT :value'), {'value': 1})
+    assert recorder.records == []
+
+    query_logger.slow_query_seconds = 0
+    with engine.connect() as conn:
+        conn.execute(text('SELECT :value'), {'value': 'x' * 1000})
+    [(level, message)] = recorder.records
+    assert level == 'WARNING' and message.startswith('慢查询 ') and 'SELECT ?' in message
+    # 过长的参数被截断
+    assert message.endswith('...')
+
+
+def test_queries_sampled(logged_engine, monkeypatch):
+    engine, query_logger, recorder = logged_engine
+    query_logger.slow_query_seconds = 60
+    query_logger.sample_rate = 0.5
+    draws = iter([0.9, 0.1])
+    monkeypatch.setattr(query_logger_module.random, 'random', lambda: next(draws))
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        conn.execute(text('SELECT 2'))
+    # 只有随机数落在采样比例内的查询被记录
+    [(level, message)] = recorder.records
+    assert level == 'INFO' and message.startswith('SQL采样 ') and 'SELECT 2' in message
+
+
+def test_failed_statement_does_not_leak_start_time(logged_engine):
+    engine, query_logger, recorder = logged_engine
+    query_logger.sample_rate = 0
+    query_logger.slow_query_seconds = 0
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing_table'))
+        assert conn.info['query_start_time'] == []
+        assert recorder.records[0][1].startswith('慢查询（执行失败）')
+        conn.execute(text('SELECT 1'))
+        assert conn.info['query_start_time'] == []
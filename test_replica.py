@@ -0,0 +1,89 @@
+"""
+读写分离测试：从库负载均衡与会话读写路由
+"""
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from control import user_controller
+from entity.database import get_session
+from entity.entity_cache import entity_cache
+from entity.models import Base, User as UserModel
+from entity.routing_session import CTX_USE_REPLICA, ReplicaSet, RoutingSession
+from middlewares.replica_middleware import PRIMARY_COOKIE, ReplicaRoutingMiddleware
+
+
+def test_replica_set_balance():
+    first, second = create_engine('sqlite://'), create_engine('sqlite://')
+    round_robin = ReplicaSet([first, second])
+    assert [round_robin.acquire() for _ in range(4)] == [first, second, first, second]
+
+    least = ReplicaSet([first, second], 'least_connections')
+    assert least.acquire() is first and least.acquire() is second and least.acquire() is first
+    least.release(first)
+    least.release(first)
+    assert least.active == [0, 1] and least.acquire() is first
+
+
+def test_routing_session_reads_from_replica(tmp_path):
+    engines = {}
+    for name in ('primary', 'replica'):
+        engines[name] = create_engine(f'sqlite:///{tmp_path / name}.db')
+        Base.metadata.create_all(engines[name])
+        with Session(engines[name]) as db_session:
+            db_session.add(UserModel(name=name))
+            db_session.commit()
+    replica_set = ReplicaSet([engines['replica']])
+    entity_cache.clear()
+
+    def routing_session():
+        with RoutingSession(engines['primary'], replicas=replica_set) as db_session:
+            yield db_session
+
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.dependency_overrides[get_session] = routing_session
+    app.add_middleware(ReplicaRoutingMiddleware, read_your_writes_seconds=60)
+    with TestClient(app) as client:
+        # 读请求走副本，写请求读写都走主库
+        assert [user['name'] for user in client.get('/users/').json()['data']] == ['replica']
+        response = client.put('/users/1', json={'name': 'renamed'})
+        assert response.json()['data']['name'] == 'renamed'
+        # 写入后窗口内同一客户端读主库，其他客户端仍读副本
+        assert response.cookies.get(PRIMARY_COOKIE)
+        assert [user['name'] for user in client.get('/users/').json()['data']] == ['renamed']
+        assert [user['name'] for user in TestClient(app).get('/users/').json()['data']] == ['replica']
+        client.cookies.set(PRIMARY_COOKIE, str(time.time() - 1))
+        assert [user['name'] for user in client.get('/users/').json()['data']] == ['replica']
+    assert replica_set.active == [0]
+
+    async def scenario():
+        async_primary = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "primary"}.db')
+        async_replica = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "replica"}.db')
+        async_replicas = ReplicaSet([async_replica.sync_engine])
+        try:
+            token = CTX_USE_REPLICA.set(True)
+            try:
+                async with AsyncSession(async_primary, sync_session_class=RoutingSession,
+                                        replicas=async_replicas) as db_session:
+                    assert (await db_session.scalars(select(UserModel.name))).all() == ['replica']
+                    assert async_replicas.active == [1]
+                    db_session.add(UserModel(name='added'))
+                    await db_session.flush()
+                    # 会话中发生写入后查询改走主库
+                    assert (await db_session.scalars(select(UserModel.name).order_by(UserModel.id))).all() == ['renamed', 'added']
+                assert async_replicas.active == [0]
+            finally:
+                CTX_USE_REPLICA.reset(token)
+        finally:
+            await async_primary.dispose()
+            await async_replica.dispose()
+
+    asyncio.run(scenario())
+    for db_engine in engines.values():
+        db_engine.dispose()
@@ -0,0 +1,190 @@
+"""
+响应序列化测试：快速JSON响应与FastAPI默认序列化结果一致，泛型响应模型缓存与预热
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, FastAPI, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
+
+from common.router import APIRouterPro, warm_up_response_models
+from common.vo import DataResponseModel, ModelCache, PageResponseModel, generic_model_cache
+from dto.schemas import Address, User
+from entity.models import Address as AddressModel, User as UserModel
+from utils.response_util import FastJSONResponse, ResponseUtil
+
+
+def test_fast_json_response_matches_jsonable_encoder():
+    users = [User(id=1, name='测试', fullname=None, addresses=[Address(id=1, email_address='a@example.com', user_id=1)])]
+    content = {'code': 200, 'data': users, 'page': DataResponseModel[dict](data={}), 'time': datetime(2026, 1, 1)}
+    assert FastJSONResponse(content=content).body == JSONResponse(content=jsonable_encoder(content)).body
+
+
+def test_api_router_pro_fast_response_matches_fastapi():
+    rows = [UserModel(id=1, name='alice', fullname=None,
+                      addresses=[AddressModel(id=1, email_address='a@example.com', user_id=1)])]
+    bodies = []
+    for router in (APIRouter(), APIRouterPro(fast_response=True)):
+
+        @router.get('/model', response_model=DataResponseModel[list[User]], response_model_exclude_none=True)
+        def model_endpoint():
+            return DataResponseModel[list[User]](data=rows, time=datetime(2026, 1, 1))
+
+        @router.get('/dict', response_model=DataResponseModel[User])
+        async def dict_endpoint():
+            return {'data': rows[0], 'time': datetime(2026, 1, 1)}
+
+        app = FastAPI()
+        app.include_router(router)
+        with TestClient(app) as client:
+            bodies.append((client.get('/model').content, client.get('/dict').content))
+    assert bodies[0] == bodies[1]
+
+
+def test_api_router_pro_fast_response_skips_validation_for_model_lists():
+    validated = []
+
+    class Item(BaseModel):
+        # 每次校验实例都执行校验器，用于统计校验次数
+        model_config = ConfigDict(revalidate_instances='always')
+        name: str
+
+        @field_validator('name')
+        @classmethod
+        def count(cls, value):
+            validated.append(value)
+            return value
+
+    items = [Item(name='a'), Item(name='b')]
+    router = APIRouterPro(fast_response=True)
+
+    @router.get('/items', response_model=list[Item])
+    def items_endpoint():
+        return items
+
+    @router.get('/typing-items', response_model=List[Item])
+    def typing_items_endpoint():
+        return items[:1]
+
+    @router.get('/dict-items', response_model=list[Item])
+    def dict_items_endpoint():
+        return [{'name': 'd'}]
+
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        validated.clear()
+        assert client.get('/items').json() == [{'name': 'a'}, {'name': 'b'}]
+        assert client.get('/typing-items').json() == [{'name': 'a'}]
+        # 返回值已是模型实例的列表时直接序列化，不再校验
+        assert validated == []
+        assert client.get('/dict-items').json() == [{'name': 'd'}]
+        assert validated == ['d']
+
+
+def test_api_router_pro_fast_response_keeps_injected_response():
+    def tag_response(response: Response):
+        response.headers['X-From-Dependency'] = 'yes'
+
+    responses = []
+    for router in (APIRouter(), APIRouterPro(fast_response=True), APIRouterPro()):
+
+        @router.post('/items', response_model=DataResponseModel[dict], dependencies=[Depends(tag_response)])
+        def create_endpoint(response: Response):
+            response.status_code = 201
+            response.headers['X-Item'] = '1'
+            response.set_cookie('session', 'abc')
+            return DataResponseModel[dict](data={'id': 1}, time=datetime(2026, 1, 1))
+
+        # 接口未声明Response参数时，依赖中设置的响应头同样保留
+        @router.get('/items', response_model=DataResponseModel[dict], dependencies=[Depends(tag_response)])
+        def list_endpoint():
+            return DataResponseModel[dict](data={}, time=datetime(2026, 1, 1))
+
+        app = FastAPI()
+        app.include_router(router)
+        with TestClient(app) as client:
+            created, listed = client.post('/items'), client.get('/items')
+        responses.append((created.status_code, created.headers['x-item'], created.headers['x-from-dependency'],
+                          created.cookies['session'], created.content, listed.headers['x-from-dependency']))
+    # 快速响应与FastAPI默认序列化一样带回注入的Response上设置的状态码、响应头与Cookie
+    assert responses[0] == responses[1] == responses[2]
+    assert responses[0][:4] == (201, '1', 'yes', 'abc') and responses[0][5] == 'yes'
+
+
+def test_api_router_pro_fast_response_is_opt_in():
+    router = APIRouterPro()
+
+    @router.get('/item', response_model=DataResponseModel[dict])
+    def item_endpoint():
+        return DataResponseModel[dict](data={})
+
+    fast_router = APIRouterPro(fast_response=True)
+    fast_router.add_api_route('/item', item_endpoint, response_model=DataResponseModel[dict])
+    assert router.routes[0].endpoint is item_endpoint
+    assert fast_router.routes[0].endpoint is not item_endpoint
+
+
+def test_generic_model_cache_creates_each_model_once():
+    cache = ModelCache(max_size=2)
+    created = []
+
+    def factory():
+        time.sleep(0.01)
+        created.append(1)
+        return User
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        models = list(executor.map(lambda _: cache.get_or_create('user', factory), range(8)))
+    assert created == [1] and all(model is User for model in models)
+    cache.get_or_create('address', lambda: Address)
+    cache.get_or_create('page', lambda: DataResponseModel)
+    info = cache.info()
+    assert (info['size'], info['hits'], info['misses'], info['evictions']) == (2, 7, 3, 1)
+    assert PageResponseModel[User] is PageResponseModel[User]
+
+
+def test_warm_up_response_models():
+    router = APIRouterPro()
+
+    @router.get('/page', response_model=PageResponseModel[Address])
+    def page_endpoint():
+        return PageResponseModel[Address](rows=[], total=0)
+
+    app = FastAPI()
+    app.include_router(router)
+    generic_model_cache.clear()
+    assert warm_up_response_models(app) == 1
+    assert PageResponseModel[Address].__name__ in generic_model_cache.info()['models']
+    assert PageResponseModel[Address] is PageResponseModel[Address]
+
+
+def test_response_util_model_content_serialized_once(monkeypatch):
+    class Stats(BaseModel):
+        model_config = ConfigDict(extra='allow', populate_by_name=True)
+        total_count: int = Field(serialization_alias='totalCount')
+        secret: str = Field('hidden', exclude=True)
+        updated: datetime
+        owner: User
+
+        @computed_field
+        @property
+        def doubled(self) -> int:
+            return self.total_count * 2
+
+    stats = Stats(total_count=3, updated=datetime(2026, 1, 1), extra_flag=True,
+                  owner=User(id=1, name='alice', fullname=None, addresses=[]))
+    expected = {'code': 200, 'msg': '操作成功', **stats.model_dump(mode='json', by_alias=True), 'success': True}
+
+    def fail(*args, **kwargs):
+        raise AssertionError('model_content不应先转换为字典')
+
+    monkeypatch.setattr(Stats, 'model_dump', fail)
+    body = json.loads(ResponseUtil.success(model_content=stats).body)
+    assert body.pop('time') and body == expected
@@ -0,0 +1,144 @@
+"""
+路由注册测试：扫描剪枝、发现模式与懒加载路由
+"""
+import asyncio
+import json
+import os
+import sys
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from common.lazy_router import LazyRoute
+from common.router import RouterRegister
+from config.env import DataBaseConfig
+from entity.database import get_async_session
+from entity.models import Base, User as UserModel
+
+
+def test_router_register_prunes_scan(tmp_path):
+    for path in ('control/a.py', 'pkg/control/b.py', '.venv/control/c.py', 'venv2/control/d.py',
+                 'lib/site-packages/control/e.py', 'logs/control/f.py', 'control/__init__.py'):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).touch()
+    (tmp_path / 'venv2' / 'pyvenv.cfg').touch()
+    router_register = RouterRegister(FastAPI(), discovery='scan')
+    router_register.project_root = str(tmp_path)
+    found = [os.path.relpath(path, tmp_path) for path in router_register._find_controller_files()]
+    assert found == [os.path.join('control', 'a.py'), os.path.join('pkg', 'control', 'b.py')]
+
+
+def test_router_register_discovery_modes(tmp_path):
+    def routes(router_register):
+        router_register.register_routers()
+        return [(route.path, sorted(route.methods)) for route in router_register.app.routes
+                if isinstance(route, (APIRoute, LazyRoute))]
+
+    manifest_path = str(tmp_path / 'route_manifest.json')
+    expected = routes(RouterRegister(FastAPI(), discovery='scan'))
+    assert ('/users/{user_id}', ['GET']) in expected and ('/health/db', ['GET']) in expected
+    assert routes(RouterRegister(FastAPI(), discovery='packages', packages=['control'])) == expected
+    # 清单不存在时回退为扫描
+    assert routes(RouterRegister(FastAPI(), discovery='manifest', manifest_path=manifest_path)) == expected
+
+    assert RouterRegister(FastAPI(), discovery='manifest', manifest_path=manifest_path).write_manifest() == 7
+    manifest = json.loads((tmp_path / 'route_manifest.json').read_text(encoding='utf-8'))
+    assert {'module': 'control.user_controller', 'attr': 'router'} in manifest['routers']
+    router_register = RouterRegister(FastAPI(), discovery='manifest', manifest_path=manifest_path)
+    router_register._find_controller_modules = None
+    assert routes(router_register) == expected
+    # 不常用的导出路由以占位路由挂载，健康检查等常用路由在启动时注册
+    kinds = {route.path: type(route) for route in router_register.app.routes if isinstance(route, (APIRoute, LazyRoute))}
+    assert kinds['/users/export'] is LazyRoute and kinds['/addresses/export'] is LazyRoute
+    assert kinds['/health/db'] is APIRoute and kinds['/users/{user_id}'] is APIRoute
+    with TestClient(router_register.app) as client:
+        assert client.get('/health/cache').json()['success']
+
+
+def test_lazy_router_loads_on_first_hit(tmp_path, monkeypatch):
+    package = tmp_path / 'lazy_admin_ctl'
+    package.mkdir()
+    (package / 'admin_controller.py').write_text(
+        'from pydantic import BaseModel\n'
+        'from common.router import APIRouterPro\n'
+        'class AdminStats(BaseModel):\n'
+        '    users: int\n'
+        'router = APIRouterPro(prefix="/admin", tags=["admin"], order_num=1, lazy=True)\n'
+        '@router.get("/stats/{name}", response_model=AdminStats)\n'
+        'def stats_endpoint(name: str):\n'
+        '    return {"users": len(name)}\n'
+        '@router.get("/{anything}")\n'
+        'def catch_all_endpoint(anything: str):\n'
+        '    return {"anything": anything}\n',
+        encoding='utf-8')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    manifest_path = str(tmp_path / 'route_manifest.json')
+    RouterRegister(FastAPI(), discovery='packages', packages=['lazy_admin_ctl'], manifest_path=manifest_path) \
+        .write_manifest()
+    entry = json.loads((tmp_path / 'route_manifest.json').read_text(encoding='utf-8'))['routers'][0]
+    assert entry['lazy'] and entry['routes'][0] == {
+        'path': '/admin/stats/{name}', 'methods': ['GET'], 'name': 'stats_endpoint'}
+    monkeypatch.delitem(sys.modules, 'lazy_admin_ctl.admin_controller')
+
+    app = FastAPI()
+    RouterRegister(app, discovery='manifest', manifest_path=manifest_path).register_routers()
+    eager = APIRouter()
+
+    @eager.get('/admin/eager')
+    def eager_endpoint():
+        return {'eager': True}
+
+    app.include_router(eager)
+    # 启动时不导入控制器模块，文档中已包含懒加载路由
+    assert 'lazy_admin_ctl.admin_controller' not in sys.modules
+    schema = app.openapi()
+    assert list(schema['paths']) == ['/admin/eager', '/admin/stats/{name}', '/admin/{anything}']
+    assert 'AdminStats' in schema['components']['schemas']
+    assert app.url_path_for('stats_endpoint', name='x') == '/admin/stats/x'
+
+    with TestClient(app) as client:
+        assert client.get('/admin/stats/abc').json() == {'users': 3}
+        assert 'lazy_admin_ctl.admin_controller' in sys.modules
+        # 真实路由插入在占位路由的位置，匹配顺序不变：/admin/{anything} 仍排在 /admin/eager 之前
+        assert client.get('/admin/eager').json() == {'anything': 'eager'}
+        assert client.post('/admin/stats/abc').status_code == 405
+    assert not any(isinstance(route, LazyRoute) for route in app.routes)
+    assert app.openapi()['paths'] == schema['paths']
+
+
+def test_lazy_export_router_follows_db_async(tmp_path, monkeypatch):
+    db_file = tmp_path / 'export.db'
+    sync_engine = create_engine(f'sqlite:///{db_file}')
+    Base.metadata.create_all(sync_engine)
+    with Session(sync_engine) as db_session:
+        db_session.add(UserModel(name='alice'))
+        db_session.commit()
+    sync_engine.dispose()
+    engine = create_async_engine(f'sqlite+aiosqlite:///{db_file}')
+
+    async def override_session():
+        async with AsyncSession(engine, expire_on_commit=False) as db_session:
+            yield db_session
+
+    # 清单在同步模式下生成，切换为异步模式后不重新生成
+    manifest_path = str(tmp_path / 'route_manifest.json')
+    monkeypatch.setattr(DataBaseConfig, 'db_async', False)
+    RouterRegister(FastAPI(), discovery='manifest', manifest_path=manifest_path).write_manifest()
+    monkeypatch.setattr(DataBaseConfig, 'db_async', True)
+    monkeypatch.delitem(sys.modules, 'control.export_controller')
+    app = FastAPI()
+    RouterRegister(app, discovery='manifest', manifest_path=manifest_path).register_routers()
+    app.dependency_overrides[get_async_session] = override_session
+    export_routes = [route for route in app.routes if route.path.endswith('/export')]
+    assert [route.path for route in export_routes] == ['/users/export', '/addresses/export']
+
+    with TestClient(app) as client:
+        assert json.loads(client.get('/users/export').text)['name'] == 'alice'
+        # 首次命中时按当前的DB_ASYNC导入异步实现
+        route = next(route for route in app.routes if route.path == '/users/export')
+        assert isinstance(route, APIRoute) and asyncio.iscoroutinefunction(route.endpoint)
+        client.portal.call(engine.dispose)
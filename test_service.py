@@ -0,0 +1,190 @@
+"""
+服务层写路径的数据库往返次数测试
+
+直接调用服务方法，统计每次调用发往数据库的语句数与提交次数。
+改造前的往返次数（语句数 + COMMIT）:
+    create_user      INSERT, COMMIT, refresh SELECT                 -> 3
+    update_user      SELECT, UPDATE, COMMIT, SELECT                  -> 4
+    delete_user      SELECT, 级联SELECT地址, DELETE地址, DELETE用户, COMMIT -> 5
+    create_address   SELECT用户, INSERT, COMMIT, refresh SELECT       -> 4
+    list_addresses   SELECT用户, SELECT地址                           -> 2
+    delete_address   SELECT, DELETE, COMMIT                          -> 3
+
+批量创建每块只发出一条多行INSERT ... RETURNING，返回的主键按字段值对应回各行。
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from dto.schemas import AddressCreate, UserCreate
+from entity.entity_cache import entity_cache
+from entity.models import Base, User as UserModel
+from service.address_service import AddressService, AsyncAddressService
+from service.user_service import AsyncUserService, UserService
+from utils.batch_util import BatchUtil
+
+from conftest import RoundTripCounter, measure
+
+
+def test_create_user_round_trips(session):
+    result, trips = measure(
+        session, lambda: UserService.create_user(UserCreate(name='alice', fullname='Alice'), session))
+    assert result.success and result.data.id is not None and result.data.addresses == []
+    # INSERT ... RETURNING, COMMIT
+    assert trips == 2
+
+
+def test_update_user_round_trips(session):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session)
+
+    result, trips = measure(session, lambda: UserService.update_user(user_id, UserCreate(name='bob'), session))
+    assert result.success and result.data.name == 'bob' and len(result.data.addresses) == 1
+    # UPDATE ... RETURNING, SELECT地址, COMMIT
+    assert trips == 3
+
+    result, trips = measure(session, lambda: UserService.update_user(999, UserCreate(name='bob'), session))
+    assert result.code == 404
+    assert trips == 1
+
+
+def test_delete_user_round_trips(session):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session)
+
+    result, trips = measure(session, lambda: UserService.delete_user(user_id, session))
+    assert result.is_success
+    # DELETE地址, DELETE用户, COMMIT
+    assert trips == 3
+    assert UserService.get_user(user_id, session).code == 404
+
+    result, trips = measure(session, lambda: UserService.delete_user(user_id, session))
+    assert not result.is_success and result.message == '用户不存在'
+    assert trips == 2
+
+
+def test_create_address_round_trips(session):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+
+    result, trips = measure(
+        session, lambda: AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session))
+    assert result.success and result.data.user_id == user_id and result.data.id is not None
+    # INSERT ... SELECT ... WHERE EXISTS ... RETURNING, COMMIT
+    assert trips == 2
+
+    result, trips = measure(
+        session, lambda: AddressService.create_address(999, AddressCreate(email_address='b@example.com'), session))
+    assert result.code == 404
+    assert trips == 1
+
+
+def test_list_addresses_round_trips(session):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session)
+
+    result, trips = measure(session, lambda: AddressService.list_addresses(user_id, session))
+    assert result.success and len(result.data) == 1
+    assert trips == 1
+
+    result, trips = measure(session, lambda: AddressService.list_addresses(999, session))
+    assert result.code == 404
+    assert trips == 2
+
+
+def test_delete_address_round_trips(session):
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+    address_id = AddressService.create_address(user_id, AddressCreate(email_address='a@example.com'), session).data.id
+
+    result, trips = measure(session, lambda: AddressService.delete_address(address_id, session))
+    assert result.is_success
+    # DELETE, COMMIT
+    assert trips == 2
+
+    result, trips = measure(session, lambda: AddressService.delete_address(address_id, session))
+    assert not result.is_success
+    assert trips == 1
+
+
+def test_async_write_round_trips():
+    async def scenario():
+        engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        entity_cache.clear()
+        counter = RoundTripCounter(engine.sync_engine)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db_session:
+                counter.reset()
+                user = (await AsyncUserService.create_user(UserCreate(name='alice'), db_session)).data
+                assert counter.round_trips == 2
+
+                counter.reset()
+                address = (await AsyncAddressService.create_address(
+                    user.id, AddressCreate(email_address='a@example.com'), db_session)).data
+                assert address.user_id == user.id and counter.round_trips == 2
+
+                counter.reset()
+                updated = (await AsyncUserService.update_user(user.id, UserCreate(name='bob'), db_session)).data
+                assert updated.name == 'bob' and len(updated.addresses) == 1 and counter.round_trips == 3
+
+                counter.reset()
+                assert (await AsyncAddressService.delete_address(address.id, db_session)).is_success
+                assert counter.round_trips == 2
+
+                counter.reset()
+                assert (await AsyncUserService.delete_user(user.id, db_session)).is_success
+                assert counter.round_trips == 3
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_batch_create_users_single_insert(session):
+    names = ['carol', 'alice', 'bob', 'alice', 'dave', 'bob']
+    payload = [{'name': name, 'fullname': name.title()} for name in names] + [{'name': 'bad-name'}]
+
+    result, _ = measure(session, lambda: UserService.batch_create_users(payload, session))
+    inserts = [statement for statement in session.counter.statements if statement.startswith('INSERT')]
+    # 一条多行INSERT ... RETURNING，而不是每行一条INSERT
+    assert len(inserts) == 1 and session.counter.commits == 1
+    items = result.data.items
+    assert [item.success for item in items] == [True] * len(names) + [False]
+    ids = [item.id for item in items[:-1]]
+    assert len(set(ids)) == len(ids)
+    assert [UserService.get_user(user_id, session).data.name for user_id in ids] == names
+
+
+def test_batch_match_returning_ignores_returned_order():
+    rows = [{'name': 'alice', 'fullname': None}, {'name': 'bob', 'fullname': None}, {'name': 'alice', 'fullname': None}]
+    returned = [UserModel(id=3, name='alice'), UserModel(id=2, name='bob'), UserModel(id=1, name='alice')]
+
+    assert [entity.id for entity in BatchUtil.match_returning(rows, returned)] == [1, 2, 3]
+    with pytest.raises(ValueError):
+        BatchUtil.match_returning(rows, returned[:2])
+
+
+def test_async_batch_create_addresses_single_insert():
+    async def scenario():
+        engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        entity_cache.clear()
+        counter = RoundTripCounter(engine.sync_engine)
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db_session:
+                user = (await AsyncUserService.create_user(UserCreate(name='alice'), db_session)).data
+                emails = [f'a{i}@example.com' for i in range(5)]
+                counter.reset()
+                result = await AsyncAddressService.batch_create_addresses(
+                    user.id, [{'email_address': email} for email in emails], db_session)
+                assert len([s for s in counter.statements if s.startswith('INSERT')]) == 1
+                ids = [item.id for item in result.data.items]
+                addresses = (await AsyncAddressService.list_addresses(user.id, db_session)).data
+                assert {address.id: address.email_address for address in addresses} == dict(zip(ids, emails))
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
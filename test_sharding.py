@@ -0,0 +1,206 @@
+"""
+分片测试：按用户ID路由到分片，跨分片查询并发执行并合并结果
+"""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, exists, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from control import address_controller, export_controller, user_controller
+from dto.schemas import AddressCreate, UserCreate
+from entity.database import get_session
+from entity.entity_cache import entity_cache
+from entity.models import Address as AddressModel, Base, User as UserModel
+from entity.sharding import SHARD_ID_BITS, UserShardedSession, init_shard, shard_index
+from service.address_service import AddressService
+from service.user_service import AsyncUserService, UserService
+from utils.page_util import PageUtil
+
+
+class ShardRecorder:
+    """
+    记录各分片执行的语句；设置屏障后各分片的第一条语句都要在屏障处等齐，只有并发执行时才能全部通过
+    """
+
+    def __init__(self, engines):
+        self.statements = []
+        self.barrier = None
+        self.arrived = set()
+        self.broken = []
+        for index, engine in enumerate(engines):
+            event.listen(engine, 'before_cursor_execute', lambda *args, index=index: self._on_execute(index))
+
+    def _on_execute(self, index):
+        self.statements.append(index)
+        if self.barrier is None or index in self.arrived:
+            return
+        self.arrived.add(index)
+        try:
+            self.barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            self.broken.append(index)
+
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    engines = [create_engine(f'sqlite:///{tmp_path / f"shard{index}"}.db') for index in range(3)]
+    for index, shard in enumerate(engines):
+        init_shard(shard, index)
+    monkeypatch.setattr(UserShardedSession, 'fan_out_executor', ThreadPoolExecutor(max_workers=4))
+    # 实体缓存与总记录数缓存为进程级，需隔离避免串用
+    entity_cache.clear()
+    monkeypatch.setattr(PageUtil, '_count_cache', {})
+    yield engines
+    for shard in engines:
+        shard.dispose()
+
+
+@pytest.fixture
+def user_ids(shards):
+    """在各分片创建6个用户，最后一个用户有一个地址"""
+    with UserShardedSession(shards) as db_session:
+        ids = [UserService.create_user(UserCreate(name=f'user{i}'), db_session).data.id for i in range(6)]
+        AddressService.create_address(max(ids), AddressCreate(email_address='a@example.com'), db_session)
+    entity_cache.clear()
+    return ids
+
+
+@pytest.fixture
+def client(shards):
+    def sharded_session():
+        with UserShardedSession(shards) as db_session:
+            yield db_session
+
+    app = FastAPI()
+    app.include_router(export_controller.router)
+    app.include_router(user_controller.router)
+    app.include_router(address_controller.router)
+    app.dependency_overrides[get_session] = sharded_session
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_new_users_placed_round_robin(shards, client):
+    user_ids = [client.post('/users/', json={'name': f'user{i}'}).json()['data']['id'] for i in range(6)]
+    # 新用户轮转放置到各分片，主键落在所在分片的ID区间内
+    assert sorted(shard_index(user_id, 3) for user_id in user_ids) == [0, 0, 1, 1, 2, 2]
+    target = max(user_ids)
+    address = client.post(f'/addresses/users/{target}', json={'email_address': 'a@example.com'}).json()['data']
+    # 地址与所属用户在同一分片
+    assert shard_index(address['id'], 3) == 2
+    with Session(shards[2]) as shard_session:
+        assert shard_session.get(AddressModel, address['id']).user_id == target
+
+
+def test_lookup_by_id_routes_to_one_shard(shards, user_ids, client):
+    recorder = ShardRecorder(shards)
+    target = max(user_ids)
+    address = client.get(f'/users/{target}').json()['data']['addresses'][0]
+    assert client.get(f'/addresses/{address["id"]}').json()['data'] == address
+    assert set(recorder.statements) == {2}
+
+
+def test_list_fans_out_concurrently(shards, user_ids, client):
+    recorder = ShardRecorder(shards)
+    recorder.barrier = threading.Barrier(3)
+    users = client.get('/users/').json()['data']
+    recorder.barrier = None
+    assert sorted(user['id'] for user in users) == sorted(user_ids)
+    assert [len(user['addresses']) for user in users if user['id'] == max(user_ids)] == [1]
+    assert set(recorder.statements) == {0, 1, 2}
+    assert recorder.arrived == {0, 1, 2} and recorder.broken == []
+
+
+def test_limit_offset_applied_after_merge(shards, user_ids, client):
+    with UserShardedSession(shards) as db_session:
+        ids = db_session.scalars(select(UserModel.id).order_by(UserModel.id).limit(2).offset(3)).all()
+    assert ids == sorted(user_ids)[3:5]
+
+    page = client.get('/users/page', params={'page_size': 4, 'with_total': True}).json()
+    assert [user['id'] for user in page['rows']] == sorted(user_ids)[:4] and page['total'] == 6
+    page = client.get('/users/page', params={'page_size': 4, 'cursor': page['nextCursor']}).json()
+    assert [user['id'] for user in page['rows']] == sorted(user_ids)[4:] and not page['hasNext']
+
+
+def test_count_and_exists_merged(shards, user_ids):
+    with UserShardedSession(shards) as db_session:
+        assert db_session.scalar(select(func.count()).select_from(UserModel)) == 6
+        assert db_session.scalar(select(func.count(UserModel.id).label('total'))) == 6
+        assert db_session.scalar(select(exists().where(UserModel.name == 'user5'))) is True
+        assert db_session.scalar(select(exists().where(UserModel.name == 'missing'))) is False
+
+
+def test_bulk_rows_grouped_by_shard(shards, user_ids, client):
+    ordered = [max(user_ids), min(user_ids), sorted(user_ids)[2]]
+    with UserShardedSession(shards) as db_session:
+        rows = [{'user_id': user_id, 'email_address': f'{user_id}@example.com'} for user_id in ordered]
+        addresses = db_session.scalars(insert(AddressModel).returning(AddressModel), rows).all()
+        db_session.commit()
+        # RETURNING的结果按参数顺序返回，各行写入所属用户的分片
+        assert [address.user_id for address in addresses] == ordered
+        assert [shard_index(address.id, 3) for address in addresses] == [shard_index(user_id, 3) for user_id in ordered]
+
+    updated = client.put('/users/batch', json=[{'id': user_id, 'name': 'renamed'} for user_id in user_ids]).json()
+    assert updated['data']['success_count'] == 6
+    assert {user['name'] for user in client.get('/users/').json()['data']} == {'renamed'}
+
+
+def test_delete_and_export_across_shards(shards, user_ids, client):
+    target = max(user_ids)
+    exported = [json.loads(line)['id'] for line in client.get('/users/export').text.splitlines()]
+    assert exported == sorted(user_ids)
+
+    assert client.delete(f'/users/{target}').json()['is_success']
+    assert sorted(user['id'] for user in client.get('/users/').json()['data']) == sorted(set(user_ids) - {target})
+    with Session(shards[2]) as shard_session:
+        assert shard_session.scalar(select(func.count()).select_from(AddressModel)) == 0
+
+
+def test_async_sharded_session(tmp_path, shards, user_ids):
+    async def scenario():
+        async_engines = [create_async_engine(f'sqlite+aiosqlite:///{tmp_path / f"shard{index}"}.db')
+                         for index in range(3)]
+        try:
+            async with AsyncSession(async_engines[0], sync_session_class=UserShardedSession,
+                                    shards=[shard.sync_engine for shard in async_engines]) as db_session:
+                users = (await AsyncUserService.list_users(db_session)).data
+                assert sorted(user.id for user in users) == sorted(user_ids)
+                assert (await AsyncUserService.get_user(max(user_ids), db_session)).data.addresses[0].user_id \
+                    == max(user_ids)
+        finally:
+            for async_engine in async_engines:
+                await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_shard_autoincrement_only_on_shard_tables(tmp_path):
+    def table_ddl(engine):
+        with engine.connect() as conn:
+            return conn.scalar(text("SELECT sql FROM sqlite_master WHERE name = 'user_account'"))
+
+    # 未启用分片时模型建表不使用AUTOINCREMENT
+    plain = create_engine(f'sqlite:///{tmp_path / "plain.db"}')
+    Base.metadata.create_all(plain)
+    assert 'AUTOINCREMENT' not in table_ddl(plain)
+    # 分片建表使用AUTOINCREMENT，主键从分片ID区间的下限开始
+    shard = create_engine(f'sqlite:///{tmp_path / "shard1.db"}')
+    init_shard(shard, 1)
+    assert 'AUTOINCREMENT' in table_ddl(shard)
+    with Session(shard) as shard_session:
+        user = UserModel(name='alice')
+        shard_session.add(user)
+        shard_session.commit()
+        assert user.id == (1 << SHARD_ID_BITS) + 1
+    # 已有的表未使用AUTOINCREMENT时无法设置主键起始值
+    with pytest.raises(ValueError, match='未使用AUTOINCREMENT'):
+        init_shard(plain, 1)
+    plain.dispose()
+    shard.dispose()
@@ -0,0 +1,63 @@
+"""
+SQLite生产配置测试：WAL模式下写入串行、读写互不阻塞
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from config.env import DataBaseConfig
+from dto.schemas import AddressCreate, UserCreate
+from entity.entity_cache import entity_cache
+from entity.models import Address as AddressModel, Base, User as UserModel
+from entity.routing_session import ReplicaSet, RoutingSession
+from service.address_service import AddressService
+from service.user_service import UserService
+
+
+def test_sqlite_profile_serializes_writes(tmp_path):
+    from sqlalchemy.exc import OperationalError
+
+    from entity.sqlite_profile import WRITER_POOL_OPTIONS, register_sqlite_profile
+
+    url = f'sqlite:///{tmp_path / "profile.db"}'
+    writer = create_engine(url, **WRITER_POOL_OPTIONS)
+    register_sqlite_profile(writer)
+    reader = create_engine(url, pool_size=8)
+    register_sqlite_profile(reader, read_only=True)
+    Base.metadata.create_all(writer)
+    replicas = ReplicaSet([reader], consistent=True)
+    entity_cache.clear()
+
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == DataBaseConfig.db_sqlite_busy_timeout
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA query_only').scalar() == 1
+        with pytest.raises(OperationalError, match='readonly'):
+            conn.exec_driver_sql("INSERT INTO user_account (name) VALUES ('x')")
+
+    def write(worker):
+        with RoutingSession(writer, replicas=replicas) as db_session:
+            results = []
+            for i in range(20):
+                user = UserService.create_user(UserCreate(name=f'user{worker}x{i}'), db_session)
+                results.append(user.success and AddressService.create_address(
+                    user.data.id, AddressCreate(email_address=f'user{worker}x{i}@example.com'), db_session).success)
+            # 写事务提交后的查询回到只读连接池，不占用写连接
+            assert 'primary' not in db_session.info
+            assert AddressService.list_addresses(user.data.id, db_session).success
+            assert replicas.active[0] >= 1
+            return results
+
+    # 写连接只有一个，并发写入在连接池中排队，不会出现 database is locked
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(all(results) for results in executor.map(write, range(8)))
+    assert replicas.active == [0]
+    with Session(reader) as db_session:
+        assert db_session.scalar(select(func.count()).select_from(UserModel)) == 160
+        assert db_session.scalar(select(func.count()).select_from(AddressModel)) == 160
+    writer.dispose()
+    reader.dispose()
@@ -0,0 +1,182 @@
+"""
+链路追踪测试：请求ID生成与透传、路由指标、数据库span
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from config.env import TraceSettings
+from control import user_controller
+from dto.schemas import UserCreate
+from entity.database import get_session
+from entity.entity_cache import entity_cache
+from entity.models import Base
+from entity.query_tracer import fingerprint_statement, register_query_tracer
+from middlewares.trace_middleware import InMemorySpanExporter, TraceASGIMiddleware, request_metrics, tracer
+from middlewares.trace_middleware.ctx import TraceCtx, counter_id, inbound_request_id, ulid_id
+from middlewares.trace_middleware.exporter import to_otlp
+from middlewares.trace_middleware.metrics import RouteMetrics
+from middlewares.trace_middleware.tracer import CTX_SPAN, SPAN_KIND_CLIENT, SPAN_KIND_SERVER, STATUS_ERROR, Trace
+from service.user_service import AsyncUserService, UserService
+
+
+def test_trace_middleware_records_route_metrics():
+    router = APIRouter()
+
+    @router.post('/items/{item_id}')
+    def create_item_endpoint(item_id: int, payload: dict):
+        return {'id': item_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TraceASGIMiddleware)
+    request_metrics.clear()
+    with TestClient(app) as client:
+        for item_id in range(3):
+            assert client.post(f'/items/{item_id}', json={'a': 1}).headers['request-id']
+        client.post('/items/x', json={})
+        client.get('/missing')
+
+    metrics = request_metrics.get('POST', '/items/{item_id}')
+    # 路径参数不同的请求按路由模板聚合
+    assert metrics.count == 4 and metrics.statuses == {200: 3, 422: 1}
+    assert metrics.request_bytes == 3 * len(b'{"a":1}') + 2 and metrics.response_bytes > 0
+    assert metrics.duration_sum >= sum(metrics.stage_sums) - 1e-6
+    assert request_metrics.get('GET', 'unmatched').statuses == {404: 1}
+    text = request_metrics.render_prometheus()
+    assert 'http_requests_total{method="POST",route="/items/{item_id}",status="200"} 3' in text
+    assert 'http_request_duration_seconds_bucket{method="POST",route="/items/{item_id}",le="+Inf"} 4' in text
+    assert 'quantile="0.99"' in text
+
+
+def test_request_id_generators():
+    ulids = [ulid_id() for _ in range(1000)]
+    assert len(set(ulids)) == 1000 and all(len(value) == 26 for value in ulids)
+    # 同一进程内ULID按字典序即按生成顺序排序
+    assert ulids == sorted(ulids)
+    assert len({counter_id() for _ in range(1000)}) == 1000
+
+
+def test_inbound_request_id():
+    traceparent = (b'traceparent', b'00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01')
+    assert inbound_request_id([(b'x-request-id', b'abc-123'), traceparent]) == 'abc-123'
+    # 不合法的X-Request-ID被忽略，回退到traceparent
+    assert inbound_request_id([(b'x-request-id', b'a b'), traceparent]) == '4bf92f3577b34da6a3ce929d0e0e4736'
+    assert inbound_request_id([(b'x-request-id', b'a' * 129)]) is None
+    assert inbound_request_id([(b'traceparent', b'00-' + b'0' * 32 + b'-00f067aa0ba902b7-01')]) is None
+    assert inbound_request_id([]) is None
+
+
+def test_trace_middleware_propagates_request_id(monkeypatch):
+    app = FastAPI()
+
+    @app.get('/ping')
+    def ping():
+        return {'request_id': TraceCtx.get_id()}
+
+    app.add_middleware(TraceASGIMiddleware)
+    with TestClient(app) as client:
+        # 默认不信任客户端传入的请求ID
+        monkeypatch.setattr(TraceCtx, 'trust_inbound_id', TraceSettings().trace_trust_inbound_id)
+        response = client.get('/ping', headers={'X-Request-ID': 'upstream-1'})
+        assert response.headers['request-id'] != 'upstream-1'
+        assert response.json() == {'request_id': response.headers['request-id']}
+        monkeypatch.setattr(TraceCtx, 'trust_inbound_id', True)
+        response = client.get('/ping', headers={'X-Request-ID': 'upstream-1'})
+        assert response.headers['request-id'] == 'upstream-1' and response.json() == {'request_id': 'upstream-1'}
+
+
+def test_fingerprint_statement():
+    name, normalized, fingerprint = fingerprint_statement(
+        "SELECT users.id FROM users WHERE users.id IN (?, ?, ?) AND users.name = 'a''b' LIMIT 10")
+    assert name == 'SELECT users'
+    assert normalized == 'SELECT users.id FROM users WHERE users.id IN (?) AND users.name = ? LIMIT ?'
+    # 参数个数不同的同类语句指纹相同
+    assert fingerprint_statement('SELECT users.id FROM users WHERE users.id IN (?)\n AND users.name = ? LIMIT ?')[2] \
+        == fingerprint
+    assert fingerprint_statement('INSERT INTO addresses (a, b) VALUES (%s, %s), (%s, %s)')[:2] == \
+        ('INSERT addresses', 'INSERT INTO addresses (a, b) VALUES (?)')
+
+
+def test_trace_records_db_spans(session, monkeypatch):
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracer, 'exporter', exporter)
+    # 信任上游traceparent时请求span沿用其trace-id并挂在上游span下
+    monkeypatch.setattr(TraceCtx, 'trust_inbound_id', True)
+    register_query_tracer(session.get_bind())
+    user_id = UserService.create_user(UserCreate(name='alice', fullname='Alice'), session).data.id
+
+    def override_session():
+        with Session(session.get_bind()) as db_session:
+            yield db_session
+
+    app = FastAPI()
+    app.include_router(user_controller.router)
+    app.dependency_overrides[get_session] = override_session
+    app.add_middleware(TraceASGIMiddleware)
+    traceparent = '00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01'
+    with TestClient(app) as client:
+        assert client.put(f'/users/{user_id}', json={'name': 'bob'}, headers={'traceparent': traceparent}).json()['success']
+
+    # 不在请求中执行的语句不采集
+    assert len(exporter.traces) == 1
+    trace = exporter.traces[0]
+    root = trace.root
+    assert trace.trace_id == '4bf92f3577b34da6a3ce929d0e0e4736' and root.parent_span_id == '00f067aa0ba902b7'
+    assert root.name == 'PUT /users/{user_id}' and root.kind == SPAN_KIND_SERVER
+    assert root.attributes['http.response.status_code'] == 200
+    children = trace.children(root)
+    # UPDATE ... RETURNING、SELECT地址 两条语句挂在请求span下
+    assert [span.name for span in children] == ['UPDATE user_account', 'SELECT address']
+    assert len(children) == len(trace.spans) - 1
+    for span in children:
+        assert span.kind == SPAN_KIND_CLIENT and span.attributes['db.system.name'] == 'sqlite'
+        assert len(span.attributes['db.query.fingerprint']) == 16
+        assert root.start_time_ns <= span.start_time_ns <= span.end_time_ns <= root.end_time_ns
+
+    otlp = json.loads(json.dumps(to_otlp(list(exporter.traces), 'test')))
+    spans = otlp['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert len(spans) == 3 and spans[1]['parentSpanId'] == spans[0]['spanId'] == root.span_id
+    assert {'key': 'http.response.status_code', 'value': {'intValue': '200'}} in spans[0]['attributes']
+
+
+def test_trace_records_async_db_spans():
+    async def scenario():
+        engine = create_async_engine('sqlite+aiosqlite://', poolclass=StaticPool)
+        register_query_tracer(engine.sync_engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        entity_cache.clear()
+        trace = Trace('0' * 31 + '1')
+        CTX_SPAN.set(trace.start_span('request', SPAN_KIND_SERVER))
+        try:
+            async with AsyncSession(engine, expire_on_commit=False) as db_session:
+                await AsyncUserService.create_user(UserCreate(name='alice'), db_session)
+                with pytest.raises(Exception):
+                    await db_session.execute(text('SELECT * FROM missing_table'))
+        finally:
+            await engine.dispose()
+        return trace
+
+    trace = asyncio.run(scenario())
+    # 异步驱动在greenlet中执行语句，上下文变量随之传递
+    names = [span.name for span in trace.spans[1:]]
+    assert 'INSERT user_account' in names and names[-1] == 'SELECT missing_table'
+    assert trace.spans[-1].status_code == STATUS_ERROR and trace.spans[-1].attributes['error.type'] == 'OperationalError'
+
+
+def test_route_metrics_quantile():
+    metrics = RouteMetrics()
+    # 90个请求落在 (0.005, 0.01]，10个请求落在 (0.05, 0.1]
+    metrics.buckets[3] = 90
+    metrics.buckets[6] = 10
+    metrics.count = 100
+    assert metrics.quantile(0.5) == pytest.approx(0.005 + 0.005 * 50 / 90)
+    assert metrics.quantile(0.95) == pytest.approx(0.05 + 0.05 * 5 / 10)
@@ -0,0 +1,219 @@
+from collections.abc import Iterator, Sequence
+from typing import Any, Optional, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import Insert, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from common.vo import DataResponseModel
+from config.env import DataBaseConfig
+from dto.schemas import BatchItemResult, BatchResult
+
+M = TypeVar('M', bound=BaseModel)
+T = TypeVar('T')
+
+
+class BatchUtil:
+    """
+    批量写入工具类
+    """
+
+    @staticmethod
+    def validate_items(
+        items: Sequence[Any], schema: type[M]
+    ) -> tuple[list[tuple[int, M]], dict[int, BatchItemResult]]:
+        """
+        逐条校验请求数据，校验失败的记录不影响其他记录
+
+        :param items: 请求数据列表
+        :param schema: 校验使用的Pydantic模型
+        :return: (校验通过的(下标, 模型)列表, 校验失败的下标与结果)
+        """
+        valid = []
+        failures = {}
+        for index, item in enumerate(items):
+            try:
+                valid.append((index, schema.model_validate(item)))
+            except ValidationError as e:
+                message = '; '.join(
+                    f"{'.'.join(str(x) for x in error['loc'])}: {error['msg']}" for error in e.errors()
+                )
+                failures[index] = BatchItemResult(index=index, success=False, msg=message)
+        return valid, failures
+
+    @staticmethod
+    def chunks(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+        """
+        按固定大小切分列表
+
+        :param items: 待切分列表
+        :param size: 每块大小
+        :return: 切分后的列表迭代器
+        """
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
+
+    @staticmethod
+    def build_result(total: int, results: dict[int, BatchItemResult]) -> BatchResult:
+        """
+        汇总逐条处理结果
+
+        :param total: 提交的记录数
+        :param results: 下标与处理结果
+        :return: 批量处理结果
+        """
+        items = [results[index] for index in sorted(results)]
+        success_count = sum(1 for item in items if item.success)
+        return BatchResult(
+            total=total, success_count=success_count, failure_count=total - success_count, items=items
+        )
+
+    @classmethod
+    def build_response(cls, total: int, results: dict[int, BatchItemResult]) -> DataResponseModel[BatchResult]:
+        """
+        生成批量处理响应，存在失败记录时success为False
+
+        :param total: 提交的记录数
+        :param results: 下标与处理结果
+        :return: 批量处理响应
+        """
+        result = cls.build_result(total, results)
+        if result.failure_count:
+            return DataResponseModel[BatchResult](
+                msg=f'部分记录处理失败: {result.failure_count}/{result.total}', success=False, data=result
+            )
+        return DataResponseModel[BatchResult](data=result)
+
+    @staticmethod
+    def returning_stmt(session: Any, model: type) -> Optional[Insert]:
+        """
+        生成多行INSERT ... RETURNING语句，返回插入的整行记录。
+        不使用sort_by_parameter_order：SQLite等没有可用哨兵列的数据库会退化为逐行INSERT；
+        返回记录的顺序不作假设，由match_returning按插入的字段值对应回各行参数
+
+        :param session: 同步或异步会话
+        :param model: ORM模型
+        :return: 插入语句，数据库不支持executemany RETURNING时返回None
+        """
+        if session.get_bind().dialect.insert_executemany_returning:
+            return insert(model).returning(model)
+        return None
+
+    @staticmethod
+    def match_returning(rows: Sequence[dict[str, Any]], returned: Sequence[Any]) -> list[Any]:
+        """
+        按插入的字段值把RETURNING返回的记录对应回各行参数，字段值完全相同的多行按主键升序依次对应
+
+        :param rows: 插入的字段字典列表
+        :param returned: RETURNING返回的ORM对象
+        :return: 与rows顺序一致的ORM对象列表
+        """
+        keys = list(rows[0]) if rows else []
+        pending: dict[tuple, list[Any]] = {}
+        for entity in sorted(returned, key=lambda entity: entity.id, reverse=True):
+            pending.setdefault(tuple(getattr(entity, key) for key in keys), []).append(entity)
+        try:
+            return [pending[tuple(row[key] for key in keys)].pop() for row in rows]
+        except (KeyError, IndexError):
+            raise ValueError('插入返回的记录与参数不一致') from None
+
+    @classmethod
+    def insert_returning(cls, session: Session, model: type, rows: list[dict[str, Any]]) -> Optional[list[Any]]:
+        """
+        一条多行INSERT ... RETURNING插入多行，返回与参数顺序一致的ORM对象（不提交）
+
+        :param session: 数据库会话
+        :param model: ORM模型
+        :param rows: 字段字典列表，各行字段相同
+        :return: 与rows顺序一致的ORM对象列表，数据库不支持executemany RETURNING时返回None
+        """
+        stmt = cls.returning_stmt(session, model)
+        if stmt is None:
+            return None
+        return cls.match_returning(rows, session.scalars(stmt, rows).all())
+
+    @classmethod
+    async def async_insert_returning(
+        cls, session: AsyncSession, model: type, rows: list[dict[str, Any]]
+    ) -> Optional[list[Any]]:
+        """
+        insert_returning的异步版本
+        """
+        stmt = cls.returning_stmt(session, model)
+        if stmt is None:
+            return None
+        return cls.match_returning(rows, (await session.scalars(stmt, rows)).all())
+
+    @classmethod
+    def bulk_insert(
+        cls,
+        session: Session,
+        model: type,
+        indexed_rows: list[tuple[int, dict[str, Any]]],
+        results: dict[int, BatchItemResult],
+        error_msg: str,
+    ) -> None:
+        """
+        分块批量插入并逐块提交，某块失败时逐条重试以定位失败记录
+
+        :param session: 数据库会话
+        :param model: ORM模型
+        :param indexed_rows: (下标, 字段字典)列表
+        :param results: 下标与处理结果，插入结果写入其中
+        :param error_msg: 失败信息前缀
+        :return: None
+        """
+        for chunk in cls.chunks(indexed_rows, DataBaseConfig.db_batch_chunk_size):
+            rows = [row for _, row in chunk]
+            try:
+                created = cls.insert_returning(session, model, rows)
+                if created is not None:
+                    ids = [entity.id for entity in created]
+                else:
+                    session.execute(insert(model), rows)
+                    ids = [None] * len(rows)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                if len(chunk) == 1:
+                    results[chunk[0][0]] = BatchItemResult(index=chunk[0][0], success=False, msg=f'{error_msg}: {e}')
+                    continue
+                for item in chunk:
+                    cls.bulk_insert(session, model, [item], results, error_msg)
+                continue
+            for (index, _), new_id in zip(chunk, ids):
+                results[index] = BatchItemResult(index=index, success=True, id=new_id)
+
+    @classmethod
+    async def async_bulk_insert(
+        cls,
+        session: AsyncSession,
+        model: type,
+        indexed_rows: list[tuple[int, dict[str, Any]]],
+        results: dict[int, BatchItemResult],
+        error_msg: str,
+    ) -> None:
+        """
+        bulk_insert的异步版本
+        """
+        for chunk in cls.chunks(indexed_rows, DataBaseConfig.db_batch_chunk_size):
+            rows = [row for _, row in chunk]
+            try:
+                created = await cls.async_insert_returning(session, model, rows)
+                if created is not None:
+                    ids = [entity.id for entity in created]
+                else:
+                    await session.execute(insert(model), rows)
+                    ids = [None] * len(rows)
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                if len(chunk) == 1:
+                    results[chunk[0][0]] = BatchItemResult(index=chunk[0][0], success=False, msg=f'{error_msg}: {e}')
+                    continue
+                for item in chunk:
+                    await cls.async_bulk_insert(session, model, [item], results, error_msg)
+                continue
+            for (index, _), new_id in zip(chunk, ids):
+                results[index] = BatchItemResult(index=index, success=True, id=new_id)
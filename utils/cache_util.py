@@ -0,0 +1,390 @@
+import asyncio
+import functools
+import inspect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterable
+from typing import Any, Callable, Optional
+from urllib.parse import urlencode
+
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from config.env import CacheConfig
+from utils.log_util import logger
+
+
+class CacheBackend:
+    """
+    响应缓存后端接口，键值均为字符串/字节，标签用于按业务实体批量失效
+    """
+
+    # 后端操作是否阻塞（网络IO），异步接口中阻塞型后端的操作放到线程池执行
+    blocking = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()) -> None:
+        raise NotImplementedError
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def acquire_lock(self, key: str, token: str, timeout: float) -> bool:
+        raise NotImplementedError
+
+    def release_lock(self, key: str, token: str) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    进程内LRU缓存后端，仅在单worker部署或本地开发时使用
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes, tuple[str, ...]]] = OrderedDict()
+        self._tags: dict[str, set[str]] = {}
+        self._locks: dict[str, tuple[str, float]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+
+    def acquire_lock(self, key: str, token: str, timeout: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder is not None and holder[1] > now:
+                return False
+            self._locks[key] = (token, now + timeout)
+            return True
+
+    def release_lock(self, key: str, token: str) -> None:
+        with self._lock:
+            holder = self._locks.get(key)
+            if holder is not None and holder[0] == token:
+                del self._locks[key]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Redis协议缓存后端，多个worker共享同一份缓存与重建锁
+
+    只使用 GET/SET/DEL/SADD/SMEMBERS/EXPIRE 与 pipeline，兼容 redis-py 客户端及测试用的替身实现
+    """
+
+    blocking = True
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisCacheBackend':
+        """
+        根据连接地址创建后端，需要安装 redis 包
+
+        :param url: Redis连接地址
+        :return: Redis缓存后端
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('CACHE_BACKEND=redis 需要安装 redis 包: pip install redis') from e
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(key, value, ex=ttl)
+        for tag in tags:
+            pipe.sadd(tag, key)
+            pipe.expire(tag, ttl)
+        pipe.execute()
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        tags = list(tags)
+        pipe = self.client.pipeline()
+        for tag in tags:
+            pipe.smembers(tag)
+        keys = [key for members in pipe.execute() for key in members]
+        self.client.delete(*keys, *tags)
+
+    def acquire_lock(self, key: str, token: str, timeout: float) -> bool:
+        return bool(self.client.set(key, token, nx=True, px=max(int(timeout * 1000), 1)))
+
+    def release_lock(self, key: str, token: str) -> None:
+        # 非原子的比较后删除，锁已过期被他人持有时最坏情况是多一次重建
+        if self.client.get(key) in (token, token.encode()):
+            self.client.delete(key)
+
+
+def _is_param(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+class ResponseCache:
+    """
+    GET接口响应缓存，缓存键由路由标识与请求参数组成，由服务层的写操作按标签失效
+
+    缓存未命中时只有抢到重建锁的请求执行接口，其他请求（包括其他worker）等待其写入结果，
+    等待超时后才自行执行，避免热点键过期瞬间的缓存击穿。异步接口轮询等待最长 lock_timeout；
+    同步接口在线程池中执行，最多等待 sync_lock_wait，避免线程池被等待的请求占满。重建与写操作并发时，重建结果可能晚于失效写入，
+    这类过期数据最长保留一个TTL。
+    """
+
+    def __init__(
+        self,
+        backend: Optional[CacheBackend],
+        prefix: str,
+        ttl: int,
+        lock_timeout: float,
+        poll_interval: float = 0.02,
+        sync_lock_wait: float = 0.2,
+    ) -> None:
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.sync_lock_wait = sync_lock_wait
+        # 本进程内正在重建的缓存键，重建完成时通知等待的同步请求
+        self._rebuilding_lock = threading.Lock()
+        self._rebuilding: dict[str, threading.Event] = {}
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.lock_waits = 0
+        self.errors = 0
+
+    def build_key(self, namespace: str, params: dict[str, Any]) -> str:
+        """
+        生成缓存键
+
+        :param namespace: 路由标识
+        :param params: 请求参数
+        :return: 缓存键
+        """
+        query = urlencode(sorted((name, '' if value is None else value) for name, value in params.items()))
+        return f'{self.prefix}:resp:{namespace}?{query}'
+
+    def tag_key(self, tag: str) -> str:
+        return f'{self.prefix}:tag:{tag}'
+
+    def invalidate(self, *tags: str) -> None:
+        """
+        使带有指定标签的缓存失效，由服务层在写操作提交后调用
+
+        :param tags: 标签，如 user:1
+        """
+        if self.backend is None or not tags:
+            return
+        self._call(self.backend.invalidate_tags, [self.tag_key(tag) for tag in tags])
+
+    def cached(
+        self, tags: Iterable[str] = (), ttl: Optional[int] = None, namespace: Optional[str] = None
+    ) -> Callable[[Callable], Callable]:
+        """
+        缓存接口响应的装饰器，放在路由装饰器之下，仅缓存 success 为True 的响应
+
+        :param tags: 失效标签模板，使用接口参数格式化，如 'user:{user_id}'
+        :param ttl: 可选，过期时间（秒），默认使用 CACHE_TTL
+        :param namespace: 可选，路由标识，默认使用接口函数的模块与名称
+        :return: 装饰器
+        """
+        tag_templates = tuple(tags)
+
+        def decorator(func: Callable) -> Callable:
+            route = namespace or f'{func.__module__}.{func.__qualname__}'
+            expire = ttl or self.ttl
+
+            def prepare(kwargs: dict[str, Any]) -> tuple[str, list[str]]:
+                key = self.build_key(route, {name: value for name, value in kwargs.items() if _is_param(value)})
+                return key, [self.tag_key(template.format(**kwargs)) for template in tag_templates]
+
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(**kwargs: Any) -> Any:
+                    # 后端在调用时读取，关闭缓存（CACHE_BACKEND=off）时直接执行接口
+                    if self.backend is None:
+                        return await func(**kwargs)
+                    key, tag_keys = prepare(kwargs)
+                    body = await self._acall(self.backend.get, key)
+                    if body is not None:
+                        return self._hit(body)
+                    token = uuid.uuid4().hex
+                    if await self._acall(self.backend.acquire_lock, f'{key}:lock', token, self.lock_timeout,
+                                         default=True):
+                        try:
+                            return await self._astore(key, tag_keys, expire, await func(**kwargs))
+                        finally:
+                            await self._acall(self.backend.release_lock, f'{key}:lock', token)
+                    # 其他请求正在重建，等待其写入缓存
+                    deadline = time.monotonic() + self.lock_timeout
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(self.poll_interval)
+                        body = await self._acall(self.backend.get, key)
+                        if body is not None:
+                            return self._hit(body, waited=True)
+                    return await self._astore(key, tag_keys, expire, await func(**kwargs))
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(**kwargs: Any) -> Any:
+                if self.backend is None:
+                    return func(**kwargs)
+                key, tag_keys = prepare(kwargs)
+                body = self._call(self.backend.get, key)
+                if body is not None:
+                    return self._hit(body)
+                token = uuid.uuid4().hex
+                if self._call(self.backend.acquire_lock, f'{key}:lock', token, self.lock_timeout, default=True):
+                    done = threading.Event()
+                    with self._rebuilding_lock:
+                        self._rebuilding[key] = done
+                    try:
+                        return self._store(key, tag_keys, expire, func(**kwargs))
+                    finally:
+                        self._call(self.backend.release_lock, f'{key}:lock', token)
+                        with self._rebuilding_lock:
+                            if self._rebuilding.get(key) is done:
+                                del self._rebuilding[key]
+                        done.set()
+                # 同步接口不轮询等待：本进程内的重建完成时直接唤醒，其他worker重建时只等待一次，
+                # 最多等待 sync_lock_wait，仍未写入缓存则自行执行接口
+                with self._rebuilding_lock:
+                    done = self._rebuilding.get(key)
+                if done is not None:
+                    done.wait(self.sync_lock_wait)
+                else:
+                    time.sleep(self.sync_lock_wait)
+                body = self._call(self.backend.get, key)
+                if body is not None:
+                    return self._hit(body, waited=True)
+                return self._store(key, tag_keys, expire, func(**kwargs))
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        获取缓存指标快照
+
+        :return: 指标字典
+        """
+        with self._stats_lock:
+            return {
+                'backend': type(self.backend).__name__ if self.backend is not None else None,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'lock_waits': self.lock_waits,
+                'errors': self.errors,
+            }
+
+    def _hit(self, body: bytes, waited: bool = False) -> Response:
+        with self._stats_lock:
+            self.hits += 1
+            if waited:
+                self.lock_waits += 1
+        return Response(content=body, media_type='application/json')
+
+    def _serialize(self, result: Any) -> Optional[bytes]:
+        with self._stats_lock:
+            self.misses += 1
+        if isinstance(result, BaseModel) and getattr(result, 'success', False) is True:
+            return result.model_dump_json(by_alias=True).encode()
+        return None
+
+    def _store(self, key: str, tag_keys: list[str], ttl: int, result: Any) -> Any:
+        body = self._serialize(result)
+        if body is None:
+            return result
+        self._call(self.backend.set, key, body, ttl, tag_keys)
+        return Response(content=body, media_type='application/json')
+
+    async def _astore(self, key: str, tag_keys: list[str], ttl: int, result: Any) -> Any:
+        body = self._serialize(result)
+        if body is None:
+            return result
+        await self._acall(self.backend.set, key, body, ttl, tag_keys)
+        return Response(content=body, media_type='application/json')
+
+    def _call(self, method: Callable, *args: Any, default: Any = None) -> Any:
+        # 缓存不可用时降级为直接执行接口，不影响接口可用性
+        try:
+            return method(*args)
+        except Exception as e:
+            with self._stats_lock:
+                self.errors += 1
+            logger.warning(f'响应缓存操作失败: {method.__name__}: {e}')
+            return default
+
+    async def _acall(self, method: Callable, *args: Any, default: Any = None) -> Any:
+        if self.backend.blocking:
+            return await run_in_threadpool(self._call, method, *args, default=default)
+        return self._call(method, *args, default=default)
+
+
+def create_response_cache() -> ResponseCache:
+    """
+    根据缓存配置创建响应缓存
+
+    :return: 响应缓存
+    """
+    backend: Optional[CacheBackend] = None
+    if CacheConfig.cache_backend == 'memory':
+        backend = MemoryCacheBackend(CacheConfig.cache_max_size)
+    elif CacheConfig.cache_backend == 'redis':
+        backend = RedisCacheBackend.from_url(CacheConfig.cache_redis_url)
+    return ResponseCache(backend, CacheConfig.cache_prefix, CacheConfig.cache_ttl, CacheConfig.cache_lock_timeout,
+                         sync_lock_wait=CacheConfig.cache_sync_lock_wait)
+
+
+# GET接口响应缓存实例
+response_cache = create_response_cache()
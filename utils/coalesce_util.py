@@ -0,0 +1,156 @@
+import asyncio
+import threading
+from collections.abc import Awaitable
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class _Batch(Generic[T]):
+    """
+    一批待合并写入的记录，由第一个加入的调用方（leader）负责写入，其余调用方等待结果
+    """
+
+    def __init__(self) -> None:
+        self.items: list[T] = []
+        self.results: Optional[list[Any]] = None
+        self.error: Optional[BaseException] = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+class WriteCoalescer(Generic[T, R]):
+    """
+    写入合并器：并发的单条写入在短时间窗口内攒成一批，由第一个调用方用自己的会话一次写入、一次提交，
+    再把各条记录的结果分发给各自的调用方。使用相同数据库（会话get_bind()）的请求才会合并到同一批
+
+    flush(session, items) 需按 items 的顺序返回各条记录的结果，单条记录失败时应返回该记录自己的错误结果而不是抛出异常
+    """
+
+    def __init__(
+        self, flush: Callable[[Any, list[T]], list[R]], enabled: bool, window_ms: float, max_rows: int
+    ) -> None:
+        self.flush = flush
+        self.enabled = enabled
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._open: dict[Any, _Batch[T]] = {}
+
+    def submit(self, session: Any, item: T) -> R:
+        """
+        提交一条记录并等待其所在批次写入完成
+
+        :param session: 调用方的数据库会话，成为leader时用于写入整批记录
+        :param item: 待写入的记录
+        :return: 该记录的写入结果
+        """
+        key = session.get_bind()
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+            position = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_rows:
+                del self._open[key]
+                batch.full.set()
+        if not leader:
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+            return batch.results[position]
+        batch.full.wait(self.window)
+        with self._lock:
+            if self._open.get(key) is batch:
+                del self._open[key]
+        try:
+            batch.results = self.flush(session, batch.items)
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+        return batch.results[0]
+
+
+class _AsyncBatch(Generic[T]):
+    """
+    _Batch的异步版本，由独立的写入任务等待时间窗口并写入整批记录，调用方都等待该任务的结果
+    """
+
+    def __init__(self) -> None:
+        self.items: list[T] = []
+        self.full = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class AsyncWriteCoalescer(Generic[T, R]):
+    """
+    WriteCoalescer的异步版本，同一事件循环中的并发协程合并写入
+    """
+
+    def __init__(
+        self, flush: Callable[[Any, list[T]], Awaitable[list[R]]], enabled: bool, window_ms: float, max_rows: int
+    ) -> None:
+        self.flush = flush
+        self.enabled = enabled
+        self.window = window_ms / 1000
+        self.max_rows = max_rows
+        self._open: dict[Any, _AsyncBatch[T]] = {}
+
+    async def submit(self, session: Any, item: T) -> R:
+        """
+        提交一条记录并等待其所在批次写入完成
+
+        :param session: 调用方的异步数据库会话，成为leader时用于写入整批记录
+        :param item: 待写入的记录
+        :return: 该记录的写入结果
+        """
+        key = session.get_bind()
+        batch = self._open.get(key)
+        if batch is not None:
+            position = len(batch.items)
+            batch.items.append(item)
+            if len(batch.items) >= self.max_rows:
+                del self._open[key]
+                batch.full.set()
+            # 调用方被取消时不影响其他调用方等待同一批次的结果
+            return (await asyncio.shield(batch.task))[position]
+        batch = self._open[key] = _AsyncBatch()
+        batch.items.append(item)
+        # 写入在leader之外的任务中执行，leader被取消时其他调用方仍得到写入结果
+        batch.task = asyncio.create_task(self._flush_batch(key, session, batch))
+        cancelled = False
+        while True:
+            try:
+                results = await asyncio.shield(batch.task)
+                break
+            except asyncio.CancelledError:
+                if batch.task.done():
+                    raise
+                # 写入任务使用leader的会话，等待其结束后再传播取消，避免会话在写入期间被关闭
+                cancelled = True
+        if cancelled:
+            raise asyncio.CancelledError()
+        return results[0]
+
+    async def _flush_batch(self, key: Any, session: Any, batch: _AsyncBatch[T]) -> list[R]:
+        """
+        等待时间窗口内加入的记录后写入整批记录
+
+        :param key: 批次所属的数据库
+        :param session: leader的异步数据库会话
+        :param batch: 待写入的批次
+        :return: 按顺序对应各条记录的结果
+        """
+        try:
+            await asyncio.wait_for(batch.full.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            if self._open.get(key) is batch:
+                del self._open[key]
+        return await self.flush(session, batch.items)
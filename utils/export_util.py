@@ -0,0 +1,154 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Literal
+
+import anyio
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import ScalarResult
+from sqlalchemy.ext.asyncio import AsyncScalarResult, AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from common.vo import CTX_SERIALIZING
+from utils.response_util import ResponseUtil
+
+ExportFormat = Literal['ndjson', 'csv']
+
+
+class ExportUtil:
+    """
+    数据导出工具类，将按批次（yield_per分区）读取的ORM对象逐批转换为NDJSON或CSV字节块并流式输出
+
+    每批数据只有在上一批写入客户端后才会读取，客户端读取缓慢时服务端写缓冲区满后停止读取数据库（背压），
+    内存占用只与批次大小有关，与表大小无关
+    """
+
+    MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+    @staticmethod
+    def render_header(schema: type[BaseModel], export_format: ExportFormat) -> bytes:
+        """
+        生成导出文件头，CSV为字段名行，NDJSON无文件头
+
+        :param schema: 导出数据的Pydantic模型
+        :param export_format: 导出格式
+        :return: 文件头字节
+        """
+        if export_format != 'csv':
+            return b''
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(schema.model_fields)
+        return buffer.getvalue().encode()
+
+    @staticmethod
+    def render_partition(partition: Sequence[Any], schema: type[BaseModel], export_format: ExportFormat) -> bytes:
+        """
+        将一批ORM对象转换为导出内容，CSV中的嵌套字段（如用户的地址列表）以JSON字符串写入单元格
+
+        :param partition: ORM对象列表
+        :param schema: 导出数据的Pydantic模型
+        :param export_format: 导出格式
+        :return: 导出内容字节
+        """
+        token = CTX_SERIALIZING.set(True)
+        try:
+            items = [schema.model_validate(row) for row in partition]
+        finally:
+            CTX_SERIALIZING.reset(token)
+        if export_format == 'ndjson':
+            return b''.join(to_json(item) + b'\n' for item in items)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for item in items:
+            writer.writerow(
+                '' if value is None else json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict))
+                else value
+                for value in item.model_dump(mode='json').values()
+            )
+        return buffer.getvalue().encode()
+
+    @classmethod
+    def iterate(
+        cls, result: ScalarResult, session: Session, schema: type[BaseModel], export_format: ExportFormat
+    ) -> AsyncIterator[bytes]:
+        """
+        逐批读取同步结果集并转换为导出内容，读取与转换在线程池中执行，导出结束或客户端断开后关闭结果集与会话
+
+        :param result: 设置了yield_per的查询结果
+        :param session: 数据库会话
+        :param schema: 导出数据的Pydantic模型
+        :param export_format: 导出格式
+        :return: 异步字节迭代器
+        """
+
+        def chunks() -> Iterator[bytes]:
+            header = cls.render_header(schema, export_format)
+            if header:
+                yield header
+            for partition in result.partitions():
+                yield cls.render_partition(partition, schema, export_format)
+
+        iterator = chunks()
+
+        def release() -> None:
+            iterator.close()
+            result.close()
+            session.close()
+
+        async def stream() -> AsyncIterator[bytes]:
+            try:
+                while True:
+                    # 线程池调用不会被中途放弃，取消时会等待当前批次结束，保证释放时迭代器未在其他线程运行
+                    chunk = await run_in_threadpool(next, iterator, None)
+                    if chunk is None:
+                        break
+                    yield chunk
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(release)
+
+        return stream()
+
+    @classmethod
+    async def aiterate(
+        cls, result: AsyncScalarResult, session: AsyncSession, schema: type[BaseModel], export_format: ExportFormat
+    ) -> AsyncIterator[bytes]:
+        """
+        逐批读取异步结果集并转换为导出内容，导出结束或客户端断开后关闭结果集与会话
+
+        :param result: 设置了yield_per的流式查询结果
+        :param session: 异步数据库会话
+        :param schema: 导出数据的Pydantic模型
+        :param export_format: 导出格式
+        :return: 异步字节迭代器
+        """
+        try:
+            header = cls.render_header(schema, export_format)
+            if header:
+                yield header
+            async for partition in result.partitions():
+                yield cls.render_partition(partition, schema, export_format)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await result.close()
+                await session.close()
+
+    @classmethod
+    def response(cls, content: AsyncIterator[bytes], filename: str, export_format: ExportFormat) -> Response:
+        """
+        生成导出文件的流式响应
+
+        :param content: 导出内容的异步字节迭代器
+        :param filename: 文件名（不含扩展名）
+        :param export_format: 导出格式
+        :return: 流式响应
+        """
+        return ResponseUtil.streaming(
+            data=content,
+            headers={'Content-Disposition': f'attachment; filename="{filename}.{export_format}"'},
+            media_type=cls.MEDIA_TYPES[export_format],
+        )
@@ -1,12 +1,243 @@
+import atexit
+import json
 import os
+import queue
+import random
 import sys
+import threading
 import time
+import traceback
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Optional, TextIO
 
 from loguru import logger as _logger
 from loguru._logger import Logger
 
+from config.env import LogConfig
 from middlewares.trace_middleware import TraceCtx
 
+# 队列关闭标记
+_STOP = object()
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    """
+    解析按级别采样比例配置
+
+    :param value: 如 DEBUG=0.01,INFO=0.1
+    :return: {级别名称: 采样比例}
+    """
+    rates = {}
+    for item in value.split(','):
+        if item.strip():
+            level, _, rate = item.partition('=')
+            rates[level.strip().upper()] = float(rate)
+    return rates
+
+
+def json_line(record: dict[str, Any]) -> str:
+    """
+    将loguru日志记录转换为一行JSON
+
+    :param record: loguru日志记录
+    :return: 以换行结尾的JSON字符串
+    """
+    data = {
+        'time': record['time'].isoformat(),
+        'level': record['level'].name,
+        'trace_id': record.get('trace_id', ''),
+        'name': record['name'],
+        'function': record['function'],
+        'line': record['line'],
+        'message': record['message'],
+    }
+    if record['extra']:
+        data['extra'] = record['extra']
+    exception = record['exception']
+    if exception:
+        data['exception'] = ''.join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+
+
+class LogSampler:
+    """
+    按级别采样并限制重复日志：同一级别、同一内容的日志每个窗口内最多输出burst条，其余丢弃，
+    下一窗口中该日志第一次输出时附带上一窗口被抑制的条数
+    """
+
+    # 每个窗口内跟踪的不同日志内容上限，超出的内容不再限流
+    MAX_KEYS = 10000
+
+    def __init__(self, sample_rates: dict[str, float], burst: int, window: float) -> None:
+        self.sample_rates = sample_rates
+        self.burst = burst
+        self.window = window
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._counts: dict[tuple[int, str], int] = {}
+        self._suppressed: dict[tuple[int, str], int] = {}
+
+    def __call__(self, record: dict[str, Any]) -> bool:
+        """
+        判断日志是否输出，被抑制条数会追加到消息末尾
+
+        :param record: loguru日志记录
+        :return: 是否输出
+        """
+        rate = self.sample_rates.get(record['level'].name)
+        if rate is not None and random.random() >= rate:
+            return False
+        if not self.burst:
+            return True
+        key = (record['level'].no, record['message'])
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._suppressed = {k: count - self.burst for k, count in self._counts.items() if count > self.burst}
+                self._counts = {}
+                self._window_start = now
+            count = self._counts.get(key)
+            if count is None:
+                if len(self._counts) >= self.MAX_KEYS:
+                    return True
+                count = 0
+            count += 1
+            self._counts[key] = count
+            if count > self.burst:
+                return False
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            record['message'] += f' (上一{self.window:g}秒内另有{suppressed}条相同日志已抑制)'
+        return True
+
+
+class BackgroundCompressor:
+    """
+    在单独的线程中将轮转后的日志文件压缩为zip，避免写日志的线程因压缩而停顿
+    """
+
+    def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-compress')
+
+    def __call__(self, path: str) -> None:
+        try:
+            self._executor.submit(self.compress, path)
+        except RuntimeError:
+            # 解释器退出阶段线程池已关闭，直接在当前线程压缩
+            self.compress(path)
+
+    @staticmethod
+    def compress(path: str) -> None:
+        with zipfile.ZipFile(f'{path}.zip', 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, os.path.basename(path))
+        os.remove(path)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class BatchedSink:
+    """
+    批量写入的loguru sink：调用方线程只把日志放入有界队列，由后台线程取出当前积压的全部日志（至多batch_size条）一次写入；
+    队列满时丢弃并计数而不阻塞请求，丢弃条数在下一批日志前输出。
+    写入文件时超过轮转大小后切换新文件，旧文件交给compressor压缩
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        path: Optional[str] = None,
+        rotation_bytes: int = 0,
+        compressor: Optional[Callable[[str], None]] = None,
+        serialize: bool = False,
+        batch_size: int = 512,
+        queue_size: int = 10000,
+    ) -> None:
+        self.path = path
+        self.rotation_bytes = rotation_bytes
+        self.compressor = compressor
+        self.serialize = serialize
+        self.batch_size = batch_size
+        # 等待在下一批日志前输出的丢弃条数，以及累计丢弃条数
+        self.dropped = 0
+        self.dropped_total = 0
+        self._dropped_lock = threading.Lock()
+        self._stream = stream
+        self._size = 0
+        if path is not None:
+            self._open()
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, message: Any) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+                self.dropped_total += 1
+
+    def stop(self) -> None:
+        """
+        写完队列中剩余的日志后停止后台线程，loguru移除sink时调用
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self.path is not None:
+            self._stream.close()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is _STOP
+            if stopping:
+                batch.pop()
+            try:
+                self._write_batch(batch)
+            except Exception:
+                traceback.print_exc(file=sys.__stderr__)
+            if stopping:
+                return
+
+    def _write_batch(self, batch: list[Any]) -> None:
+        lines = [json_line(message.record) if self.serialize else str(message) for message in batch]
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.insert(0, f'{datetime.now().isoformat(sep=" ", timespec="milliseconds")} | 日志队列已满，丢弃 {dropped} 条日志\n')
+        text = ''.join(lines)
+        self._stream.write(text)
+        self._stream.flush()
+        if self.path is not None:
+            self._size += len(text.encode())
+            if self.rotation_bytes and self._size >= self.rotation_bytes:
+                self._rotate()
+
+    def _open(self) -> None:
+        self._stream = open(self.path, 'a', encoding='utf-8')
+        self._size = self._stream.tell()
+
+    def _rotate(self) -> None:
+        self._stream.close()
+        root, ext = os.path.splitext(self.path)
+        rotated = f'{root}.{datetime.now().strftime("%Y-%m-%d_%H-%M-%S_%f")}{ext}'
+        while os.path.exists(rotated) or os.path.exists(f'{rotated}.zip'):
+            rotated = f'{os.path.splitext(rotated)[0]}_{ext}'
+        os.rename(self.path, rotated)
+        self._open()
+        if self.compressor is not None:
+            self.compressor(rotated)
+
 
 class LoggerInitializer:
     def __init__(self) -> None:
@@ -14,6 +245,10 @@ class LoggerInitializer:
         self.__ensure_log_directory_exists()
         self.log_path_error = os.path.join(
             self.log_path, f'{time.strftime("%Y-%m-%d")}_error.log')
+        self.sampler = LogSampler(
+            parse_sample_rates(LogConfig.log_sample_rates), LogConfig.log_rate_limit_burst,
+            LogConfig.log_rate_limit_window)
+        self.compressor = BackgroundCompressor()
 
     def __ensure_log_directory_exists(self) -> None:
         """
@@ -22,13 +257,21 @@ class LoggerInitializer:
         if not os.path.exists(self.log_path):
             os.mkdir(self.log_path)
 
+    def __patch(self, record: dict) -> None:
+        """
+        每条日志在分发给各sink之前执行一次：添加trace_id，并完成采样与重复日志限流判断
+        """
+        record['trace_id'] = TraceCtx.get_id()
+        record['sampled'] = self.sampler(record)
+        if record['sampled'] and LogConfig.log_format == 'json' and LogConfig.log_mode == 'default':
+            record['json'] = json_line(record)
+
     @staticmethod
-    def __filter(log: dict) -> dict:
+    def __filter(log: dict) -> bool:
         """
-        自定义日志过滤器，添加trace_id
+        自定义日志过滤器，丢弃未被采样或被限流的日志
         """
-        log['trace_id'] = TraceCtx.get_id()
-        return log
+        return log['sampled']
 
     def init_log(self) -> Logger:
         """
@@ -42,19 +285,39 @@ class LoggerInitializer:
             '<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - '
             '<level>{message}</level>'
         )
+        if LogConfig.log_format == 'json':
+            # default 模式在patch中生成JSON；batched 模式由后台线程生成，调用方线程不做格式化
+            format_str = (lambda record: '{json}') if LogConfig.log_mode == 'default' else (lambda record: '')
         _logger.remove()
-        # 移除后重新添加sys.stderr, 目的: 控制台输出与文件日志内容和结构一致
-        _logger.add(sys.stderr, filter=self.__filter,
-                    format=format_str, enqueue=True)
-        _logger.add(
-            self.log_path_error,
-            filter=self.__filter,
-            format=format_str,
-            rotation='50MB',
-            encoding='utf-8',
-            enqueue=True,
-            compression='zip',
-        )
+        _logger.configure(patcher=self.__patch)
+        if LogConfig.log_mode == 'batched':
+            serialize = LogConfig.log_format == 'json'
+            for sink in (
+                BatchedSink(
+                    stream=sys.stderr, serialize=serialize, batch_size=LogConfig.log_batch_size,
+                    queue_size=LogConfig.log_queue_size),
+                BatchedSink(
+                    path=self.log_path_error, rotation_bytes=LogConfig.log_rotation_mb * 1024 * 1024,
+                    compressor=self.compressor, serialize=serialize, batch_size=LogConfig.log_batch_size,
+                    queue_size=LogConfig.log_queue_size),
+            ):
+                _logger.add(sink, filter=self.__filter, format=format_str, colorize=False)
+        else:
+            # 移除后重新添加sys.stderr, 目的: 控制台输出与文件日志内容和结构一致
+            _logger.add(sys.stderr, filter=self.__filter,
+                        format=format_str, enqueue=True)
+            _logger.add(
+                self.log_path_error,
+                filter=self.__filter,
+                format=format_str,
+                rotation=f'{LogConfig.log_rotation_mb}MB',
+                encoding='utf-8',
+                enqueue=True,
+                compression=self.compressor,
+            )
+        # 退出时写完队列中的日志，并等待后台压缩完成
+        atexit.register(self.compressor.shutdown)
+        atexit.register(_logger.remove)
 
         return _logger
 
@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+import threading
+import time
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy import Select, event, inspect
+from sqlalchemy.orm import InstrumentedAttribute, ORMExecuteState, Session, UOWTransaction
+
+# 会话中待提交后失效总记录数缓存的表
+PENDING_KEY = 'page_total_pending'
+
+
+class PageUtil:
+    """
+    分页工具类，默认使用基于主键的键集（游标）分页，页码分页仅作为兜底
+    """
+
+    # 总记录数缓存时间（秒），避免大表每次翻页都执行COUNT(*)；本进程的写入提交后按表失效，其他进程的写入依靠过期感知
+    COUNT_CACHE_SECONDS = 30
+    COUNT_CACHE_MAX_SIZE = 1024
+    # 缓存键为表名，或 表名:范围（如 address:1 表示用户1的地址数）
+    _count_cache: dict[str, tuple[float, int]] = {}
+    _count_lock = threading.Lock()
+    # 每次失效递增，COUNT执行期间发生失效时放弃回填，避免写入旧的总数
+    count_generation = 0
+
+    @staticmethod
+    def encode_cursor(last_id: int, page_num: int) -> str:
+        """
+        生成不透明的分页游标
+
+        :param last_id: 当前页最后一条记录的主键
+        :param page_num: 下一页页码
+        :return: 分页游标
+        """
+        payload = json.dumps({'id': last_id, 'p': page_num}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[int, int]:
+        """
+        解析分页游标
+
+        :param cursor: 分页游标
+        :return: (上一页最后一条记录的主键, 当前页码)
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            return int(payload['id']), int(payload['p'])
+        except (binascii.Error, ValueError, KeyError, TypeError) as e:
+            raise ValueError('无效的分页游标') from e
+
+    @classmethod
+    def build_page_stmt(
+        cls,
+        stmt: Select,
+        id_column: InstrumentedAttribute,
+        page_size: int,
+        cursor: Optional[str] = None,
+        page_num: Optional[int] = None,
+    ) -> tuple[Select, int]:
+        """
+        为查询语句追加分页条件，多取一条用于判断是否存在下一页
+
+        :param stmt: 查询语句
+        :param id_column: 用于键集分页的主键列
+        :param page_size: 每页记录数
+        :param cursor: 可选，分页游标，优先于页码
+        :param page_num: 可选，页码，未传游标时使用OFFSET分页
+        :return: (分页查询语句, 当前页码)
+        """
+        stmt = stmt.order_by(id_column).limit(page_size + 1)
+        if cursor:
+            last_id, current_page = cls.decode_cursor(cursor)
+            return stmt.where(id_column > last_id), current_page
+        if page_num and page_num > 1:
+            return stmt.offset((page_num - 1) * page_size), page_num
+        return stmt, 1
+
+    @classmethod
+    def build_page(
+        cls, rows: Sequence[Any], page_size: int, page_num: int, total: Optional[int] = None
+    ) -> dict[str, Any]:
+        """
+        根据多取一条的查询结果生成分页数据
+
+        :param rows: 查询结果
+        :param page_size: 每页记录数
+        :param page_num: 当前页码
+        :param total: 可选，总记录数
+        :return: 分页模型字段字典
+        """
+        has_next = len(rows) > page_size
+        rows = list(rows[:page_size])
+        next_cursor = cls.encode_cursor(rows[-1].id, page_num + 1) if has_next else None
+        return {
+            'rows': rows,
+            'page_num': page_num,
+            'page_size': page_size,
+            'total': total,
+            'has_next': has_next,
+            'next_cursor': next_cursor,
+        }
+
+    @classmethod
+    def get_cached_total(cls, key: str) -> Optional[int]:
+        """
+        获取缓存的总记录数
+
+        :param key: 缓存键
+        :return: 总记录数，缓存不存在或已过期时返回None
+        """
+        with cls._count_lock:
+            cached = cls._count_cache.get(key)
+        if cached is None or cached[0] < time.monotonic():
+            return None
+        return cached[1]
+
+    @classmethod
+    def set_cached_total(cls, key: str, total: int, generation: int) -> None:
+        """
+        缓存总记录数，超出最大条目数时淘汰最早写入的条目
+
+        :param key: 缓存键
+        :param total: 总记录数
+        :param generation: 执行COUNT前读取的 count_generation，期间发生过失效时不回填
+        """
+        with cls._count_lock:
+            if generation != cls.count_generation:
+                return
+            cls._count_cache.pop(key, None)
+            while len(cls._count_cache) >= cls.COUNT_CACHE_MAX_SIZE:
+                del cls._count_cache[next(iter(cls._count_cache))]
+            cls._count_cache[key] = (time.monotonic() + cls.COUNT_CACHE_SECONDS, total)
+
+    @classmethod
+    def invalidate_totals(cls, tables: Iterable[str]) -> None:
+        """
+        使指定表的总记录数缓存失效
+
+        :param tables: 表名
+        """
+        prefixes = tuple(f'{table}:' for table in tables)
+        with cls._count_lock:
+            cls.count_generation += 1
+            for key in [key for key in cls._count_cache if f'{key}:'.startswith(prefixes)]:
+                del cls._count_cache[key]
+
+
+def _changed_tables(session: Session) -> set[str]:
+    """
+    获取工作单元中行数可能变化的表：新增、删除的实体，以及外键变化的实体（改变了按关联范围统计的总数）
+    """
+    tables = {inspect(instance).mapper.local_table.name for instance in (*session.new, *session.deleted)}
+    for instance in session.dirty:
+        state = inspect(instance)
+        for foreign_key in state.mapper.local_table.foreign_keys:
+            prop = state.mapper.get_property_by_column(foreign_key.parent)
+            if state.attrs[prop.key].history.has_changes():
+                tables.add(state.mapper.local_table.name)
+    return tables
+
+
+def register_total_cache_events() -> None:
+    """
+    注册会话事件：记录工作单元与批量INSERT/DELETE语句写入的表，事务提交后使这些表的总记录数缓存失效，回滚时丢弃
+
+    :return: None
+    """
+
+    @event.listens_for(Session, 'after_flush')
+    def collect_flushed(session: Session, flush_context: UOWTransaction) -> None:
+        tables = _changed_tables(session)
+        if tables:
+            session.info.setdefault(PENDING_KEY, set()).update(tables)
+
+    @event.listens_for(Session, 'do_orm_execute')
+    def collect_bulk(orm_execute_state: ORMExecuteState) -> None:
+        if orm_execute_state.is_insert or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, 'table', None)
+            if table is not None:
+                orm_execute_state.session.info.setdefault(PENDING_KEY, set()).add(table.name)
+
+    @event.listens_for(Session, 'after_commit')
+    def invalidate_committed(session: Session) -> None:
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending:
+            PageUtil.invalidate_totals(pending)
+
+    @event.listens_for(Session, 'after_soft_rollback')
+    def discard_pending(session: Session, previous_transaction: Any) -> None:
+        session.info.pop(PENDING_KEY, None)
+
+
+register_total_cache_events()
@@ -1,21 +1,103 @@
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
 from datetime import datetime
 from typing import Any, Optional
 
+import anyio
 from fastapi import status
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from pydantic_core import to_json
 from starlette.background import BackgroundTask
+from starlette.types import Receive, Scope, Send
 
 from common.constant import HttpStatusConstant
 
 
+class FastJSONResponse(JSONResponse):
+    """
+    基于 pydantic-core 的JSON响应类，一次遍历直接输出字节，原生支持datetime与Pydantic模型，
+    无需先经过 jsonable_encoder 转换为基础类型，其他未知类型回退到 jsonable_encoder
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, by_alias=True, inf_nan_mode='null', fallback=jsonable_encoder)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """
+    流式响应结束（包括客户端中途断开连接）后立即关闭内容迭代器，
+    使迭代器中的finally及时释放数据库连接等资源，而不是等待垃圾回收
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, 'aclose', None)
+            if aclose is not None:
+                with anyio.CancelScope(shield=True):
+                    await aclose()
+
+
 class ResponseUtil:
     """
     响应工具类
     """
 
+    @staticmethod
+    def _model_items(model: BaseModel) -> Iterator[tuple[str, Any]]:
+        """
+        按序列化别名取出模型的顶层属性值，不先调用model_dump生成中间字典，
+        属性值（包括嵌套模型）由FastJSONResponse与响应中的其他内容一起一次序列化
+
+        :param model: Pydantic模型实例
+        :return: (属性名, 属性值) 迭代器，属性名与 model_dump(by_alias=True) 的键一致
+        """
+        model_class = type(model)
+        for name, field in model_class.model_fields.items():
+            if not field.exclude:
+                yield field.serialization_alias or field.alias or name, getattr(model, name)
+        for name, field in model_class.model_computed_fields.items():
+            yield field.alias or name, getattr(model, name)
+        if model.model_extra:
+            yield from model.model_extra.items()
+
+    @classmethod
+    def _response(
+        cls,
+        code: int,
+        success: bool,
+        msg: str,
+        data: Optional[Any],
+        rows: Optional[Any],
+        dict_content: Optional[dict],
+        model_content: Optional[BaseModel],
+        headers: Optional[Mapping[str, str]],
+        media_type: Optional[str],
+        background: Optional[BackgroundTask],
+    ) -> Response:
+        result = {'code': code, 'msg': msg}
+
+        if data is not None:
+            result['data'] = data
+        if rows is not None:
+            result['rows'] = rows
+        if dict_content is not None:
+            result.update(dict_content)
+        if model_content is not None:
+            result.update(cls._model_items(model_content))
+
+        result.update({'success': success, 'time': datetime.now()})
+
+        return FastJSONResponse(
+            status_code=status.HTTP_200_OK,
+            content=result,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+        )
+
     @classmethod
     def success(
         cls,
@@ -41,25 +123,9 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 成功响应结果
         """
-        result = {'code': HttpStatusConstant.SUCCESS, 'msg': msg}
-
-        if data is not None:
-            result['data'] = data
-        if rows is not None:
-            result['rows'] = rows
-        if dict_content is not None:
-            result.update(dict_content)
-        if model_content is not None:
-            result.update(model_content.model_dump(by_alias=True))
-
-        result.update({'success': True, 'time': datetime.now()})
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=jsonable_encoder(result),
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        return cls._response(
+            HttpStatusConstant.SUCCESS, True, msg, data, rows, dict_content, model_content,
+            headers, media_type, background,
         )
 
     @classmethod
@@ -87,25 +153,9 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 失败响应结果
         """
-        result = {'code': HttpStatusConstant.WARN, 'msg': msg}
-
-        if data is not None:
-            result['data'] = data
-        if rows is not None:
-            result['rows'] = rows
-        if dict_content is not None:
-            result.update(dict_content)
-        if model_content is not None:
-            result.update(model_content.model_dump(by_alias=True))
-
-        result.update({'success': False, 'time': datetime.now()})
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=jsonable_encoder(result),
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        return cls._response(
+            HttpStatusConstant.WARN, False, msg, data, rows, dict_content, model_content,
+            headers, media_type, background,
         )
 
     @classmethod
@@ -133,25 +183,9 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 未认证响应结果
         """
-        result = {'code': HttpStatusConstant.UNAUTHORIZED, 'msg': msg}
-
-        if data is not None:
-            result['data'] = data
-        if rows is not None:
-            result['rows'] = rows
-        if dict_content is not None:
-            result.update(dict_content)
-        if model_content is not None:
-            result.update(model_content.model_dump(by_alias=True))
-
-        result.update({'success': False, 'time': datetime.now()})
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=jsonable_encoder(result),
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        return cls._response(
+            HttpStatusConstant.UNAUTHORIZED, False, msg, data, rows, dict_content, model_content,
+            headers, media_type, background,
         )
 
     @classmethod
@@ -179,25 +213,9 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 未授权响应结果
         """
-        result = {'code': HttpStatusConstant.FORBIDDEN, 'msg': msg}
-
-        if data is not None:
-            result['data'] = data
-        if rows is not None:
-            result['rows'] = rows
-        if dict_content is not None:
-            result.update(dict_content)
-        if model_content is not None:
-            result.update(model_content.model_dump(by_alias=True))
-
-        result.update({'success': False, 'time': datetime.now()})
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=jsonable_encoder(result),
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        return cls._response(
+            HttpStatusConstant.FORBIDDEN, False, msg, data, rows, dict_content, model_content,
+            headers, media_type, background,
         )
 
     @classmethod
@@ -225,25 +243,9 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 错误响应结果
         """
-        result = {'code': HttpStatusConstant.ERROR, 'msg': msg}
-
-        if data is not None:
-            result['data'] = data
-        if rows is not None:
-            result['rows'] = rows
-        if dict_content is not None:
-            result.update(dict_content)
-        if model_content is not None:
-            result.update(model_content.model_dump(by_alias=True))
-
-        result.update({'success': False, 'time': datetime.now()})
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=jsonable_encoder(result),
-            headers=headers,
-            media_type=media_type,
-            background=background,
+        return cls._response(
+            HttpStatusConstant.ERROR, False, msg, data, rows, dict_content, model_content,
+            headers, media_type, background,
         )
 
     @classmethod
@@ -264,6 +266,6 @@ class ResponseUtil:
         :param background: 可选，响应返回后执行的后台任务
         :return: 流式响应结果
         """
-        return StreamingResponse(
+        return ClosingStreamingResponse(
             status_code=status.HTTP_200_OK, content=data, headers=headers, media_type=media_type, background=background
         )